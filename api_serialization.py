@@ -0,0 +1,78 @@
+"""
+Veldselectie en JSON serialisatie voor de ProximaScore API
+Clients kunnen met `fields` of `compact` aangeven welke delen van een
+/api/calculate resultaat ze nodig hebben; de rest wordt niet opgebouwd
+en niet geserialiseerd.
+"""
+
+import json
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RESULT_FIELDS = {
+    'address', 'profile', 'profile_display', 'total_score',
+    'location', 'categories', 'calculated_at', 'version', 'percentile'
+}
+CATEGORY_FIELDS = {'score', 'weight', 'places', 'display_name'}
+
+# compact = alleen de totaalscore en de score per categorie
+COMPACT_FIELDS = 'total_score,categories.score'
+
+
+def parse_fields(data):
+    """
+    Lees `fields` (lijst of komma gescheiden, bijv. "total_score,categories.score")
+    of `compact` uit de request data. Geeft (result_fields, category_fields) terug,
+    of (None, None) voor het volledige resultaat. Onbekende velden geven een ValueError.
+    """
+    fields = data.get('fields')
+    compact = data.get('compact')
+    if isinstance(compact, str):
+        compact = compact.lower() in ('1', 'true', 'yes', 'ja')
+    if compact and not fields:
+        fields = COMPACT_FIELDS
+    if not fields:
+        return None, None
+
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    # JSON body: alleen een lijst met strings; al het andere is een fout van de client
+    if not isinstance(fields, (list, tuple)) or not all(isinstance(field, str) for field in fields):
+        raise ValueError("fields moet een lijst of komma gescheiden string met veldnamen zijn")
+
+    result_fields = set()
+    category_fields = set()
+    for field in (field.strip() for field in fields):
+        if not field:
+            continue
+        if field.startswith('categories.'):
+            sub_field = field.split('.', 1)[1]
+            if sub_field not in CATEGORY_FIELDS:
+                raise ValueError(f"Onbekend veld: {field}")
+            result_fields.add('categories')
+            category_fields.add(sub_field)
+        elif field in RESULT_FIELDS:
+            result_fields.add(field)
+        else:
+            raise ValueError(f"Onbekend veld: {field}")
+
+    if 'categories' in result_fields and not category_fields:
+        category_fields = set(CATEGORY_FIELDS)
+    return result_fields, category_fields
+
+
+def dumps_json(payload, sort_keys=False):
+    """Serialiseer naar JSON bytes, via orjson als dat beschikbaar is"""
+    if orjson:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(payload, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    """Flask response met snel geserialiseerde JSON"""
+    return Response(dumps_json(payload), status=status, mimetype='application/json')
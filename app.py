@@ -3,58 +3,24 @@ ProximaScore Backend - Verbeterde versie met debug logging
 Volledig schaalbare architectuur, implementatie van 3 voorzieningen
 """
 
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, jsonify, request, render_template, stream_with_context
 from flask_cors import CORS
 import requests
-import json
-import math
 import os
-import sqlite3
-import hashlib
 import logging
-from datetime import datetime, timedelta
-from pathlib import Path
-from dotenv import load_dotenv
-def is_place_relevant(place, category):
-    """Check of een place relevant is voor de gegeven categorie"""
-    place_name = place.get('name', '').lower()
-    place_types = place.get('types', [])
-    rating = place.get('rating', 0)
-    user_ratings_total = place.get('user_ratings_total', 0)
-    
-    # Minimum kwaliteit eisen
-    if rating > 0 and rating < 3.0:
-        return False
-    
-    if user_ratings_total > 0 and user_ratings_total < 3:
-        return False
-    
-    # Categorie-specifieke relevantie checks
-    if category == 'apotheek':
-        relevant_words = ['apotheek', 'pharmacy', 'apotheke', 'farmacie']
-        return any(word in place_name for word in relevant_words)
-    
-    elif category == 'huisarts':
-        relevant_words = ['huisarts', 'dokter', 'arts', 'doctor', 'medisch', 'gezondheid', 'fysi']
-        return any(word in place_name for word in relevant_words)
-    
-    elif category == 'basisschool':
-        relevant_words = ['school', 'onderwijs', 'basisschool', 'elementary']
-        irrelevant_words = ['rijschool', 'dansschool', 'muziekschool', 'driving']
-        has_relevant = any(word in place_name for word in relevant_words)
-        has_irrelevant = any(word in place_name for word in irrelevant_words)
-        return has_relevant and not has_irrelevant
-    
-    elif category == 'sportfaciliteiten':
-        relevant_words = ['gym', 'sport', 'fitness', 'zwembad', 'tennis', 'voetbal', 'hockey']
-        return any(word in place_name for word in relevant_words)
-    
-    # Voor andere categorieën: altijd relevant (voorlopig)
-    return True
+from datetime import datetime
+from proximascore.address_normalizer import normalize_place
+from proximascore.config import (
+    ALLE_PROFIELEN, ALLE_VOORZIENINGEN, GOOGLE_API_KEY, GOOGLE_PLACES_API_KEY, NEARBY_SEARCH_URL
+)
+from api_serialization import dumps_json, json_response, parse_fields
+from http_caching import content_etag, init_http_caching
+from job_queue import JOB_MAX_ADDRESSES, JobQueue
+from proximascore.deadline import request_deadline
+from request_profiler import init_request_profiler, wrap_task
+from proximascore.score_sketches import NATIONAL_REGION
+from proximascore.scorer import ProximaScoreCalculator
 
-
-# Laad environment variabelen
-load_dotenv('.env')
 print(f"STARTUP DEBUG: .env bestand bestaat: {os.path.exists('.env')}")
 print(f"STARTUP DEBUG: Werkmap: {os.getcwd()}")
 
@@ -68,10 +34,6 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# API Configuration met uitgebreide debugging
-GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY', '')
-GOOGLE_PLACES_API_KEY = os.environ.get('GOOGLE_PLACES_API_KEY', GOOGLE_API_KEY)
-
 # Debug API key configuratie
 if GOOGLE_API_KEY:
     print(f"DEBUG: Geocoding API key geladen: {GOOGLE_API_KEY[:10]}... (lengte: {len(GOOGLE_API_KEY)})")
@@ -86,492 +48,46 @@ else:
 if not GOOGLE_API_KEY:
     print("WAARSCHUWING: Geen Google API key gevonden! Controleer je .env bestand.")
 
-# Volledige voorzieningen definitie
-ALLE_VOORZIENINGEN = {
-    'supermarkt': {
-        'google_types': ['supermarket', 'grocery_or_supermarket'],
-        'display_name': 'Supermarkt',
-        'active': True
-    },
-    'huisarts': {
-        'google_types': ['doctor', 'hospital', 'physiotherapist'],
-        'display_name': 'Huisarts/Medisch centrum',
-        'active': True
-    },
-    'openbaar_vervoer': {
-        'google_types': ['bus_station', 'subway_station', 'train_station', 'transit_station'],
-        'display_name': 'Openbaar vervoer',
-        'active': True
-    },
-    'basisschool': {
-        'google_types': ['primary_school', 'school'],
-        'display_name': 'Basisschool',
-        'active': True
-    },
-    'apotheek': {
-        'google_types': ['pharmacy'],
-        'display_name': 'Apotheek',
-        'active': True
-    },
-    'sportfaciliteiten': {
-        'google_types': ['gym', 'stadium', 'bowling_alley'],
-        'display_name': 'Sportfaciliteiten',
-        'active': True
-    },
-    'horeca': {
-        'google_types': ['restaurant', 'bar', 'cafe', 'meal_takeaway'],
-        'display_name': 'Horeca',
-        'active': True
-    },
-    'werkgelegenheid': {
-        'google_types': ['store', 'establishment'],
-        'display_name': 'Werkgelegenheid',
-        'active': True
-    },
-    'cultuur': {
-        'google_types': ['library', 'museum', 'movie_theater', 'art_gallery', 'tourist_attraction'],
-        'display_name': 'Cultuur',
-        'active': True
-    },
-    'groenvoorziening': {
-        'google_types': ['park'],
-        'display_name': 'Groenvoorziening',
-        'active': True
-    }
+# Tijdsbudget per route in seconden (None = geen limiet); binnen de gateway limiet van 30s,
+# ook voor de stream: anders kapt de proxy hem af voordat het deelresultaat verstuurd is.
+# Clients kunnen met X-Deadline-Ms een korter budget vragen.
+ROUTE_DEADLINES = {
+    'calculate_score': float(os.environ.get('REQUEST_DEADLINE_SECONDS', 25)),
+    'calculate_score_stream': float(os.environ.get('STREAM_DEADLINE_SECONDS', 28)),
 }
 
-# Volledige profielen definitie
-# Vervang je hele ALLE_PROFIELEN sectie (rond regel 100-140) door deze versie:
+# Maximaal aantal suggesties per /api/suggest request
+SUGGEST_MAX_LIMIT = 10
 
-ALLE_PROFIELEN = {
-    'algemeen': {
-        'display_name': 'Algemeen profiel',
-        'gewichten': {
-            'supermarkt': 35,
-            'huisarts': 35,
-            'openbaar_vervoer': 30,
-            'basisschool': 0,
-            'apotheek': 0,
-            'sportfaciliteiten': 0,
-            'horeca': 0,
-            'werkgelegenheid': 0,
-            'cultuur': 0,
-            'groenvoorziening': 0
-        },
-        'active': True
-    },
-    'gezin': {
-        'display_name': 'Gezin met kinderen',
-        'gewichten': {
-            'basisschool': 25,
-            'supermarkt': 20,
-            'huisarts': 15,
-            'openbaar_vervoer': 15,
-            'apotheek': 10,
-            'sportfaciliteiten': 10,
-            'groenvoorziening': 5,
-            'horeca': 0,
-            'werkgelegenheid': 0,
-            'cultuur': 0
-        },
-        'active': True
-    },
-    'senior': {
-        'display_name': 'Senior 65+',
-        'gewichten': {
-            'huisarts': 30,
-            'apotheek': 20,
-            'supermarkt': 20,
-            'openbaar_vervoer': 15,
-            'cultuur': 5,
-            'groenvoorziening': 5,
-            'horeca': 3,
-            'sportfaciliteiten': 2,
-            'basisschool': 0,
-            'werkgelegenheid': 0
-        },
-        'active': True
-    },
-    'student': {
-        'display_name': 'Student',
-        'gewichten': {
-            'openbaar_vervoer': 30,
-            'supermarkt': 25,
-            'horeca': 15,
-            'sportfaciliteiten': 10,
-            'cultuur': 10,
-            'huisarts': 5,
-            'apotheek': 5,
-            'basisschool': 0,
-            'werkgelegenheid': 0,
-            'groenvoorziening': 0
-        },
-        'active': True
-    },
-    'starter': {
-        'display_name': 'Starter op woningmarkt',
-        'gewichten': {
-            'openbaar_vervoer': 25,
-            'supermarkt': 20,
-            'huisarts': 15,
-            'werkgelegenheid': 15,
-            'sportfaciliteiten': 10,
-            'apotheek': 5,
-            'horeca': 5,
-            'cultuur': 5,
-            'basisschool': 0,
-            'groenvoorziening': 0
-        },
-        'active': True
-    }
+# HTTP caching: Cache-Control per endpoint, ETags en compressie voor alle JSON
+CACHE_CONTROL_POLICIES = {
+    'index': 'no-cache',
+    'get_profiles': 'public, max-age=3600',
+    'get_voorzieningen': 'public, max-age=3600',
+    # GET /api/calculate mag door een CDN of gedeelde cache hergebruikt worden (de URL bevat
+    # adres, profiel en velden); POST antwoorden alleen door de client zelf
+    'calculate_score': 'public, max-age=300, stale-while-revalidate=600',
+    'suggest_addresses': 'public, max-age=60',
+    'score_distribution': 'public, max-age=300',
+    'health_check': 'no-store',
+    'submit_job': 'no-store',
+    'job_status': 'no-store',
+    'job_result': 'private, no-cache',
 }
-class ProximaScoreCalculator:
-    """Hoofdklasse voor ProximaScore berekeningen met uitgebreide debug logging"""
-    
-    def __init__(self, google_api_key):
-        self.api_key = google_api_key
-        self.places_api_key = GOOGLE_PLACES_API_KEY
-        print(f"Calculator geinitialiseerd met API key lengte: {len(self.api_key)}")
-        self.init_database()
-    
-    def init_database(self):
-        """Initialiseer database schema"""
-        db_path = Path('data/proximascore.db')
-        db_path.parent.mkdir(exist_ok=True)
-        
-        with sqlite3.connect(db_path) as conn:
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS geocoding_cache (
-                    id INTEGER PRIMARY KEY,
-                    address_hash TEXT UNIQUE,
-                    address TEXT,
-                    lat REAL,
-                    lng REAL,
-                    created_at TIMESTAMP
-                )
-            ''')
-            
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS poi_cache (
-                    id INTEGER PRIMARY KEY,
-                    location_hash TEXT,
-                    category TEXT,
-                    poi_data TEXT,
-                    created_at TIMESTAMP
-                )
-            ''')
-            
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS score_cache (
-                    id INTEGER PRIMARY KEY,
-                    address_hash TEXT,
-                    profile TEXT,
-                    score_data TEXT,
-                    created_at TIMESTAMP
-                )
-            ''')
-        print("Database geinitialiseerd")
-    
-    def geocode_address(self, address):
-        """Converteer Nederlands adres naar coordinaten met debug logging"""
-        print(f"Geocoding adres: {address}")
-        
-        try:
-            # Cache check
-            address_hash = hashlib.md5(address.lower().encode()).hexdigest()
-            db_path = Path('data/proximascore.db')
-            
-            with sqlite3.connect(db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT lat, lng FROM geocoding_cache 
-                    WHERE address_hash = ? AND created_at > ?
-                ''', (address_hash, datetime.now() - timedelta(hours=24)))
-                
-                cached = cursor.fetchone()
-                if cached:
-                    print(f"Geocoding cache hit voor: {address}")
-                    return {'lat': cached[0], 'lng': cached[1]}
-            
-            # Google Geocoding API call
-            url = "https://maps.googleapis.com/maps/api/geocode/json"
-            params = {
-                'address': address,
-                'region': 'nl',
-                'key': self.api_key
-            }
-            
-            print(f"Geocoding API call: {url}")
-            print(f"Geocoding parameters: {params}")
-            
-            response = requests.get(url, params=params, timeout=10)
-            print(f"Geocoding response status: {response.status_code}")
-            
-            data = response.json()
-            print(f"Geocoding API status: {data.get('status')}")
-            
-            if data['status'] == 'OK' and data['results']:
-                location = data['results'][0]['geometry']['location']
-                
-                # Cache opslaan
-                with sqlite3.connect(db_path) as conn:
-                    conn.execute('''
-                        INSERT OR REPLACE INTO geocoding_cache 
-                        (address_hash, address, lat, lng, created_at)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (address_hash, address, location['lat'], location['lng'], datetime.now()))
-                
-                print(f"Geocoding succesvol: {address} -> {location}")
-                return location
-            else:
-                print(f"Geocoding gefaald: {data.get('status')} - {data}")
-                return None
-                
-        except Exception as e:
-            print(f"Geocoding fout: {str(e)}")
-            return None
-    
-    def find_nearby_places(self, lat, lng, category):
-        """Zoek voorzieningen via Google Places API met uitgebreide debug logging"""
-        print(f"\n=== ZOEK VOORZIENINGEN ===")
-        print(f"Coordinaten: {lat:.6f}, {lng:.6f}")
-        print(f"Categorie: {category}")
-        print(f"Categorie actief: {ALLE_VOORZIENINGEN[category]['active']}")
-        
-        if not ALLE_VOORZIENINGEN[category]['active']:
-            print(f"Categorie {category} niet actief in huidige stap")
-            return []
-        
-        try:
-            # Cache check
-            location_hash = hashlib.md5(f"{lat:.6f},{lng:.6f}".encode()).hexdigest()
-            db_path = Path('data/proximascore.db')
-            
-            with sqlite3.connect(db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT poi_data FROM poi_cache 
-                    WHERE location_hash = ? AND category = ? AND created_at > ?
-                ''', (location_hash, category, datetime.now() - timedelta(hours=24)))
-                
-                cached = cursor.fetchone()
-                if cached:
-                    print(f"POI cache hit voor categorie: {category}")
-                    return json.loads(cached[0])
-            
-            # Google Places API calls
-            places = []
-            place_types = ALLE_VOORZIENINGEN[category]['google_types']
-            print(f"Google types voor {category}: {place_types}")
-            print(f"Places API key lengte: {len(self.places_api_key)}")
-            
-            for place_type in place_types:
-                print(f"\nZoeken naar type: {place_type}")
-                
-                url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-                params = {
-                    'location': f"{lat},{lng}",
-                    'radius': 2000,
-                    'type': place_type,
-                    'key': self.places_api_key
-                }
-                
-                print(f"API URL: {url}")
-                print(f"API Parameters: {params}")
-                if self.places_api_key:
-                    print(f"API key eindigt op: ...{self.places_api_key[-4:]}")
-                else:
-                    print("API key: LEEG")
-                
-                response = requests.get(url, params=params, timeout=10)
-                print(f"Response status code: {response.status_code}")
-                print(f"Response header Content-Type: {response.headers.get('Content-Type')}")
-                
-                if response.status_code != 200:
-                    print(f"HTTP fout: {response.status_code}")
-                    print(f"Response tekst: {response.text}")
-                    continue
-                
-                try:
-                    data = response.json()
-                except Exception as e:
-                    print(f"JSON parse fout: {e}")
-                    print(f"Response tekst: {response.text[:500]}")
-                    continue
-                
-                print(f"API status: {data.get('status')}")
-                print(f"Resultaten gevonden: {len(data.get('results', []))}")
-                
-                if data.get('status') != 'OK':
-                    print(f"API fout status: {data.get('status')}")
-                    print(f"API fout bericht: {data.get('error_message', 'Geen foutbericht')}")
-                    continue
-                
-                if data['status'] == 'OK':
-                    place_results = data.get('results', [])
-                    print(f"Verwerken van {len(place_results)} resultaten voor {place_type}")
-                    
-                    for place in place_results:
-                        if place.get('business_status') != 'CLOSED_PERMANENTLY':
-                            # Bereken distance eerst
-                            distance = self.calculate_distance(
-                                lat, lng,
-                                place['geometry']['location']['lat'],
-                                place['geometry']['location']['lng']
-                            )
-                            
-                            place_info = {
-                                'name': place['name'],
-                                'address': place.get('vicinity', ''),
-                                'distance_meters': round(distance),
-                                'lat': place['geometry']['location']['lat'],
-                                'lng': place['geometry']['location']['lng'],
-                                'rating': place.get('rating', 0)
-                            }
-                            places.append(place_info)
-                            print(f"Toegevoegd: {place['name']} ({round(distance)}m)")
-            
-            # Remove duplicates gebaseerd op naam en locatie
-            unique_places = []
-            seen_names = set()
-            
-            for place in places:
-                # Normalize naam voor duplicate detection
-                normalized_name = place['name'].lower().strip()
-                location_key = f"{place['lat']:.6f},{place['lng']:.6f}"
-                unique_key = f"{normalized_name}_{location_key}"
-                
-                if unique_key not in seen_names:
-                    unique_places.append(place)
-                    seen_names.add(unique_key)
-                else:
-                    print(f"⚠ Duplicate weggehaald: {place['name']}")
-            
-            # Sorteer op afstand, neem dichtstbijzijnde 3
-            unique_places.sort(key=lambda x: x['distance_meters'])
-            places = unique_places[:3]
-            
-            print(f"Totaal {len(places)} voorzieningen gevonden voor {category}")
-            for place in places:
-                print(f"  - {place['name']}: {place['distance_meters']}m")
-            
-            # Cache opslaan
-            with sqlite3.connect(db_path) as conn:
-                conn.execute('''
-                    INSERT OR REPLACE INTO poi_cache 
-                    (location_hash, category, poi_data, created_at)
-                    VALUES (?, ?, ?, ?)
-                ''', (location_hash, category, json.dumps(places), datetime.now()))
-            
-            print(f"=== EINDE ZOEK VOORZIENINGEN ===\n")
-            return places
-            
-        except Exception as e:
-            print(f"Places API fout voor {category}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return []
-    
-    def calculate_distance(self, lat1, lon1, lat2, lon2):
-        """Bereken afstand tussen twee punten (Haversine formule)"""
-        R = 6371000  # Earth radius in meters
-        
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(delta_lat / 2) ** 2 + 
-             math.cos(lat1_rad) * math.cos(lat2_rad) * 
-             math.sin(delta_lon / 2) ** 2)
-        
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        
-        return R * c
-    
-    def calculate_category_score(self, places):
-        """Score voor categorie: max(0, 100 - (distance / 20))"""
-        if not places:
-            return 0
-        
-        closest_distance = min(places, key=lambda x: x['distance_meters'])['distance_meters']
-        score = max(0, 100 - (closest_distance / 20))
-        return min(100, score)
-    
-    def calculate_proxima_score(self, address, profile='algemeen'):
-        """Bereken ProximaScore voor adres en profiel"""
-        print(f"\n=== PROXIMASCORE BEREKENING ===")
-        print(f"Adres: {address}")
-        print(f"Profiel: {profile}")
-        
-        try:
-            # Controleer of profiel actief is
-            if not ALLE_PROFIELEN[profile]['active']:
-                return {'error': f'Profiel {profile} nog niet beschikbaar in deze versie'}
-            
-            # Geocode address
-            location = self.geocode_address(address)
-            if not location:
-                return {'error': 'Adres niet gevonden'}
-            
-            lat, lng = location['lat'], location['lng']
-            gewichten = ALLE_PROFIELEN[profile]['gewichten']
-            
-            print(f"Geocoordinaten: {lat}, {lng}")
-            print(f"Gebruikte gewichten: {gewichten}")
-            
-            # Bereken scores per categorie (alleen actieve)
-            categorie_scores = {}
-            total_weighted_score = 0
-            total_weight = 0
-            
-            for category, weight in gewichten.items():
-                if weight > 0 and ALLE_VOORZIENINGEN[category]['active']:
-                    print(f"\nBerekenen score voor: {category} (gewicht: {weight})")
-                    places = self.find_nearby_places(lat, lng, category)
-                    category_score = self.calculate_category_score(places)
-                    
-                    categorie_scores[category] = {
-                        'score': round(category_score, 1),
-                        'weight': weight,
-                        'places': places,
-                        'display_name': ALLE_VOORZIENINGEN[category]['display_name']
-                    }
-                    
-                    total_weighted_score += (category_score * weight)
-                    total_weight += weight
-                    
-                    print(f"Score voor {category}: {category_score:.1f}")
-            
-            # Normaliseer score naar 0-100
-            final_score = (total_weighted_score / total_weight) if total_weight > 0 else 0
-            
-            print(f"Totaal gewogen score: {total_weighted_score}")
-            print(f"Totaal gewicht: {total_weight}")
-            print(f"Finale score: {final_score:.1f}")
-            
-            result = {
-                'address': address,
-                'profile': profile,
-                'profile_display': ALLE_PROFIELEN[profile]['display_name'],
-                'total_score': round(final_score, 1),
-                'location': location,
-                'categories': categorie_scores,
-                'calculated_at': datetime.now().isoformat(),
-                'version': 'Verbeterde versie met debug logging'
-            }
-            
-            print(f"=== PROXIMASCORE RESULTAAT: {final_score:.1f}/100 ===\n")
-            return result
-            
-        except Exception as e:
-            print(f"Score berekening fout: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return {'error': f'Berekening gefaald: {str(e)}'}
+CALCULATE_POST_CACHE_CONTROL = 'private, max-age=300'
+COMPRESS_MIN_BYTES = 1024
+
+# Profiling van losse requests (zie request_profiler.py); uit zolang er geen token is
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+PROFILING_PER_MINUTE = int(os.environ.get('PROFILING_PER_MINUTE', 6))
 
 # Initialize calculator
 calculator = ProximaScoreCalculator(GOOGLE_API_KEY)
+calculator.task_wrapper = wrap_task
+# Lange berekeningen gaan via de job queue naar aparte workers (python job_queue.py worker)
+jobs = JobQueue()
+init_http_caching(app, CACHE_CONTROL_POLICIES, min_compress_size=COMPRESS_MIN_BYTES)
+init_request_profiler(app, PROFILING_TOKEN, {'calculate_score'}, per_minute=PROFILING_PER_MINUTE)
 
 # API Routes
 @app.route('/')
@@ -579,11 +95,11 @@ def index():
     """Hoofdpagina - frontend"""
     return render_template('index.html')
 
-@app.route('/api/calculate', methods=['POST'])
+@app.route('/api/calculate', methods=['GET', 'POST'])
 def calculate_score():
-    """API endpoint voor ProximaScore berekening"""
+    """API endpoint voor ProximaScore berekening (GET variant is cachebaar)"""
     try:
-        data = request.get_json() or {}
+        data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
         address = data.get('address', '').strip()
         profile = data.get('profile', 'algemeen')
         
@@ -592,22 +108,162 @@ def calculate_score():
         print(f"Profiel: {profile}")
         
         if not address:
-            return jsonify({'error': 'Adres is verplicht'}), 400
+            return jsonify({'error': 'Adres is verplicht'}), 400, {'Cache-Control': 'no-store'}
+        
+        try:
+            result_fields, category_fields = parse_fields(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400, {'Cache-Control': 'no-store'}
         
-        result = calculator.calculate_proxima_score(address, profile)
+        deadline = request_deadline(ROUTE_DEADLINES, 'calculate_score', request.headers.get('X-Deadline-Ms'))
+        result = calculator.calculate_proxima_score(address, profile, result_fields, category_fields, deadline)
         
         if 'error' in result:
             print(f"API ERROR: {result['error']}")
-            return jsonify(result), 400
+            # Fouten (ook een mislukte geocoding) niet in een gedeelde cache bewaren
+            response = jsonify(result)
+            response.headers['Cache-Control'] = 'no-store'
+            return response, 504 if result.get('incomplete') else 400
         
-        print(f"API SUCCESS: Score {result['total_score']}")
-        return jsonify(result)
+        print(f"API SUCCESS: Score {result.get('total_score')}")
+        response = json_response(result)
+        if result.get('incomplete'):
+            # Een onvolledig resultaat niet hergebruiken; de volgende poging kan wel alles halen
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        if request.method == 'POST':
+            response.headers['Cache-Control'] = CALCULATE_POST_CACHE_CONTROL
+        # Zelfde adres en data geeft dezelfde uitkomst; alleen het tijdstip verschilt
+        stable = {key: value for key, value in result.items() if key != 'calculated_at'}
+        response.set_etag(content_etag(dumps_json(stable, sort_keys=True)), weak=True)
+        return response
         
     except Exception as e:
         print(f"API EXCEPTION: {str(e)}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': 'Interne serverfout'}), 500
+        return jsonify({'error': 'Interne serverfout'}), 500, {'Cache-Control': 'no-store'}
+
+@app.route('/api/calculate/stream')
+def calculate_score_stream():
+    """
+    Streaming variant van /api/calculate via Server-Sent Events: eerst de geocode,
+    dan een event per categorie zodra die klaar is en tot slot het totaal.
+    """
+    address = request.args.get('address', '').strip()
+    profile = request.args.get('profile', 'algemeen')
+    
+    print(f"\nAPI CALL: /api/calculate/stream")
+    print(f"Adres: {address}")
+    print(f"Profiel: {profile}")
+    
+    if not address:
+        return jsonify({'error': 'Adres is verplicht'}), 400
+    
+    try:
+        result_fields, category_fields = parse_fields(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    deadline = request_deadline(ROUTE_DEADLINES, 'calculate_score_stream', request.headers.get('X-Deadline-Ms'))
+    
+    def events():
+        for event, data in calculator.iter_proxima_score_events(address, profile, result_fields, category_fields,
+                                                                deadline):
+            yield f"event: {event}\ndata: {dumps_json(data).decode('utf-8')}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/suggest')
+def suggest_addresses():
+    """Adres suggesties uit de lokale index; geen Google calls"""
+    query = request.args.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.args.get('limit', 5)), SUGGEST_MAX_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit moet een getal zijn'}), 400
+    
+    return jsonify({
+        'query': query,
+        'suggestions': calculator.suggest_addresses(query, limit)
+    })
+
+@app.route('/api/debug/suggest')
+def debug_suggest():
+    """Grootte, leeftijd en gebruik van de adres suggestie index"""
+    return jsonify(calculator.suggest_index.get_stats())
+
+@app.route('/api/distribution')
+def score_distribution():
+    """Verdeling van de scores per profiel, voor een gemeente of landelijk"""
+    profile = request.args.get('profile', 'algemeen')
+    if profile not in ALLE_PROFIELEN:
+        return jsonify({'error': f'Profiel {profile} onbekend'}), 400
+    region = request.args.get('region', '').strip()
+    region = normalize_place(region) if region else NATIONAL_REGION
+    return jsonify(calculator.distributions.summary(profile, region))
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Zet een batch berekening in de job queue. Body: {"addresses": [...],
+    "profile": "algemeen", "priority": 0-9, "fields"/"compact": optioneel}
+    """
+    data = request.get_json(silent=True) or {}
+    addresses = data.get('addresses')
+    
+    if not isinstance(addresses, list) or not addresses:
+        return jsonify({'error': 'addresses moet een niet-lege lijst zijn'}), 400
+    addresses = [str(address).strip() for address in addresses if str(address).strip()]
+    if not addresses or len(addresses) > JOB_MAX_ADDRESSES:
+        return jsonify({'error': f'Tussen 1 en {JOB_MAX_ADDRESSES} adressen per job'}), 400
+    
+    profile = data.get('profile', 'algemeen')
+    if profile not in ALLE_PROFIELEN or not ALLE_PROFIELEN[profile]['active']:
+        return jsonify({'error': f'Profiel {profile} niet beschikbaar'}), 400
+    
+    try:
+        parse_fields(data)
+        payload = {'addresses': addresses, 'profile': profile}
+        for key in ('fields', 'compact'):
+            if key in data:
+                payload[key] = data[key]
+        job_id = jobs.submit('batch_score', payload, priority=int(data.get('priority', 0)), total=len(addresses))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    print(f"\nAPI CALL: /api/jobs ({len(addresses)} adressen)")
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/jobs/{job_id}',
+        'result_url': f'/api/jobs/{job_id}/result'
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Status en voortgang van een job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job niet gevonden'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/result')
+def job_result(job_id):
+    """Resultaat van een afgeronde job (202 zolang hij nog loopt)"""
+    job = jobs.get(job_id, include_result=True)
+    if job is None:
+        return jsonify({'error': 'Job niet gevonden'}), 404
+    if job['status'] in ('queued', 'running'):
+        return jsonify({key: value for key, value in job.items() if key != 'result'}), 202
+    if job['status'] == 'expired':
+        return jsonify({'error': 'Resultaat verlopen', 'job_id': job_id}), 410
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error'], 'job_id': job_id}), 500
+    return json_response(job['result'])
 
 @app.route('/api/profiles')
 def get_profiles():
@@ -639,6 +295,35 @@ def health_check():
         'version': 'Verbeterde versie met uitgebreide debug logging'
     })
 
+@app.route('/api/debug/provider-stats')
+def debug_provider_stats():
+    """Hit/miss en latency per POI provider tier"""
+    return jsonify(calculator.get_provider_stats())
+
+@app.route('/api/debug/cache-writes')
+def debug_cache_writes():
+    """Wachtrij, batches en vervallen writes van de write-behind cache"""
+    if not hasattr(calculator.cache, 'get_stats'):
+        return jsonify({'enabled': False})
+    return jsonify(calculator.cache.get_stats())
+
+@app.route('/api/debug/hedging')
+def debug_hedging():
+    """Hoe vaak Nearby Search calls gehedged worden en hoe vaak de hedge wint"""
+    hedger = calculator.providers['google'].hedger
+    return jsonify(hedger.get_stats() if hedger else {'enabled': False})
+
+@app.route('/api/debug/query-planner')
+def debug_query_planner():
+    """Opbrengst per Google type en bespaarde calls per categorie"""
+    return jsonify(calculator.providers['google'].planner.get_stats())
+
+@app.route('/api/debug/relevance')
+def debug_relevance():
+    """Relevantie regels en hoeveel Google kandidaten elke regel laat afvallen"""
+    relevance = calculator.providers['google'].relevance
+    return jsonify(relevance.get_stats() if relevance else {'enabled': False})
+
 @app.route('/api/debug/test-places', methods=['GET'])
 def debug_test_places():
     """Debug endpoint om Places API direct te testen"""
@@ -647,7 +332,7 @@ def debug_test_places():
         lng = float(request.args.get('lng', 4.9459902))
         place_type = request.args.get('type', 'supermarket')
         
-        url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+        url = NEARBY_SEARCH_URL
         params = {
             'location': f"{lat},{lng}",
             'radius': 2000,
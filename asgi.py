@@ -0,0 +1,434 @@
+"""
+ASGI serveermodus voor ProximaScore
+De scoring routes (/api/calculate en /api/calculate/stream) draaien hier volledig
+async: geocoding en Places calls via een gedeelde httpx.AsyncClient, cache
+toegang (SQLite, OSM, GTFS) in worker threads. Eén proces kan zo honderden
+berekeningen tegelijk laten wachten op Google zonder een worker per request.
+Alle andere routes gaan ongewijzigd naar de Flask app (via WsgiToAsgi).
+
+Starten:
+    uvicorn asgi:application --host 0.0.0.0 --port $PORT
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT
+"""
+
+import asyncio
+import json
+import os
+from urllib.parse import parse_qsl
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+
+from api_serialization import dumps_json, parse_fields
+from app import (
+    CACHE_CONTROL_POLICIES, CALCULATE_POST_CACHE_CONTROL, COMPRESS_MIN_BYTES, PROFILING_TOKEN, ROUTE_DEADLINES,
+    app as flask_app, calculator
+)
+from proximascore.config import ALLE_PROFIELEN, ALLE_VOORZIENINGEN, GEOCODE_DEADLINE_SHARE, GEOCODE_URL
+from proximascore.deadline import DeadlineExceeded, activate, request_deadline, upstream_timeout
+from http_caching import conditional_body, content_etag
+from proximascore.poi_providers import FAILED_SOURCES, select_closest_places
+
+# Maximaal aantal gelijktijdige verbindingen naar Google per proces
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', 100))
+ASYNC_TIMEOUT = 10
+
+
+class AsyncProximaScoreCalculator:
+    """
+    Async variant van de berekening in ProximaScoreCalculator. Hergebruikt de
+    caches, provider ketens en score logica van de sync calculator; alleen het
+    wachten op I/O gebeurt hier met asyncio.
+    """
+
+    def __init__(self, calculator, client=None):
+        self.calculator = calculator
+        self.client = client
+        self._owns_client = client is None
+
+    async def start(self):
+        """Open de httpx client en laat de Google provider die gebruiken"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=ASYNC_TIMEOUT,
+                limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS,
+                                    max_keepalive_connections=ASYNC_MAX_CONNECTIONS)
+            )
+            self._owns_client = True
+        self.calculator.providers['google'].async_client = self.client
+        print(f"Async client gestart (max {ASYNC_MAX_CONNECTIONS} verbindingen)")
+
+    async def close(self):
+        self.calculator.providers['google'].async_client = None
+        if self.client is not None and self._owns_client:
+            await self.client.aclose()
+            self.client = None
+        print("Async client gesloten")
+
+    async def geocode_address(self, address):
+        """Async variant van ProximaScoreCalculator.geocode_address"""
+        print(f"Geocoding adres (async): {address}")
+
+        address_hash = None
+        try:
+            canonical_key, address_hash, cached = await asyncio.to_thread(
+                self.calculator.lookup_cached_geocode, address)
+            if cached is not None:
+                return cached or None
+
+            params = self.calculator.geocode_params(address)
+            response = await self.client.get(GEOCODE_URL, params=params, timeout=upstream_timeout(ASYNC_TIMEOUT))
+            print(f"Geocoding response status: {response.status_code}")
+
+            return await asyncio.to_thread(
+                self.calculator.store_geocode_response, address, canonical_key, address_hash, response.json())
+
+        except Exception as e:
+            print(f"Geocoding fout: {str(e)}")
+            if address_hash:
+                await asyncio.to_thread(self.calculator.store_geocode_error, address_hash)
+            return None
+
+    async def find_nearby_places(self, lat, lng, category):
+        """Async variant van ProximaScoreCalculator.find_nearby_places"""
+        places, source = await self.lookup_places(lat, lng, category)
+        return places
+
+    async def lookup_places(self, lat, lng, category):
+        """Async variant van ProximaScoreCalculator.lookup_places"""
+        if not ALLE_VOORZIENINGEN[category]['active']:
+            return [], None
+
+        try:
+            place_types = ALLE_VOORZIENINGEN[category]['google_types']
+            chain = self.calculator.get_provider_chain(category)
+            places, source = await chain.alookup(lat, lng, category, place_types,
+                                                 postprocess=select_closest_places)
+            print(f"Totaal {len(places)} voorzieningen gevonden voor {category} (bron: {source})")
+            return places, source
+
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"Places API fout voor {category}: {str(e)}")
+            return [], 'error'
+
+    async def iter_category_scores(self, lat, lng, profile='algemeen', category_fields=None, deadline=None,
+                                   failed=None):
+        """Alle categorieen tegelijk als taken; geeft ze terug in volgorde van afronding"""
+
+        async def score_category(category, weight):
+            with activate(deadline):
+                places, source = await self.lookup_places(lat, lng, category)
+            if source in FAILED_SOURCES and failed is not None:
+                failed.add(category)
+            entry, category_score = self.calculator.build_category_entry(
+                category, weight, places, category_fields)
+            return category, entry, category_score
+
+        categories = self.calculator.scored_categories(profile)
+        await asyncio.to_thread(self.calculator.prefetch_places, lat, lng,
+                                [category for category, weight in categories])
+
+        tasks = [
+            asyncio.ensure_future(score_category(category, weight))
+            for category, weight in categories
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=deadline.remaining() if deadline else None):
+                try:
+                    result = await next_done
+                except DeadlineExceeded as e:
+                    print(f"Categorie niet afgerond: {str(e)}")
+                    continue
+                yield result
+        except asyncio.TimeoutError:
+            print(f"Tijdsbudget op: {sum(1 for task in tasks if not task.done())} categorieen afgebroken")
+        finally:
+            # Client weg of fout: lopende Places calls niet laten doorlopen
+            for task in tasks:
+                task.cancel()
+
+    async def iter_proxima_score_events(self, address, profile='algemeen', result_fields=None, category_fields=None,
+                                        deadline=None):
+        """Async variant van ProximaScoreCalculator.iter_proxima_score_events"""
+        try:
+            if not ALLE_PROFIELEN[profile]['active']:
+                yield 'error', {'error': f'Profiel {profile} nog niet beschikbaar in deze versie'}
+                return
+
+            geocode_deadline = deadline.child(GEOCODE_DEADLINE_SHARE) if deadline else None
+            with activate(geocode_deadline):
+                location = await self.geocode_address(address)
+            if not location:
+                if geocode_deadline and geocode_deadline.expired():
+                    yield 'error', {'error': 'Tijdslimiet verstreken tijdens geocoding', 'incomplete': True}
+                else:
+                    yield 'error', {'error': 'Adres niet gevonden'}
+                return
+
+            lat, lng = location['lat'], location['lng']
+            yield 'geocode', {'address': address, 'location': location}
+
+            completed = await asyncio.to_thread(
+                self.calculator.lookup_cached_scores, lat, lng, profile, category_fields)
+            record_score = False
+            if completed is not None:
+                for category, (entry, category_score) in completed.items():
+                    yield 'category', dict(entry, category=category)
+            else:
+                completed = {}
+                failed = set()
+                async for category, entry, category_score in self.iter_category_scores(
+                        lat, lng, profile, category_fields, deadline, failed):
+                    completed[category] = (entry, category_score)
+                    yield 'category', dict(entry, category=category)
+                record_score = not failed and not self.calculator.missing_categories(profile, completed)
+                if category_fields is None and record_score:
+                    await asyncio.to_thread(self.calculator.store_cached_scores, lat, lng, profile, completed)
+
+            # Percentiel en verdeling werken in het geheugen; geen I/O op de event loop
+            yield 'result', self.calculator.build_result(address, profile, location, completed, result_fields,
+                                                         record_score)
+
+        except Exception as e:
+            print(f"Score berekening fout: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            yield 'error', {'error': f'Berekening gefaald: {str(e)}'}
+
+    async def calculate_proxima_score(self, address, profile='algemeen', result_fields=None, category_fields=None,
+                                      deadline=None):
+        result = {'error': 'Berekening gefaald'}
+        async for event, data in self.iter_proxima_score_events(address, profile, result_fields, category_fields,
+                                                                deadline):
+            if event in ('result', 'error'):
+                result = data
+        return result
+
+
+def _header(scope, name):
+    """Eerste waarde van een request header, of None"""
+    name = name.lower().encode('latin-1')
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _query_args(scope):
+    """Query string als dict; net als Flask's request.args telt de eerste waarde"""
+    args = {}
+    for key, value in parse_qsl(scope['query_string'].decode('latin-1')):
+        args.setdefault(key, value)
+    return args
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_response(send, status, headers, body):
+    headers = dict(headers)
+    if status != 304:
+        headers['Content-Length'] = str(len(body))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(key.lower().encode('latin-1'), value.encode('latin-1')) for key, value in headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class ProximaScoreASGI:
+    """ASGI app: scoring routes async, de rest via de Flask app"""
+
+    def __init__(self, flask_app, scorer):
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.scorer = scorer
+        self.started = False
+        self._start_lock = asyncio.Lock()
+        self.routes = {
+            ('GET', '/api/calculate'): self.calculate_score,
+            ('POST', '/api/calculate'): self.calculate_score,
+            ('GET', '/api/calculate/stream'): self.calculate_score_stream,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        handler = None
+        if scope['type'] == 'http' and not self.wants_profile(scope):
+            handler = self.routes.get((scope['method'], scope['path']))
+        if handler is None:
+            await self.wsgi(scope, receive, send)
+            return
+
+        # Servers zonder lifespan ondersteuning: client bij het eerste request starten
+        if not self.started:
+            async with self._start_lock:
+                if not self.started:
+                    await self.scorer.start()
+                    self.started = True
+        await handler(scope, receive, send)
+
+    def wants_profile(self, scope):
+        """Geprofilede requests lopen via de Flask route, waar de profiler hooks zitten"""
+        if not PROFILING_TOKEN:
+            return False
+        return bool(_header(scope, 'X-Profile-Token') or b'profile_token=' in scope['query_string'])
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.scorer.start()
+                self.started = True
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.started:
+                    await self.scorer.close()
+                    self.started = False
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def send_json(self, send, status, payload):
+        # Alleen voor foutmeldingen: die horen niet in een (gedeelde) cache
+        await _send_response(send, status, {
+            'Content-Type': 'application/json',
+            'Cache-Control': 'no-store',
+            'Access-Control-Allow-Origin': '*',
+        }, dumps_json(payload))
+
+    async def calculate_score(self, scope, receive, send):
+        """Async /api/calculate; zelfde gedrag en headers als de Flask route"""
+        try:
+            if scope['method'] == 'POST':
+                try:
+                    data = json.loads(await _read_body(receive) or b'{}')
+                except ValueError:
+                    data = {}
+                if not isinstance(data, dict):
+                    data = {}
+            else:
+                data = _query_args(scope)
+            address = (data.get('address') or '').strip()
+            profile = data.get('profile', 'algemeen')
+
+            print(f"\nAPI CALL (async): /api/calculate")
+            print(f"Adres: {address}")
+            print(f"Profiel: {profile}")
+
+            if not address:
+                await self.send_json(send, 400, {'error': 'Adres is verplicht'})
+                return
+
+            try:
+                result_fields, category_fields = parse_fields(data)
+            except ValueError as e:
+                await self.send_json(send, 400, {'error': str(e)})
+                return
+
+            deadline = request_deadline(ROUTE_DEADLINES, 'calculate_score', _header(scope, 'X-Deadline-Ms'))
+            result = await self.scorer.calculate_proxima_score(
+                address, profile, result_fields, category_fields, deadline)
+
+            if 'error' in result:
+                print(f"API ERROR: {result['error']}")
+                await self.send_json(send, 504 if result.get('incomplete') else 400, result)
+                return
+
+            print(f"API SUCCESS: Score {result.get('total_score')}")
+            stable = {key: value for key, value in result.items() if key != 'calculated_at'}
+            status, headers, body = conditional_body(
+                scope['method'],
+                _header(scope, 'If-None-Match'),
+                _header(scope, 'Accept-Encoding'),
+                dumps_json(result),
+                'application/json',
+                # Onvolledig: geen stabiele ETag, de volgende poging kan wel alles halen
+                etag=None if result.get('incomplete') else content_etag(dumps_json(stable, sort_keys=True)),
+                weak=True,
+                min_compress_size=COMPRESS_MIN_BYTES,
+            )
+            if status != 304:
+                headers['Content-Type'] = 'application/json'
+            if result.get('incomplete'):
+                headers['Cache-Control'] = 'no-store'
+            elif scope['method'] == 'POST':
+                headers['Cache-Control'] = CALCULATE_POST_CACHE_CONTROL
+            else:
+                headers['Cache-Control'] = CACHE_CONTROL_POLICIES['calculate_score']
+            headers['Access-Control-Allow-Origin'] = '*'
+            await _send_response(send, status, headers, body)
+
+        except Exception as e:
+            print(f"API EXCEPTION: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            await self.send_json(send, 500, {'error': 'Interne serverfout'})
+
+    async def calculate_score_stream(self, scope, receive, send):
+        """Async /api/calculate/stream (Server-Sent Events)"""
+        args = _query_args(scope)
+        address = args.get('address', '').strip()
+        profile = args.get('profile', 'algemeen')
+
+        print(f"\nAPI CALL (async): /api/calculate/stream")
+        print(f"Adres: {address}")
+        print(f"Profiel: {profile}")
+
+        if not address:
+            await self.send_json(send, 400, {'error': 'Adres is verplicht'})
+            return
+
+        try:
+            result_fields, category_fields = parse_fields(args)
+        except ValueError as e:
+            await self.send_json(send, 400, {'error': str(e)})
+            return
+
+        deadline = request_deadline(ROUTE_DEADLINES, 'calculate_score_stream', _header(scope, 'X-Deadline-Ms'))
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                (b'access-control-allow-origin', b'*'),
+            ],
+        })
+
+        async def stream():
+            async for event, data in self.scorer.iter_proxima_score_events(
+                    address, profile, result_fields, category_fields, deadline):
+                chunk = f"event: {event}\ndata: {dumps_json(data).decode('utf-8')}\n\n"
+                await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        # Sluit de client de verbinding, dan stoppen we ook met rekenen
+        streamer = asyncio.ensure_future(stream())
+        watcher = asyncio.ensure_future(disconnected())
+        done, pending = await asyncio.wait({streamer, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if streamer in done:
+            streamer.result()
+        else:
+            print(f"Stream afgebroken door client: {address}")
+
+
+application = ProximaScoreASGI(flask_app, AsyncProximaScoreCalculator(calculator))
@@ -30,6 +30,55 @@ document.addEventListener('DOMContentLoaded', function() {
         showLoading();
         calculateBtn.disabled = true;
         
+        // Progressief renderen via Server-Sent Events, anders de gewone JSON call
+        if (window.EventSource) {
+            streamProximaScore(address, profile);
+            return;
+        }
+        
+        await fetchProximaScore(address, profile);
+    }
+    
+    function streamProximaScore(address, profile) {
+        const params = new URLSearchParams({ address: address, profile: profile });
+        const source = new EventSource(`/api/calculate/stream?${params}`);
+        let receivedEvents = false;
+        
+        source.addEventListener('geocode', function(e) {
+            receivedEvents = true;
+            const data = JSON.parse(e.data);
+            showPartialResults(data);
+        });
+        
+        source.addEventListener('category', function(e) {
+            const category = JSON.parse(e.data);
+            const categoriesContainer = document.getElementById('categoriesContainer');
+            categoriesContainer.appendChild(createCategoryElement(category.category, category));
+        });
+        
+        source.addEventListener('result', function(e) {
+            source.close();
+            displayResults(JSON.parse(e.data));
+            calculateBtn.disabled = false;
+        });
+        
+        source.addEventListener('error', function(e) {
+            source.close();
+            if (e.data) {
+                // Foutmelding van de server
+                showError(JSON.parse(e.data).error || 'Onbekende fout');
+                calculateBtn.disabled = false;
+            } else if (!receivedEvents) {
+                // Stream niet beschikbaar (proxy, oude server): terugvallen op JSON
+                fetchProximaScore(address, profile);
+            } else {
+                showError('Verbinding met de server verbroken');
+                calculateBtn.disabled = false;
+            }
+        });
+    }
+    
+    async function fetchProximaScore(address, profile) {
         try {
             const response = await fetch('/api/calculate', {
                 method: 'POST',
@@ -58,6 +107,17 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    function showPartialResults(data) {
+        hideAllSections();
+        resultsSection.style.display = 'block';
+        
+        document.getElementById('totalScore').textContent = '...';
+        document.getElementById('scoreLocation').textContent = data.address;
+        document.getElementById('scoreProfile').textContent = 'Voorzieningen worden opgezocht...';
+        document.getElementById('categoriesContainer').innerHTML = '';
+        document.getElementById('technicalDetails').innerHTML = '';
+    }
+    
     function displayResults(data) {
         hideAllSections();
         resultsSection.style.display = 'block';
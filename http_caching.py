@@ -0,0 +1,139 @@
+"""
+HTTP caching voor de ProximaScore API
+ETags op basis van de inhoud (met 304 bij If-None-Match), Cache-Control per
+route en gzip/brotli compressie voor grotere JSON responses.
+"""
+
+import gzip
+import hashlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+
+def content_etag(data):
+    """ETag waarde voor een stuk inhoud (bytes of str)"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:20]
+
+
+def _choose_encoding(accept_encoding):
+    """Beste beschikbare compressie volgens de Accept-Encoding header"""
+    accepted = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip())
+    if brotli and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _etag_matches(if_none_match, etag):
+    """Vergelijk If-None-Match met een ETag, inclusief gecomprimeerde varianten"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == etag or candidate.rsplit('-', 1)[0] == etag:
+            return True
+    return False
+
+
+def _format_etag(etag, weak):
+    return f'W/"{etag}"' if weak else f'"{etag}"'
+
+
+def conditional_body(method, if_none_match, accept_encoding, body, mimetype,
+                     etag=None, weak=False, min_compress_size=1024):
+    """
+    Pas ETag, 304 en compressie toe op een 200 response body, los van het framework.
+    Geeft (status, extra headers, body) terug; gebruikt door Flask en de ASGI modus.
+    """
+    if not etag:
+        etag, weak = content_etag(body), False
+    headers = {'Vary': 'Accept-Encoding'}
+
+    # Conditional request: alleen GET en HEAD mogen een 304 krijgen
+    if method in ('GET', 'HEAD') and _etag_matches(if_none_match, etag):
+        headers['ETag'] = _format_etag(etag, weak)
+        return 304, headers, b''
+
+    encoding = None
+    if len(body) >= min_compress_size and mimetype in COMPRESSIBLE_MIMETYPES:
+        encoding = _choose_encoding(accept_encoding or '')
+
+    if encoding == 'br':
+        body = brotli.compress(body, quality=5)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=6)
+
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        # Gecomprimeerde representatie krijgt een eigen ETag
+        headers['ETag'] = _format_etag(f"{etag}-{encoding}", weak)
+    else:
+        headers['ETag'] = _format_etag(etag, weak)
+    return 200, headers, body
+
+
+def init_http_caching(app, policies, min_compress_size=1024):
+    """
+    Registreer de caching hook op een Flask app.
+    policies: {endpoint naam: Cache-Control waarde}
+    """
+
+    @app.after_request
+    def apply_http_caching(response):
+        # Streams (SSE) en bestanden (static) niet aanraken
+        if response.is_streamed or response.direct_passthrough:
+            return response
+
+        policy = policies.get(request.endpoint)
+        if policy and 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = policy
+
+        if response.status_code != 200 or 'Content-Encoding' in response.headers:
+            return response
+
+        etag, weak = response.get_etag()
+        status, headers, body = conditional_body(
+            request.method,
+            request.headers.get('If-None-Match'),
+            request.headers.get('Accept-Encoding'),
+            response.get_data(),
+            response.mimetype,
+            etag=etag,
+            weak=weak,
+            min_compress_size=min_compress_size,
+        )
+
+        response.status_code = status
+        response.set_data(body)
+        response.headers.update(headers)
+        if status == 304:
+            response.headers.pop('Content-Length', None)
+            response.headers.pop('Content-Type', None)
+        return response
+
+    return apply_http_caching
@@ -0,0 +1,359 @@
+"""
+Duurzame job queue voor lange ProximaScore berekeningen
+Jobs (bijv. een hele portefeuille adressen scoren) worden in data/jobs.db
+gezet en door een aparte pool van worker processen uitgevoerd, zodat ze
+nooit een HTTP worker bezet houden. Ondersteunt prioriteiten, retries met
+backoff, een limiet op het aantal gelijktijdig lopende jobs en het laten
+verlopen van resultaten.
+
+Workers starten:
+    python job_queue.py worker --processes 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+JOB_DB = os.environ.get('JOB_DB', 'data/jobs.db')
+# Maximaal aantal jobs dat tegelijk loopt, over alle worker processen samen
+JOB_MAX_RUNNING = int(os.environ.get('JOB_MAX_RUNNING', 2))
+JOB_MAX_ATTEMPTS = 3
+# Wachttijd voor een retry: JOB_RETRY_DELAY * 2^(poging - 1) seconden
+JOB_RETRY_DELAY = 30
+# Resultaten blijven zo lang opvraagbaar na afronding
+JOB_RESULT_TTL = timedelta(hours=int(os.environ.get('JOB_RESULT_TTL_HOURS', 24)))
+# Een lopende job zonder heartbeat zo lang is van een gecrashte worker
+JOB_STALE_SECONDS = 300
+# Workers draaien met lagere CPU prioriteit dan de web processen
+JOB_WORKER_NICE = 10
+JOB_MAX_ADDRESSES = 1000
+JOB_PRIORITIES = range(0, 10)
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed', 'expired')
+
+
+class JobQueue:
+    """SQLite backed queue; veilig te gebruiken vanuit meerdere processen"""
+
+    def __init__(self, db_path=JOB_DB, max_running=JOB_MAX_RUNNING):
+        self.db_path = Path(db_path)
+        self.max_running = max_running
+        self.init_database()
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        self.db_path.parent.mkdir(exist_ok=True)
+        with self.connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    created_at TIMESTAMP NOT NULL,
+                    available_at TIMESTAMP NOT NULL,
+                    started_at TIMESTAMP,
+                    heartbeat_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    expires_at TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS jobs_claim
+                ON jobs (status, priority DESC, created_at)
+            ''')
+
+    def submit(self, kind, payload, priority=0, max_attempts=JOB_MAX_ATTEMPTS, total=0):
+        """Zet een job in de queue en geef het job id terug"""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Onbekend job type: {kind}")
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"Prioriteit moet tussen {JOB_PRIORITIES.start} en {JOB_PRIORITIES.stop - 1} liggen")
+
+        job_id = uuid.uuid4().hex
+        now = datetime.now()
+        with self.connect() as conn:
+            conn.execute('''
+                INSERT INTO jobs (id, kind, payload, priority, max_attempts, total, created_at, available_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (job_id, kind, json.dumps(payload), priority, max_attempts, total, now, now))
+        print(f"Job {job_id} ({kind}) in queue, prioriteit {priority}")
+        return job_id
+
+    def claim(self, worker):
+        """
+        Pak de volgende job (hoogste prioriteit, oudste eerst) als er nog ruimte is
+        onder max_running. Geeft een dict met de job terug, of None.
+        """
+        now = datetime.now()
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            self._requeue_stale(conn, now)
+
+            running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+            if running >= self.max_running:
+                conn.execute('COMMIT')
+                return None
+
+            row = conn.execute('''
+                SELECT * FROM jobs
+                WHERE status = 'queued' AND available_at <= ?
+                ORDER BY priority DESC, created_at
+                LIMIT 1
+            ''', (now,)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+
+            conn.execute('''
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?,
+                    started_at = ?, heartbeat_at = ?, error = NULL
+                WHERE id = ?
+            ''', (worker, now, now, row['id']))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['attempts'] += 1
+        return job
+
+    def _requeue_stale(self, conn, now):
+        """Jobs van gecrashte workers terug in de queue (telt als poging)"""
+        stale = conn.execute('''
+            UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                error = 'Worker gestopt zonder resultaat', worker = NULL,
+                finished_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END,
+                expires_at = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END
+            WHERE status = 'running' AND heartbeat_at < ?
+        ''', (now, now + JOB_RESULT_TTL, now - timedelta(seconds=JOB_STALE_SECONDS))).rowcount
+        if stale:
+            print(f"{stale} vastgelopen job(s) opnieuw in de queue gezet")
+
+    # Schrijven mag alleen de worker die de job nu heeft: een job zonder heartbeat kan
+    # al opnieuw geclaimd zijn terwijl de oude worker nog doorloopt
+    OWNED = "id = ? AND worker = ? AND status = 'running'"
+
+    def update_progress(self, job_id, worker, progress, total=None):
+        """Voortgang bijwerken; geldt ook als heartbeat. False als de job niet meer van worker is"""
+        with self.connect() as conn:
+            if total is None:
+                updated = conn.execute(f'UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE {self.OWNED}',
+                                       (progress, datetime.now(), job_id, worker)).rowcount
+            else:
+                updated = conn.execute(
+                    f'UPDATE jobs SET progress = ?, total = ?, heartbeat_at = ? WHERE {self.OWNED}',
+                    (progress, total, datetime.now(), job_id, worker)
+                ).rowcount
+        return updated > 0
+
+    def complete(self, job_id, worker, result):
+        """Resultaat opslaan; genegeerd (False) als de job inmiddels van een andere worker is"""
+        now = datetime.now()
+        with self.connect() as conn:
+            updated = conn.execute(f'''
+                UPDATE jobs SET status = 'done', result = ?, progress = total,
+                    finished_at = ?, expires_at = ?
+                WHERE {self.OWNED}
+            ''', (json.dumps(result), now, now + JOB_RESULT_TTL, job_id, worker)).rowcount
+        if not updated:
+            print(f"Job {job_id} is niet meer van {worker}, resultaat genegeerd")
+            return False
+        print(f"Job {job_id} klaar")
+        return True
+
+    def fail(self, job_id, worker, error):
+        """
+        Registreer een fout: opnieuw proberen met backoff, of definitief gefaald.
+        Genegeerd (False) als de job inmiddels van een andere worker is.
+        """
+        now = datetime.now()
+        with self.connect() as conn:
+            row = conn.execute(f'SELECT attempts, max_attempts FROM jobs WHERE {self.OWNED}',
+                               (job_id, worker)).fetchone()
+            if row is not None and row['attempts'] < row['max_attempts']:
+                delay = JOB_RETRY_DELAY * 2 ** (row['attempts'] - 1)
+                updated = conn.execute(f'''
+                    UPDATE jobs SET status = 'queued', error = ?, worker = NULL, available_at = ?
+                    WHERE {self.OWNED}
+                ''', (error, now + timedelta(seconds=delay), job_id, worker)).rowcount
+                message = f"fout (poging {row['attempts']}), opnieuw over {delay}s: {error}"
+            elif row is not None:
+                updated = conn.execute(f'''
+                    UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, expires_at = ?
+                    WHERE {self.OWNED}
+                ''', (error, now, now + JOB_RESULT_TTL, job_id, worker)).rowcount
+                message = f"definitief gefaald: {error}"
+            else:
+                updated = 0
+        if not updated:
+            print(f"Job {job_id} is niet meer van {worker}, fout genegeerd: {error}")
+            return False
+        print(f"Job {job_id} {message}")
+        return True
+
+    def expire_results(self):
+        """Resultaten voorbij hun bewaartermijn weggooien; de job blijft als 'expired' bestaan"""
+        with self.connect() as conn:
+            expired = conn.execute('''
+                UPDATE jobs SET status = 'expired', result = NULL, payload = '{}'
+                WHERE status IN ('done', 'failed') AND expires_at < ?
+            ''', (datetime.now(),)).rowcount
+        if expired:
+            print(f"{expired} job resultaten verlopen")
+        return expired
+
+    def get(self, job_id, include_result=False):
+        """Status en voortgang van een job als dict, of None als die niet bestaat"""
+        with self.connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'priority': row['priority'],
+            'progress': row['progress'],
+            'total': row['total'],
+            'attempts': row['attempts'],
+            'max_attempts': row['max_attempts'],
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'expires_at': row['expires_at'],
+        }
+        if include_result:
+            job['result'] = json.loads(row['result']) if row['result'] else None
+        return job
+
+    def get_stats(self):
+        with self.connect() as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+
+def run_batch_score(calculator, payload, report_progress):
+    """
+    Score een lijst adressen; nabije adressen delen hun POI lookups (zie
+    proximascore/batch_planner.py). Een adres dat niet lukt komt met zijn
+    fout in het resultaat; de job als geheel faalt alleen bij een onverwachte fout.
+    """
+    from api_serialization import parse_fields
+    from proximascore.batch_planner import BatchPlanner
+
+    addresses = payload['addresses']
+    profile = payload.get('profile', 'algemeen')
+    result_fields, category_fields = parse_fields(payload)
+
+    results, planning = BatchPlanner(calculator).score_addresses(
+        addresses, profile, result_fields, category_fields, report_progress
+    )
+    results = [dict(result, address=address) for result, address in zip(results, addresses)]
+
+    return {
+        'profile': profile,
+        'count': len(results),
+        'failed': sum(1 for result in results if 'error' in result),
+        'planning': planning,
+        'results': results,
+    }
+
+
+# job type -> handler(calculator, payload, report_progress) -> resultaat
+JOB_HANDLERS = {
+    'batch_score': run_batch_score,
+}
+
+
+def run_worker(db_path=JOB_DB, poll_interval=2.0, max_running=JOB_MAX_RUNNING):
+    """Worker loop voor één proces: jobs claimen en uitvoeren tot het proces stopt"""
+    if hasattr(os, 'nice'):
+        os.nice(JOB_WORKER_NICE)
+
+    # Pas hier importeren: de calculator hoort alleen in het worker proces (zonder Flask)
+    from proximascore.config import GOOGLE_API_KEY
+    from proximascore.scorer import ProximaScoreCalculator
+    calculator = ProximaScoreCalculator(GOOGLE_API_KEY)
+
+    queue = JobQueue(db_path, max_running=max_running)
+    worker = f"{os.uname().nodename if hasattr(os, 'uname') else 'worker'}:{os.getpid()}"
+    print(f"Job worker {worker} gestart")
+
+    while True:
+        queue.expire_results()
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        print(f"Job {job['id']} ({job['kind']}) gestart, poging {job['attempts']}/{job['max_attempts']}")
+        try:
+            handler = JOB_HANDLERS[job['kind']]
+            result = handler(calculator, job['payload'],
+                             lambda progress, total: queue.update_progress(job['id'], worker, progress, total))
+            queue.complete(job['id'], worker, result)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            queue.fail(job['id'], worker, str(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ProximaScore job workers')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    worker_parser = subparsers.add_parser('worker', help='Start een pool van worker processen')
+    worker_parser.add_argument('--processes', type=int, default=JOB_MAX_RUNNING)
+    worker_parser.add_argument('--poll-interval', type=float, default=2.0)
+    worker_parser.add_argument('--db', default=JOB_DB)
+    subparsers.add_parser('stats', help='Aantal jobs per status')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print(json.dumps(JobQueue().get_stats(), indent=2))
+        return
+
+    JobQueue(args.db).init_database()
+    processes = []
+    for _ in range(args.processes):
+        process = multiprocessing.Process(target=run_worker, args=(args.db, args.poll_interval))
+        process.start()
+        processes.append(process)
+    print(f"{len(processes)} job worker(s) gestart")
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == '__main__':
+    main()
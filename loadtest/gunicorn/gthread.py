@@ -0,0 +1,8 @@
+# Sync workers met threads: meerdere requests per worker, gedeelde calculator per proces
+import os
+
+wsgi_app = 'app:app'
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+timeout = 60
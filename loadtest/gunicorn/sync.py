@@ -0,0 +1,7 @@
+# Standaard productie setup: sync workers, één request per worker tegelijk
+import os
+
+wsgi_app = 'app:app'
+worker_class = 'sync'
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+timeout = 60
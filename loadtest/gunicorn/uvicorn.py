@@ -0,0 +1,7 @@
+# Async serveermodus (asgi.py) onder gunicorn
+import os
+
+wsgi_app = 'asgi:application'
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+timeout = 60
@@ -0,0 +1,168 @@
+"""
+Mock Google Maps upstream voor load tests
+Beantwoordt Geocoding en Nearby Search zoals Google dat doet, met deterministische
+resultaten en instelbare latency, zodat een load test niets kost en herhaalbaar is.
+Start de app met GOOGLE_MAPS_BASE_URL=http://127.0.0.1:<poort> om hier naartoe te wijzen.
+
+    python loadtest/mock_upstream.py --port 8099 --latency-ms 150
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Ruwweg Nederland
+LAT_RANGE = (51.3, 53.3)
+LNG_RANGE = (3.6, 7.0)
+MAX_RESULTS = 8
+
+
+def _unit(*parts):
+    """Deterministisch getal in [0, 1) uit de gegeven onderdelen"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+class MockUpstream:
+    """Antwoorden en tellers; los van de HTTP server te gebruiken"""
+
+    def __init__(self, latency_ms=150, jitter_ms=50, error_rate=0.0, seed=42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = {'geocode': 0, 'nearbysearch': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            delay = self.random.gauss(self.latency_ms, self.jitter_ms)
+            failed = self.random.random() < self.error_rate
+        time.sleep(max(0.0, delay) / 1000)
+        return failed
+
+    def count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def geocode(self, params):
+        address = params.get('address', '')
+        if 'onbekend' in address.lower():
+            return {'status': 'ZERO_RESULTS', 'results': []}
+        lat = LAT_RANGE[0] + _unit('lat', address.lower()) * (LAT_RANGE[1] - LAT_RANGE[0])
+        lng = LNG_RANGE[0] + _unit('lng', address.lower()) * (LNG_RANGE[1] - LNG_RANGE[0])
+        return {
+            'status': 'OK',
+            'results': [{
+                'formatted_address': f"{address.title()}, Nederland",
+                'geometry': {'location': {'lat': round(lat, 7), 'lng': round(lng, 7)}},
+            }],
+        }
+
+    def nearby_search(self, params):
+        lat, lng = (float(value) for value in params['location'].split(','))
+        place_type = params.get('type', '')
+        radius = float(params['radius']) if params.get('radius') else None
+        # Resultaten hangen af van de buurt (~1 km raster) en het type, niet van het exacte punt
+        cell = (round(lat, 2), round(lng, 2), place_type)
+        count = int(_unit('count', *cell) * (MAX_RESULTS + 1))
+
+        results = []
+        for index in range(count):
+            distance = 40 + _unit('distance', index, *cell) ** 2 * 3000
+            if radius and distance > radius:
+                continue
+            bearing = _unit('bearing', index, *cell) * 2 * math.pi
+            results.append({
+                'name': f"{place_type.replace('_', ' ').title()} {index + 1}",
+                'vicinity': f"Mockstraat {index + 1}",
+                'geometry': {'location': {
+                    'lat': lat + distance * math.cos(bearing) / 111320,
+                    'lng': lng + distance * math.sin(bearing) / (111320 * math.cos(math.radians(lat))),
+                }},
+                'rating': round(3 + _unit('rating', index, *cell) * 2, 1),
+                'user_ratings_total': int(_unit('reviews', index, *cell) * 500),
+                'types': [place_type, 'point_of_interest', 'establishment'],
+                '_distance': distance,
+            })
+
+        if params.get('rankby') == 'distance':
+            results.sort(key=lambda result: result['_distance'])
+        for result in results:
+            del result['_distance']
+        return {'status': 'OK' if results else 'ZERO_RESULTS', 'results': results}
+
+
+def make_handler(upstream):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+            if url.path == '/stats':
+                return self.send_json(200, dict(upstream.calls))
+            if url.path.endswith('/geocode/json'):
+                name, answer = 'geocode', upstream.geocode
+            elif url.path.endswith('/place/nearbysearch/json'):
+                name, answer = 'nearbysearch', upstream.nearby_search
+            else:
+                return self.send_json(404, {'status': 'NOT_FOUND'})
+
+            upstream.count(name)
+            if upstream.delay():
+                upstream.count('errors')
+                return self.send_json(200, {'status': 'OVER_QUERY_LIMIT', 'results': []})
+            self.send_json(200, answer(params))
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_mock_upstream(port=0, **options):
+    """Start de mock in een achtergrond thread; geeft (server, upstream) terug"""
+    upstream = MockUpstream(**options)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(upstream))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, upstream
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Google Maps upstream')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    upstream = MockUpstream(args.latency_ms, args.jitter_ms, args.error_rate)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(upstream))
+    server.daemon_threads = True
+    print(f"Mock upstream op http://127.0.0.1:{args.port} (latency {args.latency_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Calls: {upstream.calls}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Load test voor /api/calculate
+Speelt een adres/profiel trace af met een vast aankomstpatroon (open loop: nieuwe
+requests komen binnen ongeacht of de vorige klaar zijn) en verhoogt de
+aankomstsnelheid stap voor stap. Per stap: doorvoer, latency percentielen en
+foutpercentage; het saturatiepunt is de eerste stap waar de server het aanbod
+niet meer bijhoudt, te veel fouten geeft of de p99 boven de SLO komt.
+
+Tegen een draaiende server:
+    python loadtest/run.py --target http://127.0.0.1:5000 --rates 2,5,10,20
+
+Per gunicorn configuratie (start zelf de mock upstream en de server):
+    python loadtest/run.py --configs sync,gthread,uvicorn --rates 5,10,20,40,80
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(LOADTEST_DIR)
+sys.path.insert(0, LOADTEST_DIR)
+
+from mock_upstream import start_mock_upstream  # noqa: E402
+from traces import load_trace, synthetic_trace  # noqa: E402
+
+GUNICORN_CONFIGS = {
+    name[:-3]: os.path.join(LOADTEST_DIR, 'gunicorn', name)
+    for name in sorted(os.listdir(os.path.join(LOADTEST_DIR, 'gunicorn')))
+    if name.endswith('.py')
+}
+
+# Saturatie: doorvoer onder dit deel van het aanbod, of meer fouten dan dit
+SATURATION_THROUGHPUT = 0.9
+SATURATION_ERROR_RATE = 0.01
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class TraceCursor:
+    """Loopt rond door de trace; elke stap gaat verder waar de vorige stopte"""
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.position = 0
+
+    def next(self):
+        entry = self.trace[self.position % len(self.trace)]
+        self.position += 1
+        return entry
+
+
+async def run_step(client, cursor, rate, duration, concurrency, params, timeout):
+    """Eén stap met Poisson aankomsten op `rate` per seconde gedurende `duration` seconden"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    completions = []
+    outcomes = {'ok': 0, 'http_error': 0, 'timeout': 0, 'connection_error': 0}
+    rng = random.Random(int(rate * 1000))
+
+    async def fire(entry, scheduled):
+        async with semaphore:
+            try:
+                response = await client.get('/api/calculate', params=dict(params, **entry), timeout=timeout)
+                outcome = 'ok' if response.status_code == 200 else 'http_error'
+            except httpx.TimeoutException:
+                outcome = 'timeout'
+            except httpx.TransportError:
+                outcome = 'connection_error'
+        # Latency vanaf het geplande aankomstmoment: wachten op een vrije plek telt mee
+        finished = time.perf_counter()
+        latencies.append(finished - scheduled)
+        outcomes[outcome] += 1
+        if outcome == 'ok':
+            completions.append(finished)
+
+    start = time.perf_counter()
+    next_arrival = start
+    arrivals = []
+    tasks = []
+    while next_arrival < start + duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        arrivals.append(next_arrival)
+        tasks.append(asyncio.ensure_future(fire(cursor.next(), next_arrival)))
+        next_arrival += rng.expovariate(rate)
+
+    await asyncio.gather(*tasks)
+
+    total = len(tasks)
+    errors = total - outcomes['ok']
+    return {
+        'offered_rps': rate,
+        'requests': total,
+        # Werkelijke aankomsten wijken bij Poisson af van de nominale snelheid
+        'arrival_rps': round(_rate(arrivals), 2),
+        # Afrondingen per seconde tussen de eerste en laatste; houdt de server het niet bij,
+        # dan loopt dit venster uit en zakt de doorvoer naar zijn capaciteit
+        'throughput_rps': round(_rate(completions), 2),
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'outcomes': outcomes,
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p90_ms': _ms(percentile(latencies, 0.90)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'max_ms': _ms(max(latencies) if latencies else None),
+    }
+
+
+def _rate(timestamps):
+    if len(timestamps) < 2:
+        return 0.0
+    timestamps = sorted(timestamps)
+    return (len(timestamps) - 1) / max(timestamps[-1] - timestamps[0], 1e-9)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def is_saturated(step, slo_p99_ms):
+    if step['throughput_rps'] < SATURATION_THROUGHPUT * step['arrival_rps']:
+        return 'doorvoer'
+    if step['error_rate'] > SATURATION_ERROR_RATE:
+        return 'fouten'
+    if slo_p99_ms and step['p99_ms'] is not None and step['p99_ms'] > slo_p99_ms:
+        return 'p99'
+    return None
+
+
+async def run_curve(target, trace, rates, duration, concurrency, params, timeout, slo_p99_ms):
+    cursor = TraceCursor(trace)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    steps = []
+    saturation = None
+    async with httpx.AsyncClient(base_url=target, limits=limits) as client:
+        for rate in rates:
+            step = await run_step(client, cursor, rate, duration, concurrency, params, timeout)
+            step['saturated'] = is_saturated(step, slo_p99_ms)
+            steps.append(step)
+            print_step(step)
+            if step['saturated'] and saturation is None:
+                saturation = {'offered_rps': rate, 'reason': step['saturated']}
+                # Nog één stap erboven laat zien hoe het daarna verloopt; verder heeft geen zin
+                if rate != rates[-1]:
+                    next_rate = rates[rates.index(rate) + 1]
+                    step = await run_step(client, cursor, next_rate, duration, concurrency, params, timeout)
+                    step['saturated'] = is_saturated(step, slo_p99_ms)
+                    steps.append(step)
+                    print_step(step)
+                break
+
+    return {
+        'steps': steps,
+        'saturation': saturation,
+        'max_sustained_rps': max(
+            (step['throughput_rps'] for step in steps if not step['saturated']), default=0.0),
+    }
+
+
+def print_step(step):
+    print(f"  {step['offered_rps']:>7.1f} req/s aangeboden | {step['throughput_rps']:>7.2f} req/s ok | "
+          f"p50 {step['p50_ms']} ms  p90 {step['p90_ms']} ms  p99 {step['p99_ms']} ms | "
+          f"fouten {step['error_rate']:.1%}" + (f" | VERZADIGD ({step['saturated']})" if step['saturated'] else ''))
+
+
+def wait_for_health(url, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server gestopt met exit code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/api/health", timeout=2).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server niet bereikbaar binnen {timeout}s")
+
+
+def start_server(config_path, port, upstream_url, log_path):
+    """Start gunicorn in een lege werkmap, zodat de test nooit de echte data/ cache raakt"""
+    workdir = tempfile.mkdtemp(prefix='proximascore-loadtest-')
+    env = dict(os.environ,
+               GOOGLE_MAPS_BASE_URL=upstream_url,
+               GOOGLE_API_KEY='loadtest',
+               GOOGLE_PLACES_API_KEY='loadtest',
+               PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    env.pop('CACHE_SNAPSHOT_PATH', None)
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config_path, '--bind', f'127.0.0.1:{port}'],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, workdir, log
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test voor /api/calculate')
+    parser.add_argument('--target', help='URL van een draaiende server (anders --configs)')
+    parser.add_argument('--configs', default='sync',
+                        help=f"Komma gescheiden gunicorn configuraties: {', '.join(GUNICORN_CONFIGS)}")
+    parser.add_argument('--trace', help='Trace bestand (JSON Lines); standaard een synthetische trace')
+    parser.add_argument('--rates', default='1,2,5,10,20,40', help='Aankomstsnelheden in req/s, oplopend')
+    parser.add_argument('--step-duration', type=float, default=30, help='Seconden per stap')
+    parser.add_argument('--concurrency', type=int, default=256, help='Maximaal aantal openstaande requests')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--slo-p99-ms', type=float, default=5000)
+    parser.add_argument('--compact', action='store_true', help='Vraag compacte resultaten op')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--upstream-latency-ms', type=float, default=150)
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0)
+    parser.add_argument('--output', help='Schrijf alle resultaten als JSON naar dit bestand')
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(requests=5000, unique=1500)
+    rates = [float(rate) for rate in args.rates.split(',')]
+    params = {'compact': '1'} if args.compact else {}
+    curve_args = (trace, rates, args.step_duration, args.concurrency, params, args.timeout, args.slo_p99_ms)
+    results = {}
+
+    if args.target:
+        print(f"Load test tegen {args.target}")
+        results[args.target] = asyncio.run(run_curve(args.target, *curve_args))
+    else:
+        server, upstream = start_mock_upstream(latency_ms=args.upstream_latency_ms,
+                                               error_rate=args.upstream_error_rate)
+        upstream_url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"Mock upstream: {upstream_url} (latency {args.upstream_latency_ms}ms)")
+
+        for name in args.configs.split(','):
+            if name not in GUNICORN_CONFIGS:
+                parser.error(f"Onbekende configuratie: {name}")
+            log_path = os.path.join(tempfile.gettempdir(), f"proximascore-loadtest-{name}.log")
+            process, workdir, log = start_server(GUNICORN_CONFIGS[name], args.port, upstream_url, log_path)
+            target = f"http://127.0.0.1:{args.port}"
+            calls_before = dict(upstream.calls)
+            try:
+                wait_for_health(target, process)
+                print(f"\nConfiguratie {name} (server log: {log_path})")
+                result = asyncio.run(run_curve(target, *curve_args))
+                result['upstream_calls'] = {
+                    key: upstream.calls[key] - calls_before[key] for key in upstream.calls
+                }
+                results[name] = result
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                log.close()
+                shutil.rmtree(workdir, ignore_errors=True)
+        server.shutdown()
+
+    print("\n=== SAMENVATTING ===")
+    for name, result in results.items():
+        saturation = result['saturation']
+        verdict = (f"verzadigd bij {saturation['offered_rps']} req/s ({saturation['reason']})"
+                   if saturation else "niet verzadigd binnen de geteste snelheden")
+        print(f"{name}: max {result['max_sustained_rps']} req/s volgehouden, {verdict}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f"Resultaten geschreven naar {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Adres/profiel traces voor de load test
+Een trace is een JSON Lines bestand met per regel {"address": ..., "profile": ...}
+in de volgorde waarin de requests binnenkwamen. Herhalingen blijven behouden, zodat
+de cache hit ratio in de test overeenkomt met productie.
+
+    python loadtest/traces.py from-log railway.log loadtest/trace.jsonl
+    python loadtest/traces.py synthetic loadtest/trace.jsonl --requests 5000 --unique 1500
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from proximascore.address_normalizer import canonical_address_key  # noqa: E402
+
+STRATEN = ['Kerkstraat', 'Dorpsstraat', 'Molenweg', 'Schoolstraat', 'Stationsweg',
+           'Markt', 'Nieuwstraat', 'Julianalaan', 'Beatrixstraat', 'Parallelweg']
+PLAATSEN = ['Dongen', 'Tilburg', 'Breda', 'Utrecht', 'Amsterdam', 'Zwolle',
+            'Groningen', 'Eindhoven', 'Nijmegen', 'Leiden', 'Rotterdam', 'Den Haag']
+
+
+def synthetic_address(index):
+    """Vast, niet bestaand-bedoeld adres voor een index"""
+    rng = random.Random(index)
+    return f"{rng.choice(STRATEN)} {index + 1}, {rng.choice(PLAATSEN)}"
+
+
+def anonymize_log(lines):
+    """
+    Haal (adres, profiel) uit de app logs ('API CALL: /api/calculate', 'Adres: ...',
+    'Profiel: ...') en vervang elk echt adres door een synthetisch adres. Varianten
+    van hetzelfde adres (zelfde canonieke sleutel) krijgen hetzelfde synthetische adres.
+    """
+    mapping = {}
+    trace = []
+    in_call = False
+    address = None
+
+    for line in lines:
+        # Railway zet een tijdstempel voor elke regel
+        line = re.sub(r'^\S+\s+(?=API CALL|Adres:|Profiel:)', '', line.strip())
+        if line.startswith('API CALL') and '/api/calculate' in line:
+            in_call, address = True, None
+        elif in_call and line.startswith('Adres:'):
+            address = line[len('Adres:'):].strip()
+        elif in_call and line.startswith('Profiel:'):
+            if address:
+                key = canonical_address_key(address)
+                if key not in mapping:
+                    mapping[key] = synthetic_address(len(mapping))
+                trace.append({'address': mapping[key], 'profile': line[len('Profiel:'):].strip()})
+            in_call = False
+
+    return trace
+
+
+def synthetic_trace(requests, unique, skew=1.1, profiles=None, seed=7):
+    """
+    Trace met een Zipf-achtige populariteit: een klein deel van de adressen komt
+    vaak terug (zoals in productie), de rest één of enkele keren.
+    """
+    profiles = profiles or {'algemeen': 1.0}
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(unique)]
+    profile_names, profile_weights = zip(*profiles.items())
+
+    return [
+        {'address': synthetic_address(index), 'profile': rng.choices(profile_names, profile_weights)[0]}
+        for index in rng.choices(range(unique), weights, k=requests)
+    ]
+
+
+def load_trace(path):
+    with open(path, encoding='utf-8') as trace_file:
+        return [json.loads(line) for line in trace_file if line.strip()]
+
+
+def save_trace(trace, path):
+    with open(path, 'w', encoding='utf-8') as trace_file:
+        for entry in trace:
+            trace_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    print(f"Trace geschreven: {len(trace)} requests, {len({e['address'] for e in trace})} unieke adressen -> {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maak een load test trace')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    from_log = subparsers.add_parser('from-log', help='Geanonimiseerde trace uit app logs')
+    from_log.add_argument('log')
+    from_log.add_argument('output')
+
+    synthetic = subparsers.add_parser('synthetic', help='Synthetische trace met realistische herhalingen')
+    synthetic.add_argument('output')
+    synthetic.add_argument('--requests', type=int, default=2000)
+    synthetic.add_argument('--unique', type=int, default=600)
+    synthetic.add_argument('--skew', type=float, default=1.1)
+    args = parser.parse_args()
+
+    if args.command == 'from-log':
+        with open(args.log, encoding='utf-8', errors='replace') as log_file:
+            save_trace(anonymize_log(log_file), args.output)
+    else:
+        save_trace(synthetic_trace(args.requests, args.unique, args.skew), args.output)
+
+
+if __name__ == '__main__':
+    main()
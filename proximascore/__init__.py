@@ -0,0 +1,46 @@
+"""
+ProximaScore kern: scoreberekening, POI providers, caches en adres normalisatie,
+los te gebruiken zonder de web laag (Flask/ASGI).
+
+    import proximascore
+    calculator = proximascore.ProximaScoreCalculator(proximascore.GOOGLE_API_KEY)
+    calculator.calculate_proxima_score('Dorpsstraat 1, Tilburg', 'gezin')
+
+Namen worden pas bij het eerste gebruik uit hun module geladen: `import proximascore`
+kost vrijwel niets, en wie alleen calculate_distance of de profielen nodig heeft
+laadt geen cache backends, providers of requests. Op de command line:
+python -m proximascore --help.
+"""
+
+import importlib
+
+# Publieke naam -> module waar hij vandaan komt
+_LAZY = {
+    'ProximaScoreCalculator': 'proximascore.scorer',
+    'RelevanceFilter': 'proximascore.relevance',
+    'ALLE_PROFIELEN': 'proximascore.config',
+    'ALLE_VOORZIENINGEN': 'proximascore.config',
+    'GOOGLE_API_KEY': 'proximascore.config',
+    'calculate_distance': 'proximascore.poi_providers',
+    'select_closest_places': 'proximascore.poi_providers',
+    'canonical_address_key': 'proximascore.address_normalizer',
+    'parse_address': 'proximascore.address_normalizer',
+    'create_cache_backend': 'proximascore.cache_backends',
+    'Place': 'proximascore.place_records',
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'proximascore' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    # Volgende keren zonder __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
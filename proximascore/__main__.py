@@ -0,0 +1,138 @@
+"""
+Command line voor de ProximaScore kern, zonder Flask of de web laag
+
+Gebruik:
+    python -m proximascore profiles
+    python -m proximascore categories
+    python -m proximascore distance 51.5555 5.0913 51.5606 5.0919
+    python -m proximascore normalize "Dorpsstraat 1a, 5101 CA Dongen"
+    python -m proximascore score "Dorpsstraat 1, Dongen" --profile gezin [--json]
+    python -m proximascore location 51.5555 5.0913 --profile senior [--json]
+
+Alleen score en location laden de calculator (caches, providers, requests); de
+andere commando's starten binnen enkele tientallen milliseconden. De debug output
+van de berekening gaat naar stderr, zodat --json uitvoer direct te parsen is.
+"""
+
+import argparse
+import json
+import sys
+from contextlib import redirect_stdout
+
+
+def print_json(value):
+    print(json.dumps(value, ensure_ascii=False, indent=2))
+
+
+def print_categories(categories):
+    for category, entry in categories.items():
+        print(f"  {entry['display_name']:<28} {entry['score']:>5.1f}  (gewicht {entry['weight']})")
+
+
+def create_calculator():
+    from proximascore.config import GOOGLE_API_KEY
+    from proximascore.scorer import ProximaScoreCalculator
+    return ProximaScoreCalculator(GOOGLE_API_KEY)
+
+
+def cmd_profiles(args):
+    from proximascore.config import ALLE_PROFIELEN
+    if args.json:
+        return print_json(ALLE_PROFIELEN)
+    for name, profile in ALLE_PROFIELEN.items():
+        weights = ', '.join(f"{category} {weight}" for category, weight in profile['gewichten'].items() if weight)
+        print(f"{name:<10} {profile['display_name']}: {weights}")
+
+
+def cmd_categories(args):
+    from proximascore.config import ALLE_VOORZIENINGEN
+    if args.json:
+        return print_json(ALLE_VOORZIENINGEN)
+    for name, category in ALLE_VOORZIENINGEN.items():
+        print(f"{name:<18} {category['display_name']:<26} {', '.join(category['google_types'])}")
+
+
+def cmd_distance(args):
+    from proximascore.poi_providers import calculate_distance
+    print(f"{calculate_distance(args.lat1, args.lng1, args.lat2, args.lng2):.0f}")
+
+
+def cmd_normalize(args):
+    from proximascore.address_normalizer import canonical_address_key, parse_address
+    result = {'canonical_key': canonical_address_key(args.address), **parse_address(args.address)}
+    if args.json:
+        return print_json(result)
+    for key, value in result.items():
+        print(f"{key:<14} {value if value is not None else '-'}")
+
+
+def cmd_score(args):
+    with redirect_stdout(sys.stderr):
+        result = create_calculator().calculate_proxima_score(args.address, args.profile)
+    if args.json:
+        print_json(result)
+    elif 'error' in result:
+        print(f"Fout: {result['error']}", file=sys.stderr)
+    else:
+        print(f"{result['address']}: {result['total_score']}/100 ({result['profile_display']})")
+        print_categories(result['categories'])
+        if result.get('incomplete'):
+            print(f"  Onvolledig, ontbrekend: {', '.join(result['missing_categories'])}")
+    return 1 if 'error' in result else 0
+
+
+def cmd_location(args):
+    with redirect_stdout(sys.stderr):
+        categories, final_score = create_calculator().score_location(args.lat, args.lng, args.profile)
+    if args.json:
+        return print_json({'location': {'lat': args.lat, 'lng': args.lng}, 'profile': args.profile,
+                           'total_score': round(final_score, 1), 'categories': categories})
+    print(f"{args.lat}, {args.lng}: {final_score:.1f}/100 ({args.profile})")
+    print_categories(categories)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m proximascore', description='ProximaScore command line')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('profiles', help='Profielen en hun gewichten')
+    command.add_argument('--json', action='store_true')
+    command.set_defaults(handler=cmd_profiles)
+
+    command = commands.add_parser('categories', help='Voorzieningen en hun Google types')
+    command.add_argument('--json', action='store_true')
+    command.set_defaults(handler=cmd_categories)
+
+    command = commands.add_parser('distance', help='Afstand in meters tussen twee coordinaten')
+    for name in ('lat1', 'lng1', 'lat2', 'lng2'):
+        command.add_argument(name, type=float)
+    command.set_defaults(handler=cmd_distance)
+
+    command = commands.add_parser('normalize', help='Ontleed een adres en toon de canonieke cache sleutel')
+    command.add_argument('address')
+    command.add_argument('--json', action='store_true')
+    command.set_defaults(handler=cmd_normalize)
+
+    command = commands.add_parser('score', help='ProximaScore voor een adres')
+    command.add_argument('address')
+    command.add_argument('--profile', default='algemeen')
+    command.add_argument('--json', action='store_true')
+    command.set_defaults(handler=cmd_score)
+
+    command = commands.add_parser('location', help='ProximaScore voor een coordinaat (zonder geocoding)')
+    command.add_argument('lat', type=float)
+    command.add_argument('lng', type=float)
+    command.add_argument('--profile', default='algemeen')
+    command.add_argument('--json', action='store_true')
+    command.set_defaults(handler=cmd_location)
+
+    args = parser.parse_args(argv)
+    if args.command in ('score', 'location'):
+        from proximascore.config import ALLE_PROFIELEN
+        if args.profile not in ALLE_PROFIELEN:
+            parser.error(f"onbekend profiel '{args.profile}', kies uit: {', '.join(ALLE_PROFIELEN)}")
+    return args.handler(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
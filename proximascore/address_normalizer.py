@@ -0,0 +1,223 @@
+"""
+Adres normalisatie voor ProximaScore
+Zet Nederlandse adressen om naar een canonieke sleutel, zodat varianten
+als "Markt 1, Dongen" en "markt 1  5101 CM Dongen" dezelfde geocoding cache
+entry delen.
+"""
+
+import re
+import unicodedata
+
+# Verhogen bij elke wijziging die sleutels verandert: aliassen (ruwe schrijfwijze ->
+# sleutel) van een vorige versie worden dan niet meer gebruikt
+NORMALIZER_VERSION = 2
+
+# Lettercombinaties die nooit in een postcode staan: SA, SD en SS worden niet uitgegeven,
+# 'nr' is de afkorting van nummer ("Plein 1944 nr 5")
+NIET_POSTCODE_LETTERS = ('sa', 'sd', 'ss', 'nr')
+
+# Postcode: 4 cijfers (niet beginnend met 0) + 2 letters, met of zonder spatie
+POSTCODE_PATTERN = re.compile(
+    r'\b([1-9]\d{3})\s?(?!(?:' + '|'.join(NIET_POSTCODE_LETTERS) + r')\b)([a-z]{2})\b'
+)
+
+# Landnamen die achteraan een adres kunnen staan en niets toevoegen
+LAND_SUFFIXEN = ('the netherlands', 'netherlands', 'nederland', 'holland', 'nl')
+LAND_PATTERNS = [re.compile(rf'[\s,]*\b{land}\s*$') for land in LAND_SUFFIXEN]
+
+# Huisnummer toevoegingen die als los woord geschreven worden
+WOORD_TOEVOEGINGEN = {
+    'bis', 'hs', 'huis', 'bg', 'bgg', 'beg', 'sous', 'zw', 'rd', 'bv', 'bov', 'boven', 'beneden'
+}
+
+# Korte woorden na een huisnummer die het begin van de plaatsnaam zijn, geen toevoeging
+# ("Markt 1 De Bilt", "Dorpsstraat 2 's-Hertogenbosch", "Kerkweg 3 te Ede")
+GEEN_TOEVOEGING = ('de', 'te', 'en', 'in', 'op', 'nr', 's', 't')
+
+# Afkortingen aan het einde van een straatnaam (kerkstr -> kerkstraat)
+STRAAT_SUFFIXEN = {
+    'str': 'straat',
+    'ln': 'laan',
+    'pln': 'plein',
+    'pl': 'plein',
+    'wg': 'weg',
+    'gr': 'gracht',
+    'kd': 'kade',
+    'sngl': 'singel',
+    'sgl': 'singel',
+}
+
+# Losse afkortingen binnen een straat- of plaatsnaam
+WOORD_AFKORTINGEN = {
+    'st': 'sint',
+    'burg': 'burgemeester',
+    'dr': 'doctor',
+    'prof': 'professor',
+    'mr': 'meester',
+    'ir': 'ingenieur',
+    'v': 'van',
+    'vd': 'van der',
+    'pr': 'prins',
+    'kon': 'koning',
+}
+
+# Plaatsnamen met een gangbare alternatieve schrijfwijze
+PLAATS_ALIASSEN = {
+    'den bosch': 's hertogenbosch',
+    'den haag': 's gravenhage',
+}
+
+# "Plein 1944 nr 5": na 'nr' volgt altijd het huisnummer, ook als de straatnaam een getal bevat.
+# Een toevoeging is een getal, een woord uit WOORD_TOEVOEGINGEN of 1-2 letters met eventueel
+# cijfers ("1a1", "12-B2")
+HUISNUMMER_PATTERN = re.compile(
+    r'^(?:(?P<straat_nr>.*[a-z].*?)\s+(?:nr|no)\s+|(?P<straat>.*?[a-z].*?)\s+)(?P<nummer>\d{1,5})'
+    r'(?:\s*-?\s*(?P<toevoeging>(?!(?:' + '|'.join(GEEN_TOEVOEGING) + r')\b)[a-z]{1,2}\d{0,3}\b|\d{1,4}\b|'
+    + '|'.join(sorted(WOORD_TOEVOEGINGEN, key=len, reverse=True)) +
+    r'\b))?'
+    r'\s*(?P<rest>.*)$'
+)
+
+
+def _basis_normalisatie(tekst):
+    """Kleine letters, accenten weg, leestekens naar spaties"""
+    tekst = unicodedata.normalize('NFKD', tekst.lower())
+    tekst = ''.join(c for c in tekst if not unicodedata.combining(c))
+    # Apostrof (’s-Hertogenbosch) en punten (Kerkstr.) vallen weg
+    tekst = re.sub(r"[’'`.]", ' ', tekst)
+    return tekst
+
+
+def _normaliseer_woorden(tekst, is_straat=False):
+    """Vervang afkortingen en normaliseer witruimte"""
+    woorden = re.sub(r'[^a-z0-9]+', ' ', tekst).split()
+    resultaat = []
+    for index, woord in enumerate(woorden):
+        if woord in WOORD_AFKORTINGEN and index < len(woorden) - 1:
+            resultaat.append(WOORD_AFKORTINGEN[woord])
+        else:
+            resultaat.append(woord)
+
+    if is_straat and resultaat:
+        laatste = resultaat[-1]
+        for afkorting, voluit in STRAAT_SUFFIXEN.items():
+            if laatste == afkorting or (laatste.endswith(afkorting) and len(laatste) > len(afkorting) + 2):
+                resultaat[-1] = laatste[:-len(afkorting)] + voluit
+                break
+        # "kerk straat" en "kerkstraat" zijn hetzelfde adres
+        if len(resultaat) >= 2 and resultaat[-1] in STRAAT_SUFFIXEN.values():
+            resultaat[-2:] = [resultaat[-2] + resultaat[-1]]
+
+    return ' '.join(resultaat)
+
+
+def _verwijder_land(tekst):
+    """Haal een landnaam aan het einde van het adres weg"""
+    for pattern in LAND_PATTERNS:
+        tekst = pattern.sub('', tekst)
+    return tekst
+
+
+def _find_postcode(tekst):
+    """
+    Eerste postcode op een plek waar een postcode kan staan: vooraan ("5101 CA 17"), of na
+    het huisnummer met daarna hooguit de plaatsnaam. Een jaartal in een straatnaam
+    ("Plein 1944 ab 5") staat voor het huisnummer en telt niet.
+    """
+    for match in POSTCODE_PATTERN.finditer(tekst):
+        voor = tekst[:match.start()].strip(' ,')
+        if not voor:
+            return match
+        if re.search(r'\d', voor) and not re.search(r'\d', tekst[match.end():]):
+            return match
+    return None
+
+
+def parse_address(address):
+    """
+    Ontleed een Nederlands adres in straat, huisnummer, toevoeging,
+    postcode en plaats. Onbekende delen zijn None.
+    """
+    tekst = _verwijder_land(_basis_normalisatie(address or '').strip())
+
+    postcode = None
+    match = _find_postcode(tekst)
+    if match:
+        postcode = f"{match.group(1)}{match.group(2).upper()}"
+        tekst = tekst[:match.start()] + ' , ' + tekst[match.end():]
+
+    delen = [deel.strip() for deel in tekst.split(',') if deel.strip()]
+    straat = nummer = toevoeging = None
+    plaats_delen = []
+
+    for deel in delen:
+        deel = re.sub(r'\s+', ' ', deel)
+        if nummer is None:
+            adres_match = HUISNUMMER_PATTERN.match(deel)
+            if adres_match:
+                straat = _normaliseer_woorden(adres_match.group('straat_nr') or adres_match.group('straat'),
+                                              is_straat=True)
+                nummer = adres_match.group('nummer')
+                toevoeging = adres_match.group('toevoeging')
+                rest = adres_match.group('rest').strip(' -')
+                if rest:
+                    plaats_delen.append(rest)
+                continue
+            if postcode and re.fullmatch(r'\d{1,5}', deel):
+                # Alleen postcode + huisnummer opgegeven
+                nummer = deel
+                continue
+        plaats_delen.append(deel)
+
+    plaats = None
+    if plaats_delen:
+        plaats = normalize_place(' '.join(plaats_delen)) or None
+
+    if toevoeging:
+        toevoeging = toevoeging.upper()
+
+    return {
+        'straat': straat,
+        'huisnummer': nummer,
+        'toevoeging': toevoeging,
+        'postcode': postcode,
+        'plaats': plaats,
+    }
+
+
+def normalize_place(plaats):
+    """Genormaliseerde plaatsnaam, zoals in parse_address ('Den Bosch' -> de officiele naam)"""
+    plaats = _normaliseer_woorden(_basis_normalisatie(plaats or ''))
+    return PLAATS_ALIASSEN.get(plaats, plaats)
+
+
+def canonical_address_key(address):
+    """
+    Geef de canonieke cache sleutel voor een adres.
+
+    Straat + huisnummer + plaats is leidend, zodat een adres met en zonder
+    postcode dezelfde sleutel krijgt. Alleen als straat of plaats ontbreekt
+    valt de sleutel terug op postcode + huisnummer. Adressen die niet te
+    ontleden zijn krijgen de genormaliseerde tekst als sleutel.
+    """
+    delen = parse_address(address)
+    nummer = delen['huisnummer']
+    if nummer and delen['toevoeging']:
+        nummer = f"{nummer}-{delen['toevoeging']}"
+
+    if delen['straat'] and nummer and delen['plaats']:
+        return f"{delen['straat']} {nummer}, {delen['plaats']}"
+    if delen['postcode'] and nummer:
+        return f"{delen['postcode']} {nummer}"
+
+    return search_text(address)
+
+
+def search_text(address):
+    """
+    Genormaliseerde tekst voor prefix zoeken (autocomplete): kleine letters, zonder
+    accenten, leestekens en land. Anders dan de canonieke sleutel blijft de volgorde
+    van de woorden staan, zodat een half getypt adres een prefix is van het hele adres.
+    """
+    tekst = _verwijder_land(_basis_normalisatie(address or ''))
+    return re.sub(r'[^a-z0-9]+', ' ', tekst).strip()
@@ -0,0 +1,300 @@
+"""
+Adres suggesties (autocomplete) uit lokale data
+Gebruikers typen volledige adressen in de frontend en elke typfout kost een
+betaalde geocoding call. AddressSuggestIndex is een prefix index in het geheugen
+over adressen die we al kennen: eerder gegeocodeerde adressen uit de cache en,
+als die er is, een lokaal adressen extract (CSV of JSONL met adres, lat en lng).
+
+De index is een gesorteerde lijst zoekteksten; een prefix is met bisect in
+O(log n) gevonden en alleen de opvolgers worden bekeken. Populaire adressen (hoe
+vaak ze gegeocodeerd zijn) komen eerst. Een suggestie is altijd een canoniek
+adres met coordinaten: wie hem kiest, kost geen Google call.
+
+Extract formaat (.csv, .jsonl, optioneel .gz): kolommen `address` (of `adres`),
+`lat`, `lng` en optioneel `popularity`.
+"""
+
+import csv
+import gzip
+import io
+import json
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from proximascore.address_normalizer import POSTCODE_PATTERN, canonical_address_key, parse_address, search_text
+
+
+def search_keys(canonical_key, label):
+    """Zoekteksten voor één adres: zoals getoond, canoniek en postcode + huisnummer"""
+    text = search_text(label)
+    keys = {text, search_text(canonical_key)}
+    if POSTCODE_PATTERN.search(text):
+        delen = parse_address(label)
+        if delen['postcode'] and delen['huisnummer']:
+            # "5101CA 1" en "5101 CA 1" allebei
+            postcode_key = search_text(f"{delen['postcode']} {delen['huisnummer']} {delen['toevoeging'] or ''}")
+            keys.add(postcode_key)
+            keys.add(f"{postcode_key[:4]} {postcode_key[4:]}")
+    keys.discard('')
+    return keys
+
+
+class PrefixList:
+    """Gesorteerde zoekteksten met per tekst het adres (canonical_key) waar hij bij hoort"""
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.targets = [target for _, target in pairs]
+
+    def insert(self, key, target):
+        position = bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.targets[position] == target:
+                return
+            position += 1
+        self.keys.insert(position, key)
+        self.targets.insert(position, target)
+
+    def remove(self, key, target):
+        """Haal de zoektekst van dit adres weg; andere adressen met dezelfde tekst blijven"""
+        position = bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.targets[position] == target:
+                del self.keys[position]
+                del self.targets[position]
+                return
+            position += 1
+
+    def scan(self, prefix, max_scan):
+        """Adressen met een zoektekst die met prefix begint, alfabetisch, hooguit max_scan teksten"""
+        keys = self.keys
+        position = bisect_left(keys, prefix)
+        end = min(len(keys), position + max_scan)
+        while position < end and keys[position].startswith(prefix):
+            yield self.targets[position]
+            position += 1
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class AddressSuggestIndex:
+    """
+    Prefix index over bekende adressen.
+    min_chars: kortere zoekvragen geven niets terug (te veel kandidaten).
+    max_scan: maximaal aantal prefix treffers dat per lijst bekeken wordt.
+
+    Adressen die dit proces al eens gegeocodeerd heeft staan ook in een kleine
+    tweede lijst; die wordt op populariteit gerangschikt. Is dat niet genoeg, dan
+    wordt aangevuld uit de volledige index (alfabetisch, de eerste treffers), zodat
+    ook een korte prefix over een groot extract binnen de milliseconde blijft.
+    """
+
+    def __init__(self, min_chars=3, max_scan=500):
+        self.min_chars = min_chars
+        self.max_scan = max_scan
+        self._lock = threading.Lock()
+        self._all = PrefixList()
+        self._popular = PrefixList()
+        # canonical_key -> (label, lat, lng)
+        self._entries = {}
+        self._popularity = {}
+        # Adressen die tijdens een herbouw binnenkomen, zodat de herbouw ze niet kwijtraakt
+        self._recent = None
+        self._building = False
+        self.built_at = None
+        self.stats = {'queries': 0, 'answered': 0, 'builds': 0, 'build_ms': 0.0}
+
+    # --- vullen ---
+
+    def add(self, canonical_key, label, lat, lng):
+        """Voeg een (nieuw gegeocodeerd) adres toe of werk het bij"""
+        entry = (label or canonical_key, lat, lng)
+        with self._lock:
+            if self._recent is not None:
+                self._recent[canonical_key] = entry
+            known = self._entries.get(canonical_key)
+            self._entries[canonical_key] = entry
+            if known is not None and known[0] == entry[0]:
+                return
+            keys = search_keys(canonical_key, entry[0])
+            if known is not None:
+                # Nieuw label: prefixen van het oude label mogen dit adres niet meer vinden
+                for key in search_keys(canonical_key, known[0]) - keys:
+                    self._all.remove(key, canonical_key)
+                    self._popular.remove(key, canonical_key)
+            for key in keys:
+                self._all.insert(key, canonical_key)
+                if self._popularity.get(canonical_key):
+                    self._popular.insert(key, canonical_key)
+
+    def hit(self, canonical_key, amount=1):
+        """Tel een geocoding van dit adres mee voor de rangschikking"""
+        with self._lock:
+            popularity = self._popularity.get(canonical_key, 0)
+            self._popularity[canonical_key] = popularity + amount
+            entry = self._entries.get(canonical_key)
+            if not popularity and entry is not None:
+                for key in search_keys(canonical_key, entry[0]):
+                    self._popular.insert(key, canonical_key)
+
+    def rebuild(self, entries):
+        """
+        Bouw de index opnieuw uit (canonical_key, label, lat, lng, popularity) tuples en
+        wissel hem in één keer om. Populariteit die dit proces al geteld heeft blijft staan.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._recent = {}
+        new_entries = {}
+        seeded = {}
+        try:
+            for canonical_key, label, lat, lng, popularity in entries:
+                new_entries[canonical_key] = (label or canonical_key, lat, lng)
+                if popularity:
+                    seeded[canonical_key] = popularity
+            pairs = [
+                (key, canonical_key)
+                for canonical_key, (label, lat, lng) in new_entries.items()
+                for key in search_keys(canonical_key, label)
+            ]
+            all_keys = PrefixList(pairs)
+        except BaseException:
+            with self._lock:
+                self._recent = None
+            raise
+
+        with self._lock:
+            recent, self._recent = self._recent, None
+            for canonical_key, popularity in seeded.items():
+                self._popularity[canonical_key] = max(self._popularity.get(canonical_key, 0), popularity)
+            self._all = all_keys
+            self._popular = PrefixList(pair for pair in pairs if self._popularity.get(pair[1]))
+            self._entries = new_entries
+            self.built_at = time.time()
+            self.stats['builds'] += 1
+            self.stats['build_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        for canonical_key, (label, lat, lng) in recent.items():
+            self.add(canonical_key, label, lat, lng)
+
+    def rebuild_in_background(self, load_entries, max_age=None):
+        """
+        Herbouw met load_entries() in een eigen thread, als de index nog niet gebouwd
+        is of ouder is dan max_age seconden. Request threads wachten hier nooit op.
+        """
+        with self._lock:
+            if self._building:
+                return False
+            if self.built_at is not None and (max_age is None or time.time() - self.built_at < max_age):
+                return False
+            self._building = True
+
+        def run():
+            try:
+                self.rebuild(load_entries())
+                print(f"Adres suggestie index gebouwd: {len(self)} adressen in {self.stats['build_ms']}ms")
+            except Exception as e:
+                print(f"Adres suggestie index bouwen mislukt: {str(e)}")
+            finally:
+                with self._lock:
+                    self._building = False
+
+        threading.Thread(target=run, name='suggest-index', daemon=True).start()
+        return True
+
+    # --- opvragen ---
+
+    def get(self, canonical_key):
+        """(label, lat, lng) van een bekend adres, of None"""
+        return self._entries.get(canonical_key)
+
+    def suggest(self, query, limit=5):
+        """De `limit` populairste bekende adressen die met de query beginnen"""
+        prefix = search_text(query)
+        self._count('queries')
+        if len(prefix) < self.min_chars:
+            return []
+
+        suggestions = []
+        labels = set()
+
+        def take(canonical_keys):
+            for canonical_key in canonical_keys:
+                entry = self._entries.get(canonical_key)
+                # Twee schrijfwijzen die Google naar hetzelfde adres vertaalde: één suggestie
+                if entry is not None and entry[0] not in labels:
+                    labels.add(entry[0])
+                    suggestions.append(entry)
+                    if len(suggestions) == limit:
+                        return
+
+        with self._lock:
+            popular = set(self._popular.scan(prefix, self.max_scan))
+            take(sorted(popular, key=lambda canonical_key: (-self._popularity[canonical_key], canonical_key)))
+            if len(suggestions) < limit:
+                take(self._all.scan(prefix, self.max_scan))
+
+        if suggestions:
+            self._count('answered')
+        return [{'address': label, 'lat': lat, 'lng': lng} for label, lat, lng in suggestions]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats, addresses=len(self._entries), keys=len(self._all),
+                         popular=len(self._popular), building=self._building)
+        stats['age_seconds'] = round(time.time() - self.built_at) if self.built_at else None
+        return stats
+
+
+def geocode_cache_entries(cache):
+    """(canonical_key, label, lat, lng, popularity) voor alle positieve geocoding cache entries"""
+    for key, data, expires_at in cache.iter_raw():
+        if not key.startswith('geocode:'):
+            continue
+        try:
+            entry = cache.serializer.loads(data)
+        except Exception:
+            continue
+        if not isinstance(entry, dict) or 'negative' in entry or 'lat' not in entry:
+            continue
+        label = entry.get('formatted_address') or entry.get('address')
+        if not label:
+            continue
+        # Oudere entries hebben de canonieke sleutel nog niet bij zich
+        canonical_key = entry.get('canonical_key') or canonical_address_key(entry.get('address') or label)
+        yield canonical_key, label, entry['lat'], entry['lng'], 0
+
+
+def _open_text(path):
+    if path.suffix == '.gz':
+        return io.TextIOWrapper(gzip.open(path), encoding='utf-8')
+    return open(path, encoding='utf-8', newline='')
+
+
+def address_extract_entries(path):
+    """(canonical_key, label, lat, lng, popularity) uit een lokaal adressen extract"""
+    path = Path(path)
+    rows_format = Path(path.stem).suffix if path.suffix == '.gz' else path.suffix
+    with _open_text(path) as handle:
+        if rows_format == '.jsonl':
+            rows = (json.loads(line) for line in handle if line.strip())
+        else:
+            rows = csv.DictReader(handle)
+        for row in rows:
+            label = (row.get('address') or row.get('adres') or '').strip()
+            try:
+                lat, lng = float(row['lat']), float(row['lng'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if label:
+                yield canonical_address_key(label), label, lat, lng, int(row.get('popularity') or 0)
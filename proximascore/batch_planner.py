@@ -0,0 +1,292 @@
+"""
+Batch planner: adressen in één lijst delen hun POI lookups
+Een portefeuille adressen ligt vaak in dezelfde straten en wijken. In plaats van per
+adres alle categorieen op te zoeken:
+1. worden eerst alle adressen gegeocodeerd;
+2. komen adressen binnen cluster_radius van een eerder adres (het anker) in diens
+   cluster (greedy, met een grid zodat alleen naburige cellen vergeleken worden);
+3. gaat er per cluster en categorie één lookup uit rond het anker over een straal
+   cluster_radius groter dan normaal (PlaceProvider.widened): Google zoekt op radius
+   met paginering (tot 60 resultaten per type), OSM en GTFS geven alles binnen de straal;
+4. wordt elk lid lokaal gescoord: afstanden opnieuw vanaf het adres, daarna dezelfde
+   filtering, ontdubbeling en score als een losse berekening.
+De verbrede zoekcirkel omvat die van elk lid, maar Google geeft hooguit 60 resultaten
+per type. Is een type verzadigd, dan is niet zeker dat de dichtstbijzijnde places van
+elk lid erbij zitten en krijgt elk lid voor die categorie een eigen lookup.
+Adressen met een score in de cache en clusters van één adres gaan gewoon via de
+calculator. Het rapport vergelijkt de Google calls met wat losse berekeningen
+gemiddeld kosten (historie van de query planner van de calculator).
+"""
+
+import math
+import time
+from collections import defaultdict
+
+from proximascore.config import ALLE_PROFIELEN, ALLE_VOORZIENINGEN, BATCH_CLUSTER_RADIUS
+from proximascore.place_records import Place
+from proximascore.poi_providers import FAILED_SOURCES, ProviderChain, calculate_distance, select_closest_places
+from proximascore.query_planner import MAX_SCORE_DISTANCE
+
+METERS_PER_DEGREE = 111320
+# Minimale tijd tussen twee voortgangsmeldingen zonder nieuw resultaat (de heartbeat van
+# een job; zonder melding zet de queue hem na JOB_STALE_SECONDS terug)
+HEARTBEAT_INTERVAL = 1.0
+
+
+def cluster_points(points, radius):
+    """
+    Groepeer (lat, lng) punten: elk punt komt bij het eerste anker binnen radius meter,
+    anders wordt het zelf een anker. Geeft lijsten met indexen terug; de eerste index
+    van elke lijst is het anker.
+    """
+    if not points:
+        return []
+    cell_lat = radius / METERS_PER_DEGREE
+    cell_lng = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(points[0][0])), 0.01))
+
+    grid = defaultdict(list)
+    clusters = []
+    for index, (lat, lng) in enumerate(points):
+        row, col = int(lat // cell_lat), int(lng // cell_lng)
+        cluster = None
+        # Een anker binnen radius ligt altijd in deze of een aangrenzende cel
+        for neighbour in ((row + dr, col + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)):
+            for candidate in grid.get(neighbour, ()):
+                anchor_lat, anchor_lng = points[candidate[0]]
+                if calculate_distance(lat, lng, anchor_lat, anchor_lng) <= radius:
+                    cluster = candidate
+                    break
+            if cluster is not None:
+                break
+        if cluster is None:
+            cluster = [index]
+            grid[(row, col)].append(cluster)
+            clusters.append(cluster)
+        else:
+            cluster.append(index)
+    return clusters
+
+
+def places_from_candidates(lat, lng, candidates):
+    """Places voor één adres uit de gedeelde kandidaten: afstand vanaf het adres zelf"""
+    places = []
+    for candidate in candidates:
+        distance = round(calculate_distance(lat, lng, candidate.lat, candidate.lng))
+        if distance <= MAX_SCORE_DISTANCE:
+            places.append(Place(candidate.name, candidate.address, distance,
+                                candidate.lat, candidate.lng, candidate.rating))
+    return select_closest_places(places)
+
+
+class BatchPlanner:
+    """Scoort een lijst adressen met gedeelde POI lookups per cluster"""
+
+    def __init__(self, calculator, cluster_radius=BATCH_CLUSTER_RADIUS):
+        self.calculator = calculator
+        self.cluster_radius = cluster_radius
+        # Verbrede varianten van de bronnen; cache tiers (per exacte locatie) vallen af
+        self.providers = {}
+        for name, provider in calculator.providers.items():
+            widened = provider.widened(cluster_radius)
+            if widened is not None:
+                self.providers[name] = widened
+        self.chains = {}
+
+    def get_chain(self, category):
+        tier_names = self.calculator.provider_ketens.get(category, self.calculator.provider_ketens['default'])
+        key = tuple(name for name in tier_names if name in self.providers)
+        if key not in self.chains:
+            self.chains[key] = ProviderChain(self.providers[name] for name in key)
+        return self.chains[key]
+
+    def google_calls(self):
+        """
+        Nearby Search calls tot nu toe: de verbrede Google bron (inclusief volgende
+        pagina's) en de losse lookups van de calculator voor verzadigde categorieen
+        """
+        calls = 0
+        for google in (self.providers.get('google'), self.calculator.providers.get('google')):
+            if google is not None:
+                calls += google.page_calls
+                calls += sum(stats['calls_made'] for stats in google.planner.get_stats()['categories'].values())
+        return calls
+
+    def per_address_calls(self, category):
+        """Gemiddeld aantal Google calls van een losse lookup voor deze categorie (None zonder historie)"""
+        google = self.calculator.providers.get('google')
+        if google is None:
+            return None
+        stats = google.planner.get_stats()['categories'].get(category)
+        if not stats or not stats['plans']:
+            return None
+        return stats['calls_made'] / stats['plans']
+
+    def fetch_candidates(self, lat, lng, category):
+        """
+        Eén verbrede lookup rond het anker: (places, bron); bron 'error' als hij faalde,
+        'saturated' als Google meer resultaten had dan opgehaald
+        """
+        place_types = ALLE_VOORZIENINGEN[category]['google_types']
+        try:
+            places, source = self.get_chain(category).lookup(lat, lng, category, place_types)
+        except Exception as e:
+            print(f"Gedeelde lookup voor {category} gefaald: {str(e)}")
+            return [], 'error'
+        google = self.providers.get('google')
+        if google is not None and google.pop_saturated(lat, lng, category) and source == 'google':
+            print(f"Gedeelde lookup voor {category} verzadigd, losse lookups per adres")
+            return places, 'saturated'
+        return places, source
+
+    def score_cluster(self, members, locations, profile, category_fields, heartbeat=None):
+        """
+        Gedeelde lookups rond het anker, dan per lid de afgeronde categorieen.
+        Geeft ({index: (completed, failed)}, {categorie: Google calls},
+        aantal losse lookups voor verzadigde categorieen) terug.
+        """
+        calculator = self.calculator
+        anchor = locations[members[0]]
+        categories = calculator.scored_categories(profile)
+
+        candidates = {}
+        calls = {}
+        for category, weight in categories:
+            before = self.google_calls()
+            candidates[category] = self.fetch_candidates(anchor['lat'], anchor['lng'], category)
+            calls[category] = self.google_calls() - before
+            if heartbeat:
+                heartbeat()
+
+        scored = {}
+        saturated_lookups = 0
+        for index in members:
+            location = locations[index]
+            completed = {}
+            failed = False
+            for category, weight in categories:
+                found, source = candidates[category]
+                if source == 'saturated':
+                    before = self.google_calls()
+                    places, source = calculator.lookup_places(location['lat'], location['lng'], category)
+                    calls[category] += self.google_calls() - before
+                    saturated_lookups += 1
+                    if heartbeat:
+                        heartbeat()
+                else:
+                    places = places_from_candidates(location['lat'], location['lng'], found)
+                failed = failed or source in FAILED_SOURCES
+                completed[category] = calculator.build_category_entry(category, weight, places, category_fields)
+            scored[index] = (completed, failed)
+        return scored, calls, saturated_lookups
+
+    def score_addresses(self, addresses, profile='algemeen', result_fields=None, category_fields=None,
+                        report_progress=None):
+        """
+        Score alle adressen; geeft (resultaten in de volgorde van addresses, rapport) terug.
+        Een resultaat heeft dezelfde vorm als calculate_proxima_score.
+        """
+        calculator = self.calculator
+        start = time.perf_counter()
+        results = [None] * len(addresses)
+        done = 0
+        last_report = time.monotonic()
+
+        def finish(index, result):
+            nonlocal done, last_report
+            results[index] = result
+            done += 1
+            if report_progress:
+                last_report = time.monotonic()
+                report_progress(done, len(addresses))
+
+        def heartbeat():
+            # Zelfde voortgang opnieuw melden: geocoding en gedeelde lookups kunnen lang
+            # duren zonder dat er een adres afgerond wordt
+            nonlocal last_report
+            if report_progress and time.monotonic() - last_report >= HEARTBEAT_INTERVAL:
+                last_report = time.monotonic()
+                report_progress(done, len(addresses))
+
+        if not ALLE_PROFIELEN.get(profile, {}).get('active'):
+            # Zelfde foutmelding als een losse berekening
+            for index, address in enumerate(addresses):
+                finish(index, calculator.calculate_proxima_score(address, profile, result_fields, category_fields))
+            return results, {'addresses': len(addresses)}
+
+        # 1. Alles geocoderen; bekende adressen komen uit de cache
+        locations = {}
+        for index, address in enumerate(addresses):
+            location = calculator.geocode_address(address)
+            if location:
+                locations[index] = location
+                heartbeat()
+            else:
+                finish(index, {'error': 'Adres niet gevonden'})
+
+        # Al gescoorde locaties hebben geen POI lookups nodig
+        pending = []
+        for index, location in locations.items():
+            completed = calculator.lookup_cached_scores(location['lat'], location['lng'], profile, category_fields)
+            if completed is None:
+                pending.append(index)
+            else:
+                finish(index, calculator.build_result(addresses[index], profile, location, completed, result_fields))
+        score_cache_hits = len(locations) - len(pending)
+
+        # 2. Clusteren
+        clusters = [
+            [pending[position] for position in cluster]
+            for cluster in cluster_points(
+                [(locations[index]['lat'], locations[index]['lng']) for index in pending], self.cluster_radius
+            )
+        ] if self.cluster_radius > 0 else [[index] for index in pending]
+
+        # 3. en 4. Gedeelde lookups per cluster, losse adressen via de calculator
+        categories = [category for category, weight in calculator.scored_categories(profile)]
+        shared_addresses = 0
+        shared_calls = 0
+        saturated_lookups = 0
+        per_address_estimate = 0.0
+        for members in clusters:
+            if len(members) == 1:
+                index = members[0]
+                finish(index, calculator.calculate_proxima_score(addresses[index], profile,
+                                                                 result_fields, category_fields))
+                continue
+
+            scored, calls, fallbacks = self.score_cluster(members, locations, profile, category_fields, heartbeat)
+            saturated_lookups += fallbacks
+            shared_addresses += len(members)
+            for category in categories:
+                shared_calls += calls[category]
+                average = self.per_address_calls(category)
+                per_address_estimate += len(members) * (average if average is not None else calls[category])
+            for index in members:
+                completed, failed = scored[index]
+                record_score = not failed
+                if category_fields is None and record_score:
+                    calculator.store_cached_scores(locations[index]['lat'], locations[index]['lng'],
+                                                   profile, completed)
+                finish(index, calculator.build_result(addresses[index], profile, locations[index], completed,
+                                                      result_fields, record_score))
+
+        shared_clusters = sum(1 for members in clusters if len(members) > 1)
+        report = {
+            'addresses': len(addresses),
+            'geocoded': len(locations),
+            'score_cache_hits': score_cache_hits,
+            'cluster_radius': self.cluster_radius,
+            'clusters': len(clusters),
+            'shared_clusters': shared_clusters,
+            'shared_addresses': shared_addresses,
+            'poi_lookups': len(clusters) * len(categories) + saturated_lookups,
+            'saturated_lookups': saturated_lookups,
+            'per_address_poi_lookups': len(pending) * len(categories),
+            'google_calls_shared': shared_calls,
+            'google_calls_per_address_estimate': round(per_address_estimate),
+            'saved_google_calls': round(per_address_estimate - shared_calls),
+            'elapsed_seconds': round(time.perf_counter() - start, 2),
+        }
+        print(f"Batch planner: {len(pending)} adressen in {len(clusters)} clusters, "
+              f"{report['saved_google_calls']} Google calls bespaard")
+        return results, report
@@ -0,0 +1,444 @@
+"""
+Cache backends voor ProximaScore
+Geocoding, POI en score caches praten met één interface (get/set, get_many/
+set_many, TTL in seconden), zodat dezelfde code werkt met:
+- SQLite: een tabel in data/proximascore.db (standaard, lokaal per container);
+- geheugen: per proces, vooral voor de snelste tier en voor testen;
+- Redis: gedeeld tussen workers en replicas. Elke client met het Redis
+  protocol (redis-py, fakeredis, een lokale redis-server) kan worden ingeplugd.
+
+Kies de backend met CACHE_BACKEND: 'sqlite', 'memory' of een redis:// URL.
+"""
+
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# SQLite staat maximaal 999 parameters per query toe in oudere versies
+SQLITE_BATCH_SIZE = 500
+# Tabellen van de cache van voor de backends, in hetzelfde data/proximascore.db
+LEGACY_TABLES = ('geocoding_cache', 'address_aliases', 'poi_cache', 'score_cache')
+
+
+class JsonSerializer:
+    """JSON (via orjson als dat beschikbaar is); leesbaar en taal-onafhankelijk"""
+
+    name = 'json'
+
+    def dumps(self, value):
+        if orjson:
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        if orjson:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class PickleSerializer:
+    """Pickle; ook voor waarden die niet in JSON passen. Alleen voor vertrouwde stores."""
+
+    name = 'pickle'
+
+    def dumps(self, value):
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+
+SERIALIZERS = {
+    'json': JsonSerializer,
+    'pickle': PickleSerializer,
+}
+
+
+def get_serializer(serializer):
+    """Serializer instance uit een naam ('json', 'pickle') of een bestaand object"""
+    if isinstance(serializer, str):
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Onbekende cache serializer: {serializer}")
+        return SERIALIZERS[serializer]()
+    return serializer
+
+
+class CacheBackend:
+    """
+    Basisklasse. Subklassen implementeren get_many/set_many/delete_many;
+    get/set/delete zijn daar dunne wrappers om. ttl is in seconden, None = geen verloop.
+    """
+
+    name = 'basis'
+    # False voor backends die direct antwoorden (geen I/O), zodat async code geen thread nodig heeft
+    blocking = True
+
+    def __init__(self, serializer='json'):
+        self.serializer = get_serializer(serializer)
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl=ttl)
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def get_many(self, keys):
+        """Geef {key: waarde} terug voor de keys die (nog geldig) in de cache staan"""
+        raise NotImplementedError
+
+    def set_many(self, mapping, ttl=None):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def iter_raw(self):
+        """Alle geldige entries als (key, geserialiseerde waarde, expires_at); voor snapshots"""
+        raise NotImplementedError
+
+    def load_raw(self, rows):
+        """
+        Laad (key, geserialiseerde waarde, expires_at) rijen. Bestaande entries die
+        langer geldig zijn blijven staan. Geeft het aantal verwerkte rijen terug.
+        """
+        raise NotImplementedError
+
+    def store_raw(self, rows):
+        """Schrijf (key, geserialiseerde waarde, expires_at) rijen in één keer; overschrijft bestaande"""
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU in het geheugen van het proces; waarden worden geserialiseerd opgeslagen (geen gedeelde referenties)"""
+
+    name = 'memory'
+    blocking = False
+
+    def __init__(self, max_entries=5000, serializer='json'):
+        super().__init__(serializer)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                data, expires_at = entry
+                if expires_at is not None and expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = data
+        return {key: self.serializer.loads(data) for key, data in found.items()}
+
+    def set_many(self, mapping, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        encoded = {key: self.serializer.dumps(value) for key, value in mapping.items()}
+        with self._lock:
+            for key, data in encoded.items():
+                self._entries[key] = (data, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def iter_raw(self):
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.items())
+        for key, (data, expires_at) in entries:
+            if expires_at is None or expires_at > now:
+                yield key, data, expires_at
+
+    def load_raw(self, rows):
+        count = 0
+        with self._lock:
+            for key, data, expires_at in rows:
+                current = self._entries.get(key)
+                if current is None or _outlives(expires_at, current[1]):
+                    self._entries[key] = (data, expires_at)
+                count += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return count
+
+    def store_raw(self, rows):
+        with self._lock:
+            for key, data, expires_at in rows:
+                self._entries[key] = (data, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Key/value tabel in een lokaal SQLite bestand"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path='data/proximascore.db', serializer='json', table='cache_entries'):
+        super().__init__(serializer)
+        self.db_path = Path(db_path)
+        self.table = table
+        self.init_database()
+
+    def connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def init_database(self):
+        self.db_path.parent.mkdir(exist_ok=True)
+        with self.connect() as conn:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL
+                ) WITHOUT ROWID
+            ''')
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        now = time.time()
+        with self.connect() as conn:
+            for start in range(0, len(keys), SQLITE_BATCH_SIZE):
+                batch = keys[start:start + SQLITE_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(f'''
+                    SELECT key, value FROM {self.table}
+                    WHERE key IN ({placeholders}) AND (expires_at IS NULL OR expires_at > ?)
+                ''', (*batch, now))
+                for key, data in rows:
+                    found[key] = self.serializer.loads(data)
+        return found
+
+    def set_many(self, mapping, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        self.store_raw([(key, self.serializer.dumps(value), expires_at) for key, value in mapping.items()])
+
+    def store_raw(self, rows):
+        with self.connect() as conn:
+            conn.executemany(f'''
+                INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)
+            ''', rows)
+
+    def delete_many(self, keys):
+        with self.connect() as conn:
+            conn.executemany(f'DELETE FROM {self.table} WHERE key = ?', [(key,) for key in keys])
+
+    def iter_raw(self):
+        with self.connect() as conn:
+            rows = conn.execute(f'''
+                SELECT key, value, expires_at FROM {self.table}
+                WHERE expires_at IS NULL OR expires_at > ?
+            ''', (time.time(),))
+            for key, data, expires_at in rows:
+                yield key, data, expires_at
+
+    def load_raw(self, rows):
+        counter = _Counter(rows)
+        # Eén transactie voor de hele stroom; executemany leest de generator lui
+        with self.connect() as conn:
+            conn.executemany(f'''
+                INSERT INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+                WHERE {self.table}.expires_at IS NOT NULL
+                    AND (excluded.expires_at IS NULL OR excluded.expires_at > {self.table}.expires_at)
+            ''', counter)
+        return counter.count
+
+    def purge_expired(self):
+        """Verlopen entries verwijderen; geeft het aantal terug"""
+        with self.connect() as conn:
+            return conn.execute(f'DELETE FROM {self.table} WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def migrate_legacy_tables(self, convert):
+        """
+        Eenmalig: rijen uit de oude cache tabellen (LEGACY_TABLES) overzetten en die
+        tabellen daarna verwijderen. convert(tabel, rij als dict) geeft (key, value,
+        expires_at) of None voor een rij die niet mee gaat. Bestaande entries met een
+        latere expires_at blijven staan, dus een afgebroken migratie kan gewoon opnieuw.
+        Geeft het aantal overgezette entries terug.
+        """
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            present = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            tables = [table for table in LEGACY_TABLES if table in present]
+            if not tables:
+                return 0
+            entries = []
+            for table in tables:
+                for row in conn.execute(f'SELECT * FROM {table}'):
+                    entry = convert(table, dict(row))
+                    if entry is not None:
+                        key, value, expires_at = entry
+                        entries.append((key, self.serializer.dumps(value), expires_at))
+
+        migrated = self.load_raw(entries)
+        with self.connect() as conn:
+            for table in tables:
+                conn.execute(f'DROP TABLE {table}')
+        print(f"Oude cache tabellen ({', '.join(tables)}) omgezet: {migrated} entries, tabellen verwijderd")
+        return migrated
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Gedeelde cache via het Redis protocol. client mag elk object zijn met de
+    redis-py interface (mget, set, delete, pipeline), bijvoorbeeld fakeredis in tests.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url=None, client=None, serializer='json', prefix='proximascore:'):
+        super().__init__(serializer)
+        if client is None:
+            # Pas hier importeren: redis-py is optioneel en traag om te laden
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("Redis cache backend vereist het 'redis' package (pip install redis)")
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {
+            key: self.serializer.loads(data)
+            for key, data in zip(keys, values)
+            if data is not None
+        }
+
+    def set_many(self, mapping, ttl=None):
+        if not mapping:
+            return
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipeline.set(self.prefix + key, self.serializer.dumps(value), ex=int(ttl) if ttl else None)
+        pipeline.execute()
+
+    def delete_many(self, keys):
+        keys = [self.prefix + key for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def iter_raw(self, batch_size=1000):
+        batch = []
+        for full_key in self.client.scan_iter(match=self.prefix + '*', count=batch_size):
+            batch.append(full_key)
+            if len(batch) >= batch_size:
+                yield from self._raw_batch(batch)
+                batch = []
+        if batch:
+            yield from self._raw_batch(batch)
+
+    def _raw_batch(self, full_keys):
+        pipeline = self.client.pipeline(transaction=False)
+        for full_key in full_keys:
+            pipeline.get(full_key)
+            pipeline.pttl(full_key)
+        replies = pipeline.execute()
+        now = time.time()
+        for index, full_key in enumerate(full_keys):
+            data, pttl = replies[2 * index], replies[2 * index + 1]
+            if data is None:
+                continue
+            if isinstance(full_key, bytes):
+                full_key = full_key.decode('utf-8')
+            # pttl -1 = geen verloop
+            yield full_key[len(self.prefix):], data, (now + pttl / 1000 if pttl and pttl > 0 else None)
+
+    def load_raw(self, rows, batch_size=1000):
+        count = 0
+        now = time.time()
+        pipeline = self.client.pipeline(transaction=False)
+        for key, data, expires_at in rows:
+            if expires_at is None:
+                pipeline.set(self.prefix + key, data, nx=True)
+            elif expires_at > now:
+                # nx: een entry die een andere replica al schreef is minstens zo vers
+                pipeline.set(self.prefix + key, data, px=int((expires_at - now) * 1000), nx=True)
+            count += 1
+            if count % batch_size == 0:
+                pipeline.execute()
+        pipeline.execute()
+        return count
+
+    def store_raw(self, rows):
+        now = time.time()
+        pipeline = self.client.pipeline(transaction=False)
+        for key, data, expires_at in rows:
+            if expires_at is None:
+                pipeline.set(self.prefix + key, data)
+            elif expires_at > now:
+                pipeline.set(self.prefix + key, data, px=int((expires_at - now) * 1000))
+        pipeline.execute()
+
+
+def _outlives(expires_at, current_expires_at):
+    """True als een entry met expires_at langer geldig is dan de huidige"""
+    if current_expires_at is None:
+        return False
+    return expires_at is None or expires_at > current_expires_at
+
+
+class _Counter:
+    """Telt de rijen die door een iterator gaan, zonder ze te bufferen"""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self.rows)
+        self.count += 1
+        return row
+
+
+def create_cache_backend(spec='sqlite', serializer='json', db_path='data/proximascore.db',
+                         write_behind=False, write_queue_size=10000):
+    """
+    Backend uit een configuratie waarde: 'sqlite', 'memory' of een redis:// URL.
+    write_behind: SQLite schrijfacties via één writer thread (zie write_behind.py).
+    """
+    if spec == 'sqlite':
+        backend = SQLiteCacheBackend(db_path, serializer=serializer)
+        if write_behind:
+            from proximascore.write_behind import WriteBehindCache
+            backend = WriteBehindCache(backend, max_queue=write_queue_size)
+    elif spec == 'memory':
+        backend = MemoryCacheBackend(serializer=serializer)
+    elif spec.startswith(('redis://', 'rediss://', 'unix://')):
+        backend = RedisCacheBackend(spec, serializer=serializer)
+    else:
+        raise ValueError(f"Onbekende cache backend: {spec}")
+    print(f"Cache backend: {backend.name} ({backend.serializer.name})")
+    return backend
@@ -0,0 +1,184 @@
+"""
+Cache snapshots voor een warme start na een deploy
+Exporteert de nog geldige entries van de cache backend naar een gzip JSON Lines
+bestand en laadt dat bij het opstarten weer in, zodat een nieuwe deployment
+niet met een lege cache (en een piek in Google calls) begint.
+
+Formaat (versie 1), één JSON document per regel:
+    {"format": "proximascore-cache-snapshot", "version": 1, "serializer": "json", ...}
+    {"k": key, "e": expires_at, "v": waarde}    bij de json serializer
+    {"k": key, "e": expires_at, "b": base64}    bij andere serializers
+
+Gebruik:
+    python -m proximascore.cache_snapshot export data/cache-snapshot.jsonl.gz
+    python -m proximascore.cache_snapshot import data/cache-snapshot.jsonl.gz
+Bij het opstarten laadt de app CACHE_SNAPSHOT_PATH automatisch (één keer per snapshot).
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SNAPSHOT_FORMAT = 'proximascore-cache-snapshot'
+SNAPSHOT_VERSION = 1
+# Entries die binnen deze tijd verlopen zijn de ruimte in de snapshot niet waard
+SNAPSHOT_MIN_TTL = 300
+
+
+def export_snapshot(backend, path, prefixes=None, min_ttl=SNAPSHOT_MIN_TTL):
+    """
+    Schrijf alle entries die nog minstens min_ttl seconden geldig zijn naar path.
+    prefixes beperkt de export, bijv. ('geocode:', 'poi:'). Geeft het aantal entries terug.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    embed_json = backend.serializer.name == 'json'
+    cutoff = time.time() + min_ttl
+    count = 0
+
+    # Eerst naar een tijdelijk bestand, zodat een halve snapshot nooit geladen wordt
+    tmp_path = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as snapshot:
+        snapshot.write(json.dumps({
+            'format': SNAPSHOT_FORMAT,
+            'version': SNAPSHOT_VERSION,
+            'serializer': backend.serializer.name,
+            'backend': backend.name,
+            'created_at': time.time(),
+        }) + '\n')
+
+        for key, data, expires_at in backend.iter_raw():
+            if key.startswith('snapshot:') or (prefixes and not key.startswith(tuple(prefixes))):
+                continue
+            if expires_at is not None and expires_at < cutoff:
+                continue
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            line = {'k': key, 'e': expires_at}
+            if embed_json:
+                line['v'] = json.loads(data)
+            else:
+                line['b'] = base64.b64encode(data).decode('ascii')
+            snapshot.write(json.dumps(line, separators=(',', ':')) + '\n')
+            count += 1
+
+    os.replace(tmp_path, path)
+    print(f"Cache snapshot geschreven: {count} entries -> {path}")
+    return count
+
+
+def read_snapshot_header(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as snapshot:
+        return _parse_header(snapshot.readline())
+
+
+def _parse_header(line):
+    header = json.loads(line)
+    if header.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError("Geen ProximaScore cache snapshot")
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot versie {header.get('version')} wordt niet ondersteund (verwacht {SNAPSHOT_VERSION})")
+    return header
+
+
+def _iter_rows(snapshot, header, backend, now):
+    """Lees de snapshot regel voor regel als raw rijen voor backend.load_raw"""
+    same_serializer = header['serializer'] == backend.serializer.name
+    for line in snapshot:
+        entry = json.loads(line)
+        expires_at = entry['e']
+        if expires_at is not None and expires_at <= now:
+            continue
+        if 'v' in entry:
+            value = entry['v']
+            data = backend.serializer.dumps(value)
+        else:
+            data = base64.b64decode(entry['b'])
+            if not same_serializer:
+                raise ValueError(f"Snapshot met serializer {header['serializer']} past niet op "
+                                 f"een backend met {backend.serializer.name}")
+        yield entry['k'], data, expires_at
+
+
+def import_snapshot(backend, path):
+    """Laad een snapshot in één stroom; verlopen entries worden overgeslagen"""
+    start = time.time()
+    with gzip.open(path, 'rt', encoding='utf-8') as snapshot:
+        header = _parse_header(snapshot.readline())
+        count = backend.load_raw(_iter_rows(snapshot, header, backend, start))
+    print(f"Cache snapshot geladen: {count} entries uit {path} in {time.time() - start:.1f}s")
+    return count
+
+
+def load_snapshot_on_startup(backend, path):
+    """
+    Startup hook: laad de snapshot als die bestaat en nog niet eerder in deze
+    backend is geladen. Meerdere workers die tegelijk starten wachten op elkaar.
+    """
+    path = Path(path)
+    if not path.exists():
+        return 0
+
+    # Lock buiten de snapshot map: die kan read-only in de image zitten
+    lock_name = hashlib.md5(str(path.resolve()).encode()).hexdigest()[:12]
+    lock_path = Path(tempfile.gettempdir()) / f"proximascore-snapshot-{lock_name}.lock"
+    with open(lock_path, 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            header = read_snapshot_header(path)
+            marker = f"snapshot:{header['created_at']}"
+            if backend.get(marker):
+                print(f"Cache snapshot {path} is al geladen")
+                return 0
+            count = import_snapshot(backend, path)
+            backend.set(marker, {'path': str(path), 'entries': count, 'loaded_at': time.time()})
+            # Met write-behind staat de marker nog in de wachtrij van dit proces: eerst
+            # wegschrijven, anders laadt de volgende worker met de lock de snapshot opnieuw
+            if hasattr(backend, 'flush'):
+                backend.flush()
+            return count
+        except Exception as e:
+            # Een kapotte snapshot mag het opstarten nooit blokkeren
+            print(f"Cache snapshot laden gefaald: {str(e)}")
+            return 0
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def main():
+    from proximascore.cache_backends import create_cache_backend
+
+    parser = argparse.ArgumentParser(description='Export of import van een cache snapshot')
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('path', help='Snapshot bestand (.jsonl.gz)')
+    parser.add_argument('--backend', default=os.environ.get('CACHE_BACKEND', 'sqlite'),
+                        help="'sqlite', 'memory' of een redis:// URL (standaard: CACHE_BACKEND)")
+    parser.add_argument('--serializer', default=os.environ.get('CACHE_SERIALIZER', 'json'))
+    parser.add_argument('--prefix', action='append', dest='prefixes',
+                        help="Alleen keys met dit prefix, bijv. --prefix geocode: --prefix poi:")
+    parser.add_argument('--min-ttl', type=int, default=SNAPSHOT_MIN_TTL,
+                        help='Sla entries over die binnen zoveel seconden verlopen')
+    args = parser.parse_args()
+
+    backend = create_cache_backend(args.backend, serializer=args.serializer)
+    if args.command == 'export':
+        export_snapshot(backend, args.path, prefixes=args.prefixes, min_ttl=args.min_ttl)
+    else:
+        import_snapshot(backend, args.path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Configuratie van de ProximaScore kern: API keys, voorzieningen, profielen en de
+instellingen van caches, providers en planner. Waarden komen uit environment
+variabelen; een .env bestand wordt geladen als python-dotenv beschikbaar is.
+"""
+
+import os
+
+# Laad environment variabelen (dotenv is optioneel, bijvoorbeeld voor de CLI)
+if os.path.exists('.env'):
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv('.env')
+
+GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY', '')
+GOOGLE_PLACES_API_KEY = os.environ.get('GOOGLE_PLACES_API_KEY', GOOGLE_API_KEY)
+
+# Volledige voorzieningen definitie
+ALLE_VOORZIENINGEN = {
+    'supermarkt': {
+        'google_types': ['supermarket', 'grocery_or_supermarket'],
+        'display_name': 'Supermarkt',
+        'active': True
+    },
+    'huisarts': {
+        'google_types': ['doctor', 'hospital', 'physiotherapist'],
+        'display_name': 'Huisarts/Medisch centrum',
+        'active': True
+    },
+    'openbaar_vervoer': {
+        'google_types': ['bus_station', 'subway_station', 'train_station', 'transit_station'],
+        'display_name': 'Openbaar vervoer',
+        'active': True
+    },
+    'basisschool': {
+        'google_types': ['primary_school', 'school'],
+        'display_name': 'Basisschool',
+        'active': True
+    },
+    'apotheek': {
+        'google_types': ['pharmacy'],
+        'display_name': 'Apotheek',
+        'active': True
+    },
+    'sportfaciliteiten': {
+        'google_types': ['gym', 'stadium', 'bowling_alley'],
+        'display_name': 'Sportfaciliteiten',
+        'active': True
+    },
+    'horeca': {
+        'google_types': ['restaurant', 'bar', 'cafe', 'meal_takeaway'],
+        'display_name': 'Horeca',
+        'active': True
+    },
+    'werkgelegenheid': {
+        'google_types': ['store', 'establishment'],
+        'display_name': 'Werkgelegenheid',
+        'active': True
+    },
+    'cultuur': {
+        'google_types': ['library', 'museum', 'movie_theater', 'art_gallery', 'tourist_attraction'],
+        'display_name': 'Cultuur',
+        'active': True
+    },
+    'groenvoorziening': {
+        'google_types': ['park'],
+        'display_name': 'Groenvoorziening',
+        'active': True
+    }
+}
+
+# Basis URL van de Google Maps API; de load test wijst hiermee naar loadtest/mock_upstream.py
+GOOGLE_MAPS_BASE_URL = os.environ.get('GOOGLE_MAPS_BASE_URL', 'https://maps.googleapis.com').rstrip('/')
+GEOCODE_URL = f"{GOOGLE_MAPS_BASE_URL}/maps/api/geocode/json"
+NEARBY_SEARCH_URL = f"{GOOGLE_MAPS_BASE_URL}/maps/api/place/nearbysearch/json"
+
+# POI provider keten per categorie: goedkoopste bron eerst, Google als laatste redmiddel.
+# Categorieen zonder eigen regel gebruiken 'default'.
+POI_PROVIDER_KETENS = {
+    'default': ['memory', 'cache', 'osm', 'google'],
+    'openbaar_vervoer': ['memory', 'gtfs', 'cache', 'osm', 'google'],
+}
+
+# Gedeelde cache voor geocoding, POI en scores: 'sqlite' (lokaal), 'memory' of een
+# redis:// URL zodat workers en replicas elkaars resultaten hergebruiken
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+CACHE_SERIALIZER = os.environ.get('CACHE_SERIALIZER', 'json')
+# SQLite writes via één writer thread per proces in plaats van op het request pad
+CACHE_WRITE_BEHIND = os.environ.get('CACHE_WRITE_BEHIND', '1') == '1'
+CACHE_WRITE_QUEUE_SIZE = int(os.environ.get('CACHE_WRITE_QUEUE_SIZE', 10000))
+GEOCODE_CACHE_TTL = 24 * 3600
+# Ruwe schrijfwijze -> canonieke sleutel; de sleutel bevat ook de normalizer versie
+ADDRESS_ALIAS_TTL = 30 * 24 * 3600
+POI_CACHE_TTL_HOURS = 24
+# Negatieve entries: een onbekend adres of een categorie zonder resultaat binnen bereik
+# kan nog veranderen (nieuwe straat, nieuwe winkel) en blijft korter staan;
+# een upstream fout (quota, 5xx, timeout) wordt al na een paar minuten opnieuw geprobeerd
+GEOCODE_NOT_FOUND_TTL = 6 * 3600
+POI_EMPTY_TTL_HOURS = 6
+NEGATIVE_ERROR_TTL = 120
+# Korter dan de POI cache: een score met een tijdelijk mislukte categorie blijft niet lang hangen
+SCORE_CACHE_TTL = 3600
+# Snapshot (python -m proximascore.cache_snapshot export ...) die bij het opstarten wordt geladen
+CACHE_SNAPSHOT_PATH = os.environ.get('CACHE_SNAPSHOT_PATH')
+
+# Adres suggesties (/api/suggest) uit gegeocodeerde adressen en een optioneel lokaal
+# adressen extract (CSV/JSONL met address, lat, lng); de index wordt periodiek herbouwd
+# zodat adressen die andere workers geocoderen ook verschijnen
+ADDRESS_EXTRACT = os.environ.get('ADDRESS_EXTRACT', 'data/addresses.csv')
+SUGGEST_REFRESH_SECONDS = int(os.environ.get('SUGGEST_REFRESH_SECONDS', 600))
+
+# Lokale POI store, gevuld met: python -m proximascore.osm_ingest <extract> --region <naam>
+OSM_POI_STORE = os.environ.get('OSM_POI_STORE', 'data/poi_store.db')
+
+# GTFS feed (map of zip) voor openbaar vervoer haltes; een nieuwe feed wordt vanzelf herladen
+GTFS_FEED = os.environ.get('GTFS_FEED', 'data/gtfs')
+GTFS_MIN_DEPARTURES = int(os.environ.get('GTFS_MIN_DEPARTURES', 0))
+
+# Query planner voor Nearby Search: None = op afstand gerangschikt (rankby=distance),
+# bijvoorbeeld (750, 2000) = eerst klein zoeken, alleen verbreden als er niets is gevonden.
+QUERY_PLANNER_RADIUS_STEPS = (None,)
+# Early stop (opt-in, 0 = uit): stop met latere types zodra er een place binnen deze afstand
+# ligt. Dat scheelt calls maar kan de score tot afstand / 20 punten verlagen (100 m = 5 punten)
+# en de places van de overgeslagen types ontbreken in de top 3 van het antwoord.
+QUERY_PLANNER_EARLY_STOP_METERS = int(os.environ.get('QUERY_PLANNER_EARLY_STOP_METERS', 0))
+
+# Relevantie van Google resultaten (zie relevance.py). Per categorie moet de naam een van
+# de 'vereist' woorden bevatten en geen van de 'uitgesloten' woorden (deelstrings, zonder
+# hoofdletters); categorieen zonder regel houden alles. Voor alle categorieen valt een
+# place met een rating onder PLACE_MIN_RATING of minder dan PLACE_MIN_RATINGS_TOTAL
+# beoordelingen af; nog niet beoordeelde places blijven staan.
+PLACE_RELEVANCE_RULES = {
+    'apotheek': {
+        'vereist': ['apotheek', 'pharmacy', 'apotheke', 'farmacie'],
+    },
+    'huisarts': {
+        'vereist': ['huisarts', 'dokter', 'arts', 'doctor', 'medisch', 'gezondheid', 'fysi'],
+    },
+    'basisschool': {
+        'vereist': ['school', 'onderwijs', 'basisschool', 'elementary'],
+        'uitgesloten': ['rijschool', 'dansschool', 'muziekschool', 'driving'],
+    },
+    'sportfaciliteiten': {
+        'vereist': ['gym', 'sport', 'fitness', 'zwembad', 'tennis', 'voetbal', 'hockey'],
+    },
+}
+PLACE_MIN_RATING = float(os.environ.get('PLACE_MIN_RATING', 3.0))
+PLACE_MIN_RATINGS_TOTAL = int(os.environ.get('PLACE_MIN_RATINGS_TOTAL', 3))
+
+# Batch jobs: adressen binnen BATCH_CLUSTER_RADIUS meter van elkaar delen één verbrede
+# POI lookup per categorie (zie batch_planner.py); 0 = elk adres los
+BATCH_CLUSTER_RADIUS = int(os.environ.get('BATCH_CLUSTER_RADIUS', 400))
+
+# Hedged Nearby Search calls: hangt een call langer dan de p90, dan gaat er een tweede
+# uit en wint het eerste antwoord. Maximaal HEDGE_MAX_EXTRA_RATIO extra calls (quota).
+PLACES_HEDGING = os.environ.get('PLACES_HEDGING', '0') == '1'
+HEDGE_PERCENTILE = float(os.environ.get('HEDGE_PERCENTILE', 0.9))
+HEDGE_MAX_EXTRA_RATIO = float(os.environ.get('HEDGE_MAX_EXTRA_RATIO', 0.05))
+
+# Deel van het budget dat geocoding maximaal mag gebruiken; de rest is voor de categorieen
+GEOCODE_DEADLINE_SHARE = 0.3
+
+# Score verdelingen per profiel en gemeente (KLL sketches) voor het percentiel in elk
+# resultaat; nieuwe scores gaan elke SCORE_SKETCH_FLUSH_SECONDS naar de cache backend.
+# Een gemeente met minder dan SCORE_PERCENTILE_MIN_COUNT scores wordt landelijk vergeleken.
+SCORE_SKETCH_FLUSH_SECONDS = int(os.environ.get('SCORE_SKETCH_FLUSH_SECONDS', 30))
+SCORE_PERCENTILE_MIN_COUNT = int(os.environ.get('SCORE_PERCENTILE_MIN_COUNT', 20))
+
+# Aantal categorieen dat tegelijk wordt opgezocht (gedeeld over alle requests)
+CATEGORY_WORKERS = int(os.environ.get('CATEGORY_WORKERS', 8))
+
+# Volledige profielen definitie
+# Vervang je hele ALLE_PROFIELEN sectie (rond regel 100-140) door deze versie:
+
+ALLE_PROFIELEN = {
+    'algemeen': {
+        'display_name': 'Algemeen profiel',
+        'gewichten': {
+            'supermarkt': 35,
+            'huisarts': 35,
+            'openbaar_vervoer': 30,
+            'basisschool': 0,
+            'apotheek': 0,
+            'sportfaciliteiten': 0,
+            'horeca': 0,
+            'werkgelegenheid': 0,
+            'cultuur': 0,
+            'groenvoorziening': 0
+        },
+        'active': True
+    },
+    'gezin': {
+        'display_name': 'Gezin met kinderen',
+        'gewichten': {
+            'basisschool': 25,
+            'supermarkt': 20,
+            'huisarts': 15,
+            'openbaar_vervoer': 15,
+            'apotheek': 10,
+            'sportfaciliteiten': 10,
+            'groenvoorziening': 5,
+            'horeca': 0,
+            'werkgelegenheid': 0,
+            'cultuur': 0
+        },
+        'active': True
+    },
+    'senior': {
+        'display_name': 'Senior 65+',
+        'gewichten': {
+            'huisarts': 30,
+            'apotheek': 20,
+            'supermarkt': 20,
+            'openbaar_vervoer': 15,
+            'cultuur': 5,
+            'groenvoorziening': 5,
+            'horeca': 3,
+            'sportfaciliteiten': 2,
+            'basisschool': 0,
+            'werkgelegenheid': 0
+        },
+        'active': True
+    },
+    'student': {
+        'display_name': 'Student',
+        'gewichten': {
+            'openbaar_vervoer': 30,
+            'supermarkt': 25,
+            'horeca': 15,
+            'sportfaciliteiten': 10,
+            'cultuur': 10,
+            'huisarts': 5,
+            'apotheek': 5,
+            'basisschool': 0,
+            'werkgelegenheid': 0,
+            'groenvoorziening': 0
+        },
+        'active': True
+    },
+    'starter': {
+        'display_name': 'Starter op woningmarkt',
+        'gewichten': {
+            'openbaar_vervoer': 25,
+            'supermarkt': 20,
+            'huisarts': 15,
+            'werkgelegenheid': 15,
+            'sportfaciliteiten': 10,
+            'apotheek': 5,
+            'horeca': 5,
+            'cultuur': 5,
+            'basisschool': 0,
+            'groenvoorziening': 0
+        },
+        'active': True
+    }
+}
@@ -0,0 +1,85 @@
+"""
+Deadlines voor ProximaScore requests
+Een request krijgt één tijdsbudget (per route in te stellen) dat over geocoding
+en de categorie lookups wordt verdeeld. Elke upstream call krijgt als timeout
+het minimum van zijn eigen timeout en de resterende tijd; is het budget op, dan
+wordt er geen nieuwe call meer gestart (DeadlineExceeded) en komt het resultaat
+terug met de afgeronde categorieen en een `incomplete` markering.
+
+De actieve deadline staat in een ContextVar: asyncio taken en asyncio.to_thread
+nemen hem vanzelf mee, voor ThreadPoolExecutor taken zet activate() hem.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('proximascore_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Het tijdsbudget van het request is op"""
+
+
+class Deadline:
+    """Absoluut eindmoment voor een request, met hulpfuncties voor deelbudgetten"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def child(self, share):
+        """Deelbudget: `share` van het totale budget, maar nooit meer dan er nog over is"""
+        return Deadline(min(self.remaining(), self.budget * share))
+
+    def timeout(self, default):
+        """Timeout voor een upstream call; DeadlineExceeded als er geen tijd meer is"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Tijdsbudget van {self.budget:.1f}s verstreken")
+        return min(default, remaining)
+
+
+def current():
+    """De deadline van het lopende request, of None"""
+    return _current.get()
+
+
+@contextmanager
+def activate(deadline):
+    """Maak `deadline` actief voor de code in dit blok (None = geen deadline)"""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def upstream_timeout(default):
+    """Timeout voor een upstream call onder de actieve deadline"""
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    return deadline.timeout(default)
+
+
+def request_deadline(budgets, route, requested_ms=None):
+    """
+    Deadline voor een route volgens `budgets` ({route: seconden of None}).
+    Een client mag met requested_ms (bijv. X-Deadline-Ms) een korter budget vragen.
+    """
+    budget = budgets.get(route)
+    if requested_ms:
+        try:
+            requested = int(requested_ms) / 1000
+        except ValueError:
+            requested = None
+        if requested and requested > 0:
+            budget = min(budget, requested) if budget else requested
+    return Deadline(budget) if budget else None
@@ -0,0 +1,230 @@
+"""
+GTFS halte index voor ProximaScore
+Laadt stops.txt (en optioneel het aantal vertrekken uit stop_times.txt) uit een
+GTFS feed in een in-memory grid index, zodat de categorie openbaar_vervoer
+zonder Google calls beantwoord kan worden. Een nieuwe feed op dezelfde plek
+wordt automatisch opnieuw ingeladen.
+"""
+
+import copy
+import csv
+import io
+import math
+import threading
+import time
+import zipfile
+from array import array
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from proximascore.place_records import PlaceColumns
+from proximascore.poi_providers import PlaceProvider, calculate_distance
+
+# Grid van 0.01 graad, gelijk aan de OSM store
+CELL_SIZE = 0.01
+
+# location_type 0/leeg = halte of perron, 1 = station; ingangen en knooppunten tellen niet mee
+HALTE_LOCATION_TYPES = {'', '0', '1'}
+
+
+def _cell(lat, lng):
+    return math.floor(lat / CELL_SIZE), math.floor(lng / CELL_SIZE)
+
+
+class GtfsFeed:
+    """Leest bestanden uit een GTFS map of zip"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def exists(self):
+        return self.path.is_file() or (self.path / 'stops.txt').is_file()
+
+    def mtime(self):
+        """Laatste wijziging van de feed, om een nieuwe feed te herkennen"""
+        if self.path.is_file():
+            return self.path.stat().st_mtime
+        return max(
+            (self.path / name).stat().st_mtime
+            for name in ('stops.txt', 'stop_times.txt')
+            if (self.path / name).is_file()
+        )
+
+    def has_file(self, name):
+        if self.path.is_file():
+            with zipfile.ZipFile(self.path) as archive:
+                return name in archive.namelist()
+        return (self.path / name).is_file()
+
+    def rows(self, name):
+        """Stream de rijen van een GTFS bestand als dicts"""
+        if self.path.is_file():
+            with zipfile.ZipFile(self.path) as archive:
+                with archive.open(name) as raw:
+                    yield from csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig'))
+        else:
+            with open(self.path / name, 'r', encoding='utf-8-sig', newline='') as f:
+                yield from csv.DictReader(f)
+
+
+class TransitStopIndex:
+    """Haltes in kolommen (PlaceColumns) met een grid index voor nearest-stop queries"""
+
+    def __init__(self, stops, departures):
+        self.stops = stops
+        self.lats = stops.lats
+        self.lngs = stops.lngs
+        self.departures = array('I', departures)
+        self.grid = defaultdict(lambda: array('I'))
+        for index, (lat, lng) in enumerate(zip(self.lats, self.lngs)):
+            self.grid[_cell(lat, lng)].append(index)
+
+        if len(stops):
+            self.bbox = (min(self.lats), min(self.lngs), max(self.lats), max(self.lngs))
+        else:
+            self.bbox = None
+
+    @classmethod
+    def from_feed(cls, feed, with_frequency=True):
+        """Bouw een index uit een GTFS feed"""
+        start = time.perf_counter()
+        stops = {}
+        parents = {}
+        for row in feed.rows('stops.txt'):
+            if row.get('location_type', '') not in HALTE_LOCATION_TYPES:
+                continue
+            try:
+                lat, lng = float(row['stop_lat']), float(row['stop_lon'])
+            except (KeyError, ValueError):
+                continue
+            stops[row['stop_id']] = (row.get('stop_name', ''), lat, lng)
+            if row.get('parent_station'):
+                parents[row['stop_id']] = row['parent_station']
+
+        departures = Counter()
+        if with_frequency and feed.has_file('stop_times.txt'):
+            for row in feed.rows('stop_times.txt'):
+                departures[row['stop_id']] += 1
+            # Vertrekken van perrons tellen mee voor het station
+            for stop_id, parent in parents.items():
+                if parent in stops:
+                    departures[parent] += departures[stop_id]
+
+        # Perrons met een bekend station vallen samen met dat station
+        columns = PlaceColumns()
+        counts = []
+        for stop_id, (name, lat, lng) in stops.items():
+            if parents.get(stop_id) in stops:
+                continue
+            columns.append(name, '', lat, lng, category='openbaar_vervoer')
+            counts.append(departures.get(stop_id, 0))
+
+        index = cls(columns, counts)
+        print(f"GTFS index geladen: {len(columns)} haltes ({len(columns.strings)} unieke namen) "
+              f"in {time.perf_counter() - start:.1f}s")
+        return index
+
+    def covers(self, lat, lng):
+        if not self.bbox:
+            return False
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+    def nearest(self, lat, lng, limit=3, radius=2000, min_departures=0):
+        """Dichtstbijzijnde haltes binnen radius meter, als (afstand, index) paren"""
+        row, column = _cell(lat, lng)
+        row_span = int(radius / 111320 / CELL_SIZE) + 1
+        column_span = int(radius / (111320 * max(math.cos(math.radians(lat)), 0.01)) / CELL_SIZE) + 1
+
+        found = []
+        for cell_row in range(row - row_span, row + row_span + 1):
+            for cell_column in range(column - column_span, column + column_span + 1):
+                for index in self.grid.get((cell_row, cell_column), ()):
+                    if self.departures[index] < min_departures:
+                        continue
+                    distance = calculate_distance(lat, lng, self.lats[index], self.lngs[index])
+                    if distance <= radius:
+                        found.append((distance, index))
+
+        found.sort()
+        return found[:limit]
+
+
+class GtfsTransitProvider(PlaceProvider):
+    """Lokale bron voor openbaar_vervoer op basis van een GTFS feed"""
+
+    name = 'gtfs'
+    categories = ('openbaar_vervoer',)
+
+    def __init__(self, feed_path, radius=2000, min_departures=0, reload_interval=60):
+        self.feed = GtfsFeed(feed_path)
+        self.radius = radius
+        self.min_departures = min_departures
+        self.reload_interval = reload_interval
+        # Haltes per lookup; None = alle haltes binnen radius
+        self.limit = 10
+        self.index = None
+        self._loaded_mtime = None
+        self._last_check = 0
+        self._loading = False
+        self._lock = threading.Lock()
+        self.maybe_reload(force=True)
+
+    def maybe_reload(self, force=False, background=True):
+        """
+        Laad de feed opnieuw als er een nieuwere versie is neergezet. Het parsen gebeurt
+        in een eigen thread; tot de nieuwe index klaar is blijft de oude actief (of geeft
+        deze bron nog geen antwoord), zodat opstarten en requests er nooit op wachten.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_interval:
+            return False
+        with self._lock:
+            self._last_check = now
+            if self._loading or not self.feed.exists():
+                return False
+            mtime = self.feed.mtime()
+            if mtime == self._loaded_mtime:
+                return False
+            self._loading = True
+
+        def run():
+            try:
+                # Nieuwe index eerst volledig bouwen, dan in één keer wisselen.
+                # stop_times.txt is vaak honderden MB: alleen lezen als er op vertrekken gefilterd wordt
+                index = TransitStopIndex.from_feed(self.feed, with_frequency=self.min_departures > 0)
+                self.index = index
+                self._loaded_mtime = mtime
+            except Exception as e:
+                print(f"GTFS feed laden gefaald, oude index blijft actief: {str(e)}")
+            finally:
+                with self._lock:
+                    self._loading = False
+
+        if background:
+            threading.Thread(target=run, name='gtfs-index', daemon=True).start()
+        else:
+            run()
+        return True
+
+    def widened(self, extra_distance):
+        # Deelt feed en index; grotere zoekradius en zonder limiet, zodat de dichtstbijzijnde
+        # haltes van elk adres in het cluster erbij zitten (niet alleen die van het midden)
+        provider = copy.copy(self)
+        provider.radius = self.radius + extra_distance
+        provider.limit = None
+        return provider
+
+    def find_places(self, lat, lng, category, place_types):
+        if category not in self.categories:
+            return None
+        self.maybe_reload()
+        index = self.index
+        if index is None or not index.covers(lat, lng):
+            return None
+
+        return [
+            index.stops.place(stop, round(distance))
+            for distance, stop in index.nearest(lat, lng, limit=self.limit, radius=self.radius,
+                                                min_departures=self.min_departures)
+        ]
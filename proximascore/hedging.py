@@ -0,0 +1,277 @@
+"""
+Hedged requests voor upstream calls
+Een enkele Nearby Search call blijft soms seconden hangen terwijl een nieuwe
+poging binnen een paar honderd ms terug is. Met hedging wordt na een adaptieve
+vertraging (standaard de waargenomen p90 van die API) een tweede, identieke call
+gestart.
+
+Sync (call): de eerste call draait in een eigen korte thread, buiten de pool; de
+aanroeper wacht op het eerste geslaagde antwoord. Alleen de hedge gaat naar de
+pool, via één timer thread: een call die binnen de vertraging klaar is kost dus
+geen pool thread en staat nergens in een wachtrij. Wint de hedge, dan loopt de
+hangende eerste call op de achtergrond af (tot zijn eigen timeout); faalt een
+van beide, dan telt het antwoord van de andere. Async (acall): het eerste
+antwoord wint en de verliezer wordt afgebroken.
+
+Het aantal extra calls is begrensd met een token bucket die per gewone call
+`max_extra_ratio` tokens bijvult: bij 0.05 kost hedging nooit meer dan ~5% extra
+quota, ook niet als de upstream als geheel traag wordt.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HedgeBudget:
+    """Token bucket: elke gewone call levert `ratio` tokens op, een hedge kost er één"""
+
+    def __init__(self, ratio, burst=5):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class LatencyWindow:
+    """De laatste `size` latencies van een API, voor de adaptieve hedge vertraging"""
+
+    def __init__(self, size=500):
+        self.samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            values = sorted(self.samples)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class _HedgeSlot:
+    """
+    Eén sync call: de eerste call en de geplande hedge leveren hun uitkomst hier af;
+    het eerste succes wint, een fout telt pas als er geen poging meer loopt
+    """
+
+    __slots__ = ('function', 'args', 'kwargs', 'attempts', 'closed', 'lock', 'done',
+                 'winner', 'result', 'errors')
+
+    def __init__(self, function, args, kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        # Lopende pogingen; de hedge komt erbij als de timer hem start
+        self.attempts = 1
+        self.closed = False
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.winner = None
+        self.result = None
+        self.errors = {}
+
+    def deliver(self, attempt, result=None, error=None):
+        with self.lock:
+            if self.closed:
+                return
+            if error is not None:
+                self.errors[attempt] = error
+                if len(self.errors) < self.attempts:
+                    return
+            else:
+                self.winner = attempt
+                self.result = result
+            # Klaar: geen hedge meer starten
+            self.closed = True
+        self.done.set()
+
+
+class Hedger:
+    """
+    Voert een upstream call uit met een optionele tweede poging.
+    name: naam van de API voor logging en statistieken.
+    percentile: de hedge gaat de deur uit na deze percentiel van de recente latency.
+    min_samples: tot er zoveel metingen zijn geldt initial_delay.
+    """
+
+    def __init__(self, name, percentile=0.9, max_extra_ratio=0.05, burst=5,
+                 min_delay=0.05, initial_delay=1.0, min_samples=20, workers=16):
+        self.name = name
+        self.fraction = percentile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.budget = HedgeBudget(max_extra_ratio, burst)
+        self.latencies = LatencyWindow()
+        self.workers = workers
+        self._executor = None
+        # Geplande hedges (tijdstip, volgnummer, slot) voor de timer thread
+        self._timers = []
+        self._sequence = itertools.count()
+        self._timers_changed = threading.Condition()
+        self._timer_thread = None
+        self.stats = {
+            'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'primary_wins': 0,
+            'budget_denied': 0, 'errors': 0,
+        }
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Hoe lang op de eerste call gewacht wordt voordat de hedge vertrekt"""
+        if len(self.latencies) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, self.latencies.percentile(self.fraction))
+
+    def call(self, function, *args, **kwargs):
+        """
+        Roep function(*args, **kwargs) aan en wacht op het antwoord. Duurt dat langer
+        dan delay(), dan start een identieke hedge in de pool; het eerste geslaagde
+        antwoord wordt teruggegeven, de verliezer loopt op de achtergrond af.
+        """
+        self._count('calls')
+        self.budget.deposit()
+        slot = _HedgeSlot(function, args, kwargs)
+        self._schedule(self.delay(), slot)
+        threading.Thread(target=self._attempt, args=(slot, 'primary'), name=f"hedge-primary-{self.name}",
+                         daemon=True).start()
+
+        slot.done.wait()
+        if slot.winner is None:
+            raise slot.errors.get('primary') or slot.errors['hedge']
+        if slot.attempts > 1:
+            self._count('hedge_wins' if slot.winner == 'hedge' else 'primary_wins')
+        return slot.result
+
+    def _attempt(self, slot, attempt):
+        try:
+            result = self._timed(slot.function, slot.args, slot.kwargs)
+        except Exception as error:
+            slot.deliver(attempt, error=error)
+        else:
+            slot.deliver(attempt, result)
+
+    def _schedule(self, delay, slot):
+        with self._timers_changed:
+            heapq.heappush(self._timers, (time.monotonic() + delay, next(self._sequence), slot))
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._timer_loop, name=f"hedge-timer-{self.name}",
+                                                      daemon=True)
+                self._timer_thread.start()
+            self._timers_changed.notify()
+
+    def _timer_loop(self):
+        with self._timers_changed:
+            while True:
+                now = time.monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    self._launch(heapq.heappop(self._timers)[2])
+                self._timers_changed.wait(self._timers[0][0] - now if self._timers else None)
+
+    def _launch(self, slot):
+        """Start de hedge als de eerste call nog loopt en het budget het toelaat"""
+        with slot.lock:
+            if slot.closed or not self._may_hedge():
+                return
+            slot.attempts += 1
+        self._get_executor().submit(self._attempt, slot, 'hedge')
+
+    async def acall(self, function, *args, **kwargs):
+        """Async variant van call voor coroutine functies; de verliezer wordt afgebroken"""
+        import asyncio
+        self._count('calls')
+        self.budget.deposit()
+
+        primary = asyncio.ensure_future(self._atimed(function, args, kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=self.delay())
+        if done or not self._may_hedge():
+            return await primary
+
+        hedge = asyncio.ensure_future(self._atimed(function, args, kwargs))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None or not pending:
+                        self._record_winner(task, hedge)
+                        return task.result()
+        finally:
+            for task in (primary, hedge):
+                task.cancel()
+
+    def _may_hedge(self):
+        if self.budget.withdraw():
+            self._count('hedged')
+            return True
+        self._count('budget_denied')
+        return False
+
+    def _record_winner(self, future, hedge):
+        if future.exception() is None:
+            self._count('hedge_wins' if future is hedge else 'primary_wins')
+
+    def _timed(self, function, args, kwargs):
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self._count('errors')
+            raise
+        # Alleen geslaagde calls; een timeout zegt niets over de normale latency
+        self.latencies.add(time.perf_counter() - start)
+        return result
+
+    async def _atimed(self, function, args, kwargs):
+        start = time.perf_counter()
+        try:
+            result = await function(*args, **kwargs)
+        except Exception:
+            self._count('errors')
+            raise
+        self.latencies.add(time.perf_counter() - start)
+        return result
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix=f"hedge-{self.name}")
+        return self._executor
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        """Tellers, winstpercentage van hedges en de huidige vertraging"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['hedge_rate'] = round(stats['hedged'] / stats['calls'], 4) if stats['calls'] else 0.0
+        stats['hedge_win_rate'] = round(stats['hedge_wins'] / stats['hedged'], 4) if stats['hedged'] else 0.0
+        stats['delay_ms'] = round(self.delay() * 1000, 1)
+        for fraction in (0.5, 0.9, 0.99):
+            value = self.latencies.percentile(fraction)
+            stats[f"p{int(fraction * 100)}_ms"] = round(value * 1000, 1) if value is not None else None
+        return stats
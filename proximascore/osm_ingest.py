@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+OpenStreetMap ingestie voor ProximaScore
+Leest een lokale .osm.pbf of GeoJSON extract in batches in, koppelt OSM tags
+aan de ALLE_VOORZIENINGEN categorieen en schrijft de POIs naar een compacte,
+ruimtelijk geindexeerde SQLite store. De store dient als lokale POI bron
+(OsmPlaceProvider), zodat batch- en heatmap berekeningen zonder Google calls kunnen.
+
+Gebruik:
+    python -m proximascore.osm_ingest netherlands-latest.osm.pbf --region nederland
+    python -m proximascore.osm_ingest noord-brabant.geojson --region noord-brabant
+"""
+
+import argparse
+import json
+import math
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from proximascore.place_records import Place
+from proximascore.poi_providers import PlaceProvider, calculate_distance
+
+DEFAULT_STORE_PATH = 'data/poi_store.db'
+
+# OSM tag (key, value) -> ProximaScore categorie. Waarde '*' matcht elke waarde.
+OSM_TAG_MAPPING = {
+    'supermarkt': [('shop', 'supermarket')],
+    'huisarts': [('amenity', 'doctors'), ('healthcare', 'doctor'), ('amenity', 'clinic'),
+                 ('amenity', 'hospital'), ('healthcare', 'physiotherapist')],
+    'openbaar_vervoer': [('highway', 'bus_stop'), ('railway', 'station'), ('railway', 'halt'),
+                         ('railway', 'tram_stop'), ('public_transport', 'station'), ('station', 'subway')],
+    'basisschool': [('amenity', 'school')],
+    'apotheek': [('amenity', 'pharmacy'), ('healthcare', 'pharmacy')],
+    'sportfaciliteiten': [('leisure', 'fitness_centre'), ('leisure', 'sports_centre'),
+                          ('leisure', 'stadium'), ('leisure', 'bowling_alley')],
+    'horeca': [('amenity', 'restaurant'), ('amenity', 'bar'), ('amenity', 'cafe'),
+               ('amenity', 'fast_food'), ('amenity', 'pub')],
+    'werkgelegenheid': [('shop', '*'), ('office', '*')],
+    'cultuur': [('amenity', 'library'), ('tourism', 'museum'), ('amenity', 'cinema'),
+                ('tourism', 'gallery'), ('amenity', 'theatre'), ('tourism', 'attraction')],
+    'groenvoorziening': [('leisure', 'park')],
+}
+
+# Grid van 0.01 graad (~1.1 km noord-zuid, ~0.7 km oost-west in Nederland)
+CELL_SIZE = 0.01
+CELL_COLUMNS = 40000
+# Dekking van een regio: grove cellen (~5.5 x 3.5 km) met minstens één POI. De bbox
+# van een extract bevat hoeken buiten de regio (buurprovincies, zee); daar liggen geen POIs.
+COVERAGE_CELL_SIZE = 0.05
+
+
+def cell_id(lat, lng, size=CELL_SIZE):
+    """Grid cel nummer voor een coordinaat; cellen in een rij zijn aaneengesloten"""
+    row = math.floor(lat / size)
+    column = math.floor(lng / size) + CELL_COLUMNS // 2
+    return row * CELL_COLUMNS + column
+
+
+def degrees_around(lat, radius):
+    """(delta_lat, delta_lng) in graden voor radius meter rond breedtegraad lat"""
+    return radius / 111320, radius / (111320 * max(math.cos(math.radians(lat)), 0.01))
+
+
+def coverage_cells(lat, lng, radius):
+    """Grove dekkingscellen die de bbox van een zoekcirkel raakt"""
+    delta_lat, delta_lng = degrees_around(lat, radius)
+    first = cell_id(lat - delta_lat, lng - delta_lng, COVERAGE_CELL_SIZE)
+    last = cell_id(lat + delta_lat, lng + delta_lng, COVERAGE_CELL_SIZE)
+    return {
+        row * CELL_COLUMNS + column
+        for row in range(first // CELL_COLUMNS, last // CELL_COLUMNS + 1)
+        for column in range(first % CELL_COLUMNS, last % CELL_COLUMNS + 1)
+    }
+
+
+def match_categories(tags):
+    """Alle ProximaScore categorieen waar een set OSM tags onder valt"""
+    categories = []
+    for category, tag_rules in OSM_TAG_MAPPING.items():
+        for key, value in tag_rules:
+            tag_value = tags.get(key)
+            if tag_value and (value == '*' or tag_value == value):
+                categories.append(category)
+                break
+    return categories
+
+
+def _poi_records(osm_id, tags, lat, lng):
+    """Zet een OSM object om naar store records, één per categorie"""
+    categories = match_categories(tags)
+    if not categories:
+        return []
+
+    name = tags.get('name')
+    if not name:
+        # Naamloze parken en haltes krijgen hun tag waarde als naam
+        for key in ('leisure', 'amenity', 'shop', 'highway', 'railway', 'tourism'):
+            if key in tags:
+                name = tags[key].replace('_', ' ').capitalize()
+                break
+
+    straat = ' '.join(filter(None, [tags.get('addr:street'), tags.get('addr:housenumber')]))
+    address = ', '.join(filter(None, [straat, tags.get('addr:city')]))
+    return [(f"{osm_id}:{category}", category, name or '', address, lat, lng, cell_id(lat, lng))
+            for category in categories]
+
+
+def _centroid(coordinates):
+    """Gemiddelde van een lijst (lng, lat) punten"""
+    if not coordinates:
+        return None
+    lng = sum(point[0] for point in coordinates) / len(coordinates)
+    lat = sum(point[1] for point in coordinates) / len(coordinates)
+    return lat, lng
+
+
+def _geometry_point(geometry):
+    """Representatief punt (lat, lng) voor een GeoJSON geometrie"""
+    if not geometry:
+        return None
+    kind = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    if kind == 'Point':
+        return coordinates[1], coordinates[0]
+    if kind == 'LineString':
+        return _centroid(coordinates)
+    if kind == 'Polygon':
+        return _centroid(coordinates[0])
+    if kind == 'MultiPolygon':
+        return _centroid(coordinates[0][0])
+    return None
+
+
+def iter_geojson_features(path, chunk_size=1 << 16):
+    """
+    Stream features uit een GeoJSON FeatureCollection of een GeoJSONSeq bestand
+    (één feature per regel) zonder het hele bestand in het geheugen te laden.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size)
+        start = buffer.find('"features"')
+
+        if start < 0:
+            # GeoJSONSeq: één feature per regel (eventueel met RS scheidingsteken)
+            f.seek(0)
+            for line in f:
+                line = line.strip().lstrip('\x1e')
+                if line:
+                    yield json.loads(line)
+            return
+
+        position = buffer.index('[', start) + 1
+        while True:
+            # Sla scheidingstekens over, lees bij als de buffer op is
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position < len(buffer):
+                    break
+                more = f.read(chunk_size)
+                if not more:
+                    return
+                buffer, position = more, 0
+
+            if buffer[position] == ']':
+                return
+
+            while True:
+                try:
+                    feature, end = decoder.raw_decode(buffer, position)
+                    break
+                except json.JSONDecodeError:
+                    more = f.read(chunk_size)
+                    if not more:
+                        raise
+                    buffer = buffer[position:] + more
+                    position = 0
+
+            yield feature
+            position = end
+
+
+def iter_geojson_pois(path):
+    """POI records uit een GeoJSON extract"""
+    for index, feature in enumerate(iter_geojson_features(path)):
+        properties = feature.get('properties') or {}
+        tags = properties.get('tags', properties)
+        point = _geometry_point(feature.get('geometry'))
+        if not point:
+            continue
+        osm_id = feature.get('id') or properties.get('@id') or properties.get('osm_id') or f"f{index}"
+        yield from _poi_records(osm_id, tags, point[0], point[1])
+
+
+def ingest_pbf(path, store, region, batch_size):
+    """Lees een .osm.pbf extract met pyosmium (nodes en gesloten ways)"""
+    try:
+        import osmium
+    except ImportError:
+        raise RuntimeError("Voor .osm.pbf bestanden is pyosmium nodig: pip install osmium")
+
+    class PoiHandler(osmium.SimpleHandler):
+        def __init__(self):
+            super().__init__()
+            self.batch = []
+
+        def _add(self, osm_id, tags, lat, lng):
+            self.batch.extend(_poi_records(osm_id, tags, lat, lng))
+            if len(self.batch) >= batch_size:
+                store.write_batch(self.batch, region)
+                self.batch = []
+
+        def node(self, n):
+            if n.tags and n.location.valid():
+                self._add(f"n{n.id}", {tag.k: tag.v for tag in n.tags}, n.location.lat, n.location.lon)
+
+        def way(self, w):
+            if not w.tags:
+                return
+            tags = {tag.k: tag.v for tag in w.tags}
+            if not match_categories(tags):
+                return
+            points = [(node.lon, node.lat) for node in w.nodes if node.location.valid()]
+            point = _centroid(points)
+            if point:
+                self._add(f"w{w.id}", tags, point[0], point[1])
+
+    handler = PoiHandler()
+    # Node locaties in een bestand op schijf houden, zodat het geheugen begrensd blijft
+    index_path = Path(store.db_path).with_suffix('.nodes.idx')
+    handler.apply_file(str(path), locations=True, idx=f'sparse_file_array,{index_path}')
+    if handler.batch:
+        store.write_batch(handler.batch, region)
+    index_path.unlink(missing_ok=True)
+
+
+class PoiStore:
+    """Compacte SQLite store met POIs per regio, geindexeerd op grid cel"""
+
+    def __init__(self, db_path=DEFAULT_STORE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(exist_ok=True)
+        self._current_import = {}
+        self.init_database()
+
+    def init_database(self):
+        """Initialiseer database schema"""
+        with sqlite3.connect(self.db_path) as conn:
+            primary_key = [column[1] for column in sorted(conn.execute('PRAGMA table_info(pois)'),
+                                                          key=lambda column: column[5]) if column[5]]
+            if primary_key == ['poi_id']:
+                # Oude store: overlappende regio's pakten elkaars POIs af bij een upsert
+                print("POI store migreren naar sleutel (region, poi_id)")
+                conn.execute('ALTER TABLE pois RENAME TO pois_old')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pois (
+                    poi_id TEXT,
+                    region TEXT,
+                    category TEXT,
+                    name TEXT,
+                    address TEXT,
+                    lat REAL,
+                    lng REAL,
+                    cell INTEGER,
+                    import_id INTEGER,
+                    PRIMARY KEY (region, poi_id)
+                ) WITHOUT ROWID
+            ''')
+            if primary_key == ['poi_id']:
+                conn.execute('INSERT INTO pois SELECT poi_id, region, category, name, address, lat, lng, cell, '
+                             'import_id FROM pois_old')
+                conn.execute('DROP TABLE pois_old')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pois_category_cell ON pois (category, cell)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pois_region ON pois (region, import_id)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS regions (
+                    region TEXT PRIMARY KEY,
+                    import_id INTEGER,
+                    min_lat REAL,
+                    min_lng REAL,
+                    max_lat REAL,
+                    max_lng REAL,
+                    poi_count INTEGER,
+                    imported_at TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS region_cells (
+                    region TEXT,
+                    cell INTEGER,
+                    PRIMARY KEY (region, cell)
+                ) WITHOUT ROWID
+            ''')
+            # Regio's van voor de dekkingscellen: afleiden uit hun POIs (één punt per grid cel)
+            for (region,) in conn.execute(
+                    'SELECT region FROM regions WHERE region NOT IN (SELECT region FROM region_cells)').fetchall():
+                cells = {
+                    cell_id(lat, lng, COVERAGE_CELL_SIZE)
+                    for lat, lng in conn.execute('SELECT MIN(lat), MIN(lng) FROM pois WHERE region = ? GROUP BY cell',
+                                                 (region,))
+                }
+                conn.executemany('INSERT INTO region_cells (region, cell) VALUES (?, ?)',
+                                 [(region, cell) for cell in cells])
+
+    def begin_import(self, region):
+        """Start een (her)import van een regio met een nieuw import id"""
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute('SELECT import_id FROM regions WHERE region = ?', (region,)).fetchone()
+        import_id = (row[0] if row else 0) + 1
+        self._current_import[region] = {
+            'import_id': import_id,
+            'count': 0,
+            'bbox': [90.0, 180.0, -90.0, -180.0],
+            'cells': set(),
+        }
+        return import_id
+
+    def write_batch(self, records, region):
+        """Schrijf één batch POIs in één transactie (upsert op region en poi_id)"""
+        state = self._current_import[region]
+        bbox = state['bbox']
+        rows = []
+        for poi_id, category, name, address, lat, lng, cell in records:
+            rows.append((poi_id, region, category, name, address, lat, lng, cell, state['import_id']))
+            bbox[0], bbox[1] = min(bbox[0], lat), min(bbox[1], lng)
+            bbox[2], bbox[3] = max(bbox[2], lat), max(bbox[3], lng)
+            state['cells'].add(cell_id(lat, lng, COVERAGE_CELL_SIZE))
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO pois
+                (poi_id, region, category, name, address, lat, lng, cell, import_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        state['count'] += len(rows)
+        print(f"Batch opgeslagen: {len(rows)} POIs ({state['count']} totaal voor {region})")
+
+    def finish_import(self, region):
+        """Verwijder POIs die niet meer in de extract zitten en registreer de regio"""
+        state = self._current_import.pop(region)
+        with sqlite3.connect(self.db_path) as conn:
+            removed = conn.execute(
+                'DELETE FROM pois WHERE region = ? AND import_id != ?',
+                (region, state['import_id'])
+            ).rowcount
+            conn.execute('''
+                INSERT OR REPLACE INTO regions
+                (region, import_id, min_lat, min_lng, max_lat, max_lng, poi_count, imported_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (region, state['import_id'], *state['bbox'], state['count'], datetime.now()))
+            conn.execute('DELETE FROM region_cells WHERE region = ?', (region,))
+            conn.executemany('INSERT INTO region_cells (region, cell) VALUES (?, ?)',
+                             [(region, cell) for cell in state['cells']])
+        print(f"Regio {region}: {state['count']} POIs, {removed} verouderde POIs verwijderd")
+        return state['count'], removed
+
+    def covers(self, lat, lng, radius=0):
+        """
+        Valt de zoekcirkel (radius meter rond het punt) helemaal binnen één geimporteerde
+        regio? Dat wil zeggen: binnen de bbox van de regio en alleen in dekkingscellen
+        met POIs. Anders is 'niets gevonden' of 'dichtstbijzijnde' niet betrouwbaar.
+        """
+        delta_lat, delta_lng = degrees_around(lat, radius)
+        needed = coverage_cells(lat, lng, radius)
+        placeholders = ', '.join('?' for _ in needed)
+        with sqlite3.connect(self.db_path) as conn:
+            regions = conn.execute('''
+                SELECT region FROM regions
+                WHERE min_lat <= ? AND max_lat >= ? AND min_lng <= ? AND max_lng >= ?
+            ''', (lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng)).fetchall()
+            for (region,) in regions:
+                covered = conn.execute(
+                    f'SELECT COUNT(*) FROM region_cells WHERE region = ? AND cell IN ({placeholders})',
+                    [region, *needed]
+                ).fetchone()[0]
+                if covered == len(needed):
+                    return True
+        return False
+
+    def query(self, lat, lng, category, radius):
+        """Alle POIs van een categorie binnen radius meter, met afstand"""
+        delta_lat, delta_lng = degrees_around(lat, radius)
+        first = cell_id(lat - delta_lat, lng - delta_lng)
+        last = cell_id(lat + delta_lat, lng + delta_lng)
+        first_column = first % CELL_COLUMNS
+        last_column = last % CELL_COLUMNS
+
+        ranges = []
+        for row in range(first // CELL_COLUMNS, last // CELL_COLUMNS + 1):
+            ranges.append((row * CELL_COLUMNS + first_column, row * CELL_COLUMNS + last_column))
+
+        where = ' OR '.join('cell BETWEEN ? AND ?' for _ in ranges)
+        params = [category] + [bound for cell_range in ranges for bound in cell_range]
+
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                # Overlappende regio's hebben dezelfde POI elk onder hun eigen regio
+                f'SELECT name, address, lat, lng FROM pois WHERE category = ? AND ({where}) GROUP BY poi_id',
+                params
+            ).fetchall()
+
+        places = []
+        for name, address, place_lat, place_lng in rows:
+            distance = calculate_distance(lat, lng, place_lat, place_lng)
+            if distance <= radius:
+                places.append(Place(name, address, round(distance), place_lat, place_lng))
+        return places
+
+
+class OsmPlaceProvider(PlaceProvider):
+    """Lokale POI bron op basis van een OSM store; geen antwoord buiten geimporteerde regio's"""
+
+    name = 'osm'
+
+    def __init__(self, store, radius=2000):
+        self.store = store
+        self.radius = radius
+
+    def find_places(self, lat, lng, category, place_types):
+        if category not in OSM_TAG_MAPPING or not self.store.covers(lat, lng, self.radius):
+            return None
+        return self.store.query(lat, lng, category, self.radius)
+
+    def widened(self, extra_distance):
+        return OsmPlaceProvider(self.store, self.radius + extra_distance)
+
+
+def ingest(path, region, store_path=DEFAULT_STORE_PATH, batch_size=5000):
+    """Importeer (of her-importeer) een regio uit een lokale extract"""
+    path = Path(path)
+    store = PoiStore(store_path)
+    store.begin_import(region)
+    start = time.perf_counter()
+
+    if path.name.endswith('.osm.pbf'):
+        ingest_pbf(path, store, region, batch_size)
+    else:
+        batch = []
+        for record in iter_geojson_pois(path):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                store.write_batch(batch, region)
+                batch = []
+        if batch:
+            store.write_batch(batch, region)
+
+    count, removed = store.finish_import(region)
+    print(f"Import klaar in {time.perf_counter() - start:.1f}s")
+    return count, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importeer een OSM extract als lokale POI bron')
+    parser.add_argument('extract', help='Pad naar .osm.pbf of .geojson(l) bestand')
+    parser.add_argument('--region', required=True, help='Regio naam; een herimport vervangt alleen deze regio')
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help='Pad naar de POI store')
+    parser.add_argument('--batch-size', type=int, default=5000, help='POIs per transactie')
+    args = parser.parse_args()
+
+    ingest(args.extract, args.region, args.store, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
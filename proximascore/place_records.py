@@ -0,0 +1,142 @@
+"""
+Compacte place records voor ProximaScore
+Binnen de app reizen places als Place objecten met __slots__ (geen dict per place,
+veelvoorkomende namen zoals 'Albert Heijn' gedeeld via sys.intern). Grote sets,
+zoals een halte index, staan in PlaceColumns: coordinaten in arrays en strings en
+categorieen als ids in een tabel. Pas aan de API grens (de score entry van een
+categorie) worden places weer dicts in de bekende JSON vorm.
+
+In caches staat een place als rij [name, address, distance_meters, lat, lng, rating];
+oudere entries met dicts worden nog gewoon gelezen.
+"""
+
+import sys
+from array import array
+
+PLACE_FIELDS = ('name', 'address', 'distance_meters', 'lat', 'lng', 'rating')
+
+
+def _intern(value):
+    return sys.intern(value) if value else ''
+
+
+class Place:
+    """Eén voorziening; zelfde velden als het dict in de API"""
+
+    __slots__ = PLACE_FIELDS
+
+    def __init__(self, name, address, distance_meters, lat, lng, rating=0):
+        self.name = _intern(name)
+        self.address = _intern(address)
+        self.distance_meters = distance_meters
+        self.lat = lat
+        self.lng = lng
+        self.rating = rating
+
+    def to_dict(self):
+        """De JSON vorm van de API"""
+        return {
+            'name': self.name,
+            'address': self.address,
+            'distance_meters': self.distance_meters,
+            'lat': self.lat,
+            'lng': self.lng,
+            'rating': self.rating
+        }
+
+    def to_row(self):
+        return [self.name, self.address, self.distance_meters, self.lat, self.lng, self.rating]
+
+    @classmethod
+    def from_row(cls, row):
+        """Uit een cache rij, of uit een dict zoals caches dat vroeger bewaarden"""
+        if isinstance(row, dict):
+            return cls(*(row.get(field, 0 if field == 'rating' else '') for field in PLACE_FIELDS))
+        return cls(*row)
+
+    def __eq__(self, other):
+        if not isinstance(other, Place):
+            return NotImplemented
+        return self.to_row() == other.to_row()
+
+    def __repr__(self):
+        return f"Place({self.name!r}, {self.distance_meters}m)"
+
+
+def places_to_dicts(places):
+    return [place.to_dict() for place in places]
+
+
+def places_to_rows(places):
+    return [place.to_row() for place in places]
+
+
+def places_from_rows(rows):
+    return [Place.from_row(row) for row in rows]
+
+
+class StringTable:
+    """Elke string één keer; kolommen bewaren alleen het id"""
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def id_for(self, value):
+        value = value or ''
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.values)
+            self.values.append(_intern(value))
+        return string_id
+
+    def __getitem__(self, string_id):
+        return self.values[string_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class PlaceColumns:
+    """
+    Veel places in kolommen: per place twee doubles, een float en drie ids in
+    plaats van een object met zes velden. place(index, distance) geeft een Place.
+    """
+
+    def __init__(self):
+        self.lats = array('d')
+        self.lngs = array('d')
+        self.ratings = array('f')
+        self.name_ids = array('I')
+        self.address_ids = array('I')
+        self.category_ids = array('H')
+        self.strings = StringTable()
+        self.categories = StringTable()
+
+    def append(self, name, address, lat, lng, rating=0, category=''):
+        self.lats.append(lat)
+        self.lngs.append(lng)
+        self.ratings.append(rating or 0)
+        self.name_ids.append(self.strings.id_for(name))
+        self.address_ids.append(self.strings.id_for(address))
+        self.category_ids.append(self.categories.id_for(category))
+        return len(self.lats) - 1
+
+    def name(self, index):
+        return self.strings[self.name_ids[index]]
+
+    def category(self, index):
+        return self.categories[self.category_ids[index]]
+
+    def place(self, index, distance_meters):
+        rating = self.ratings[index]
+        return Place(self.name(index), self.strings[self.address_ids[index]], distance_meters,
+                     self.lats[index], self.lngs[index], round(rating, 1) if rating else 0)
+
+    def nbytes(self):
+        """Geheugen van de kolommen (zonder de string tabel)"""
+        columns = (self.lats, self.lngs, self.ratings, self.name_ids, self.address_ids, self.category_ids)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def __len__(self):
+        return len(self.lats)
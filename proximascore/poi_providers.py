@@ -0,0 +1,739 @@
+"""
+POI providers voor ProximaScore
+Elke provider levert genormaliseerde place records voor een categorie.
+Een ProviderChain vraagt de providers op volgorde af (goedkoopste eerst),
+zodat Google alleen wordt aangeroepen als de snellere bronnen geen antwoord hebben.
+
+Caches bewaren twee niveaus:
+- per (locatie, categorie): het samengestelde antwoord. De sleutel bevat een hash
+  van de google_types, zodat een gewijzigde categorie nooit oude data krijgt;
+- per (locatie, Google type): het antwoord van één Nearby Search call. Daaruit
+  stelt GooglePlacesProvider een categorie samen; na het toevoegen of weghalen
+  van een type wordt alleen het nieuwe type opgehaald.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from proximascore.cache_backends import MemoryCacheBackend
+from proximascore.deadline import DeadlineExceeded, current as current_deadline, upstream_timeout
+from proximascore.place_records import Place, places_from_rows, places_to_rows
+from proximascore.query_planner import MAX_SCORE_DISTANCE, QueryPlanner
+
+NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+# Nearby Search geeft 20 resultaten per pagina; een next_page_token is pas na een
+# korte vertraging geldig (tot dan INVALID_REQUEST)
+RESULTS_PER_PAGE = 20
+PAGE_TOKEN_DELAY = 2.0
+PAGE_TOKEN_ATTEMPTS = 3
+
+
+async def to_thread(function, *args):
+    """asyncio.to_thread; asyncio wordt pas bij gebruik geimporteerd (snelle start van de CLI)"""
+    import asyncio
+    return await asyncio.to_thread(function, *args)
+
+# Negatieve cache entry: de laatste poging bij de upstream is mislukt
+CACHED_ERROR = {'negative': 'error'}
+# Bronnen van een lookup die niet (volledig) gelukt is: geen score cache, niet in de verdeling
+FAILED_SOURCES = ('error', 'partial')
+
+
+class UpstreamError(Exception):
+    """Tijdelijke fout bij de upstream (HTTP fout, quota, ongeldig antwoord)"""
+
+
+class CachedUpstreamError(UpstreamError):
+    """Een recente upstream fout staat nog in de negatieve cache"""
+
+
+class PartialUpstreamError(UpstreamError):
+    """Een deel van de Google types faalde; places is het antwoord van de andere types"""
+
+    def __init__(self, message, places):
+        super().__init__(message)
+        self.places = places
+
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """Bereken afstand tussen twee punten (Haversine formule)"""
+    R = 6371000  # Earth radius in meters
+
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = (math.sin(delta_lat / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) *
+         math.sin(delta_lon / 2) ** 2)
+
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    return R * c
+
+
+def location_hash(lat, lng):
+    """Cache sleutel voor een locatie (6 decimalen, ~10 cm)"""
+    return hashlib.md5(f"{lat:.6f},{lng:.6f}".encode()).hexdigest()
+
+
+def types_digest(place_types):
+    """Korte hash van de google_types van een categorie (volgorde maakt niet uit)"""
+    return hashlib.md5(','.join(sorted(place_types)).encode()).hexdigest()[:8]
+
+
+def select_closest_places(places, limit=3):
+    """Verwijder duplicaten (naam + locatie) en geef de dichtstbijzijnde places terug"""
+    unique_places = []
+    seen_names = set()
+
+    for place in places:
+        # Normalize naam voor duplicate detection
+        normalized_name = place.name.lower().strip()
+        location_key = f"{place.lat:.6f},{place.lng:.6f}"
+        unique_key = f"{normalized_name}_{location_key}"
+
+        if unique_key not in seen_names:
+            unique_places.append(place)
+            seen_names.add(unique_key)
+        else:
+            print(f"⚠ Duplicate weggehaald: {place.name}")
+
+    # Sorteer op afstand, neem dichtstbijzijnde
+    unique_places.sort(key=lambda x: x.distance_meters)
+    return unique_places[:limit]
+
+
+class PlaceProvider:
+    """Basisklasse voor een POI bron"""
+
+    name = 'basis'
+
+    def find_places(self, lat, lng, category, place_types):
+        """
+        Geef een lijst met Place records (zie place_records) terug, of None als
+        deze bron de vraag niet kan beantwoorden.
+        Een lege lijst is een geldig antwoord: er is niets in de buurt.
+        """
+        raise NotImplementedError
+
+    def store_places(self, lat, lng, category, place_types, places):
+        """Bewaar een antwoord van een duurdere bron (alleen voor cache tiers)"""
+        pass
+
+    def store_error(self, lat, lng, category, place_types):
+        """Onthoud kort dat de duurdere bronnen faalden (alleen voor cache tiers)"""
+        pass
+
+    def widened(self, extra_distance):
+        """
+        Variant die extra_distance verder zoekt, voor één gedeelde lookup voor adressen
+        rond een punt (zie batch_planner.py); None als deze bron dat niet kan.
+        """
+        return None
+
+    async def afind_places(self, lat, lng, category, place_types):
+        """Async variant; standaard de sync versie in een worker thread"""
+        return await to_thread(self.find_places, lat, lng, category, place_types)
+
+    async def astore_places(self, lat, lng, category, place_types, places):
+        await to_thread(self.store_places, lat, lng, category, place_types, places)
+
+    async def astore_error(self, lat, lng, category, place_types):
+        await to_thread(self.store_error, lat, lng, category, place_types)
+
+
+class CachedPlaceProvider(PlaceProvider):
+    """
+    Cache tier op een CacheBackend (SQLite, geheugen of Redis).
+    Naast gevonden places worden ook negatieve antwoorden bewaard, elk met een
+    eigen TTL: een lege lijst (niets binnen bereik) en CACHED_ERROR (upstream
+    fout, zodat een volgende poging niet meteen weer een betaalde call doet).
+    Met find_types/store_type dient dezelfde tier ook als cache per Google type.
+    """
+
+    def __init__(self, backend, name='cache', ttl_hours=24, empty_ttl_hours=None, error_ttl=60):
+        self.backend = backend
+        self.name = name
+        self.ttl = int(timedelta(hours=ttl_hours).total_seconds())
+        self.empty_ttl = (int(timedelta(hours=empty_ttl_hours).total_seconds())
+                          if empty_ttl_hours is not None else self.ttl)
+        self.error_ttl = error_ttl
+
+    @staticmethod
+    def cache_key(lat, lng, category, place_types):
+        return CachedPlaceProvider.hashed_cache_key(location_hash(lat, lng), category, place_types)
+
+    @staticmethod
+    def hashed_cache_key(location, category, place_types):
+        # location: location_hash van de coordinaten
+        return f"poi:{location}:{category}:{types_digest(place_types)}"
+
+    @staticmethod
+    def type_key(lat, lng, place_type, radius=None, rules_digest=None):
+        # rules_digest: de relevantie regels waarmee het antwoord gefilterd is
+        key = f"poi:{location_hash(lat, lng)}:type:{place_type}:{radius or 'rank'}"
+        return f"{key}:{rules_digest}" if rules_digest else key
+
+    def ttl_for(self, places):
+        """TTL voor een cache waarde: places (of hun rijen), een lege lijst of CACHED_ERROR"""
+        if places == CACHED_ERROR:
+            return self.error_ttl
+        return self.ttl if places else self.empty_ttl
+
+    def find_places(self, lat, lng, category, place_types):
+        places = self.backend.get(self.cache_key(lat, lng, category, place_types))
+        if places == CACHED_ERROR:
+            raise CachedUpstreamError(f"Recente upstream fout voor {category}")
+        if places is not None:
+            print(f"POI cache hit ({self.name}) voor categorie: {category}")
+            return places_from_rows(places)
+        return None
+
+    def store_places(self, lat, lng, category, place_types, places):
+        self.backend.set(self.cache_key(lat, lng, category, place_types), places_to_rows(places),
+                         ttl=self.ttl_for(places))
+
+    def store_error(self, lat, lng, category, place_types):
+        self.backend.set(self.cache_key(lat, lng, category, place_types), CACHED_ERROR, ttl=self.error_ttl)
+
+    def find_many(self, lat, lng, types_by_category):
+        """
+        {categorie: cache waarde} voor alle categorieen ({categorie: google_types}) die in
+        de cache staan, in één round trip. De waarden blijven in cache vorm (rijen, [] of
+        CACHED_ERROR), om met store_many te kopieren.
+        """
+        keys = {
+            self.cache_key(lat, lng, category, place_types): category
+            for category, place_types in types_by_category.items()
+        }
+        found = self.backend.get_many(keys)
+        return {keys[key]: places for key, places in found.items()}
+
+    def store_many(self, lat, lng, places_by_category, types_by_category):
+        # Per TTL één batch: gevonden, leeg en fout verlopen op verschillende momenten
+        batches = {}
+        for category, places in places_by_category.items():
+            key = self.cache_key(lat, lng, category, types_by_category[category])
+            batches.setdefault(self.ttl_for(places), {})[key] = places
+        for ttl, entries in batches.items():
+            self.backend.set_many(entries, ttl=ttl)
+
+    def find_types(self, lat, lng, place_types, radius=None, rules_digest=None):
+        """{type: places} voor de Google types met een antwoord in de cache, in één round trip"""
+        keys = {
+            self.type_key(lat, lng, place_type, radius, rules_digest): place_type
+            for place_type in place_types
+        }
+        found = self.backend.get_many(keys)
+        return {keys[key]: places_from_rows(rows) for key, rows in found.items()}
+
+    def store_type(self, lat, lng, place_type, radius, places, rules_digest=None):
+        """Bewaar het antwoord van één Nearby Search call (ook leeg)"""
+        self.backend.set(self.type_key(lat, lng, place_type, radius, rules_digest), places_to_rows(places),
+                         ttl=self.ttl_for(places))
+
+    async def afind_types(self, lat, lng, place_types, radius=None, rules_digest=None):
+        if self.backend.blocking:
+            return await to_thread(self.find_types, lat, lng, place_types, radius, rules_digest)
+        return self.find_types(lat, lng, place_types, radius, rules_digest)
+
+    async def astore_type(self, lat, lng, place_type, radius, places, rules_digest=None):
+        if self.backend.blocking:
+            await to_thread(self.store_type, lat, lng, place_type, radius, places, rules_digest)
+        else:
+            self.store_type(lat, lng, place_type, radius, places, rules_digest)
+
+    async def afind_places(self, lat, lng, category, place_types):
+        if self.backend.blocking:
+            return await super().afind_places(lat, lng, category, place_types)
+        # Geheugen lookups zijn direct klaar; geen worker thread nodig
+        return self.find_places(lat, lng, category, place_types)
+
+    async def astore_places(self, lat, lng, category, place_types, places):
+        if self.backend.blocking:
+            await super().astore_places(lat, lng, category, place_types, places)
+        else:
+            self.store_places(lat, lng, category, place_types, places)
+
+    async def astore_error(self, lat, lng, category, place_types):
+        if self.backend.blocking:
+            await super().astore_error(lat, lng, category, place_types)
+        else:
+            self.store_error(lat, lng, category, place_types)
+
+
+class MemoryPlaceProvider(CachedPlaceProvider):
+    """In-process LRU cache, de goedkoopste tier"""
+
+    def __init__(self, max_entries=5000, ttl_hours=24, empty_ttl_hours=None, error_ttl=60):
+        super().__init__(MemoryCacheBackend(max_entries=max_entries), name='memory', ttl_hours=ttl_hours,
+                         empty_ttl_hours=empty_ttl_hours, error_ttl=error_ttl)
+
+
+class GooglePlacesProvider(PlaceProvider):
+    """Google Places Nearby Search, de duurste tier"""
+
+    name = 'google'
+
+    def __init__(self, api_key, planner=None, max_distance=MAX_SCORE_DISTANCE, timeout=10,
+                 search_url=NEARBY_SEARCH_URL, hedger=None, type_cache=None, relevance=None, max_pages=1):
+        self.api_key = api_key
+        self.planner = planner or QueryPlanner()
+        self.max_distance = max_distance
+        self.timeout = timeout
+        # Afwijkende URL voor bijv. de mock upstream van de load test
+        self.search_url = search_url
+        # httpx.AsyncClient, gezet door de ASGI modus (asgi.py)
+        self.async_client = None
+        # Optioneel: hedging.Hedger tegen trage uitschieters
+        self.hedger = hedger
+        # Optioneel: CachedPlaceProvider met antwoorden per Google type
+        self.type_cache = type_cache
+        # Optioneel: relevance.RelevanceFilter; zonder filter vallen alleen gesloten places af
+        self.relevance = relevance
+        # Pagina's per zoekactie (Google geeft er hooguit 3); meer dan 1 alleen voor radius zoeken
+        self.max_pages = max_pages
+        self.page_calls = 0
+        # (location_hash, categorie) waarvoor Google meer resultaten had dan opgehaald
+        self.saturated = set()
+        self._lock = threading.Lock()
+
+    def widened(self, extra_distance):
+        # Echte radius zoekactie over max_distance + extra_distance, met paginering: op afstand
+        # gerangschikt rond het midden geeft alleen de 20 places die het dichtst bij het midden
+        # liggen. Geen early stop (dichtbij het midden zegt niets over de andere adressen) en
+        # geen type cache (die antwoorden horen bij max_distance rond één locatie).
+        radius = self.max_distance + extra_distance
+        return GooglePlacesProvider(self.api_key, planner=QueryPlanner(radius_steps=(radius,), early_stop_distance=0),
+                                    max_distance=radius, timeout=self.timeout, search_url=self.search_url,
+                                    hedger=self.hedger, relevance=self.relevance, max_pages=3)
+
+    def pop_saturated(self, lat, lng, category):
+        """
+        Of de laatste lookup voor deze locatie en categorie verzadigd was: een type gaf
+        alle max_pages pagina's vol terug, dus niet zeker de dichtstbijzijnde places.
+        """
+        key = (location_hash(lat, lng), category)
+        with self._lock:
+            if key not in self.saturated:
+                return False
+            self.saturated.discard(key)
+            return True
+
+    def rules_digest(self, category):
+        """Deel van de type cache sleutel: alleen categorieen met dezelfde regels delen antwoorden"""
+        return self.relevance.digest(category) if self.relevance else None
+
+    def find_places(self, lat, lng, category, place_types):
+        places = []
+        print(f"Google types voor {category}: {place_types}")
+        print(f"Places API key lengte: {len(self.api_key)}")
+
+        errors = []
+        plan = self.planner.plan(category, place_types)
+        rules_digest = self.rules_digest(category)
+        looked_up = set()
+        while True:
+            step = plan.pending_step()
+            if step is None:
+                break
+            if self.type_cache and step not in looked_up:
+                # Types die voor deze radius stap al in de cache staan kosten geen call
+                # en tellen mee voor het plan; daarna opnieuw beslissen
+                looked_up.add(step)
+                cached = self.type_cache.find_types(lat, lng, plan.pending, plan.radius_steps[step], rules_digest)
+                places.extend(self.use_cached_types(plan, cached))
+                continue
+            place_type, radius = plan.next_query()
+            print(f"\nZoeken naar type: {place_type} (radius: {radius or 'rankby=distance'})")
+            try:
+                found = self.search_type(lat, lng, place_type, radius, category)
+            except UpstreamError as e:
+                # De andere types kunnen nog wel een antwoord geven
+                print(f"Upstream fout voor type {place_type}: {str(e)}")
+                errors.append(e)
+            else:
+                plan.record(place_type, found)
+                places.extend(found)
+                if self.type_cache:
+                    self.store_type(lat, lng, place_type, radius, found, rules_digest)
+        plan.finish()
+
+        return self.checked_places(category, places, errors)
+
+    async def afind_places(self, lat, lng, category, place_types):
+        if self.async_client is None:
+            return await super().afind_places(lat, lng, category, place_types)
+
+        places = []
+        errors = []
+        plan = self.planner.plan(category, place_types)
+        rules_digest = self.rules_digest(category)
+        looked_up = set()
+        while True:
+            step = plan.pending_step()
+            if step is None:
+                break
+            if self.type_cache and step not in looked_up:
+                looked_up.add(step)
+                cached = await self.type_cache.afind_types(lat, lng, plan.pending, plan.radius_steps[step],
+                                                           rules_digest)
+                places.extend(self.use_cached_types(plan, cached))
+                continue
+            place_type, radius = plan.next_query()
+            params = self.search_params(lat, lng, place_type, radius)
+            timeout = upstream_timeout(self.timeout)
+            try:
+                if self.hedger:
+                    response = await self.hedger.acall(self.async_client.get, self.search_url,
+                                                       params=params, timeout=timeout)
+                else:
+                    response = await self.async_client.get(self.search_url, params=params, timeout=timeout)
+                found = self.handle_response(lat, lng, place_type, response, category)
+            except UpstreamError as e:
+                print(f"Upstream fout voor type {place_type}: {str(e)}")
+                errors.append(e)
+            else:
+                plan.record(place_type, found)
+                places.extend(found)
+                if self.type_cache:
+                    try:
+                        await self.type_cache.astore_type(lat, lng, place_type, radius, found, rules_digest)
+                    except Exception as e:
+                        print(f"Type cache opslaan gefaald voor {place_type}: {str(e)}")
+        plan.finish()
+
+        return self.checked_places(category, places, errors)
+
+    @staticmethod
+    def checked_places(category, places, errors):
+        """
+        Places van een lookup waarin types konden falen. Niets gevonden: 'leeg' is niet
+        betrouwbaar, de fout gaat door. Wel iets gevonden: het gefaalde type had een
+        dichterbij gelegen place kunnen hebben, dus een gedeeltelijk antwoord.
+        """
+        if errors and not places:
+            raise errors[-1]
+        if errors:
+            raise PartialUpstreamError(f"{len(errors)} Google types gefaald voor {category}", places)
+        return places
+
+    def use_cached_types(self, plan, cached):
+        """Geef gecachte type antwoorden aan het plan; geeft hun places terug"""
+        places = []
+        for place_type in plan.place_types:
+            if place_type in cached:
+                print(f"Type cache hit voor type: {place_type}")
+                plan.use_cached(place_type, cached[place_type])
+                places.extend(cached[place_type])
+        return places
+
+    def store_type(self, lat, lng, place_type, radius, places, rules_digest=None):
+        try:
+            self.type_cache.store_type(lat, lng, place_type, radius, places, rules_digest)
+        except Exception as e:
+            # Alleen een gemiste besparing; het antwoord zelf is er
+            print(f"Type cache opslaan gefaald voor {place_type}: {str(e)}")
+
+    def search_type(self, lat, lng, place_type, radius=None, category=None):
+        """
+        Eén Nearby Search call voor één Google type. Zonder radius wordt op
+        afstand gerangschikt gezocht; places verder dan max_distance vallen af,
+        net als places die niet door de relevantie regels van de categorie komen.
+        """
+        params = self.search_params(lat, lng, place_type, radius)
+
+        print(f"API URL: {self.search_url}")
+        print(f"API Parameters: {params}")
+        if self.api_key:
+            print(f"API key eindigt op: ...{self.api_key[-4:]}")
+        else:
+            print("API key: LEEG")
+
+        # Nooit langer wachten dan het request nog mag duren
+        timeout = upstream_timeout(self.timeout)
+        import requests
+        if self.hedger:
+            response = self.hedger.call(requests.get, self.search_url, params=params, timeout=timeout)
+        else:
+            response = requests.get(self.search_url, params=params, timeout=timeout)
+        data = self.response_data(response)
+
+        place_results = list(data.get('results', []))
+        if self.max_pages > 1:
+            saturated = len(place_results) >= RESULTS_PER_PAGE * self.max_pages
+            pages = 1
+            while data.get('next_page_token') and pages < self.max_pages:
+                try:
+                    data = self.next_page(data['next_page_token'])
+                except UpstreamError as e:
+                    # De eerste pagina's zijn er; de rest is onbekend
+                    print(f"Volgende pagina voor {place_type} gefaald: {str(e)}")
+                    saturated = True
+                    break
+                place_results.extend(data.get('results', []))
+                pages += 1
+            else:
+                saturated = saturated or len(place_results) >= RESULTS_PER_PAGE * self.max_pages
+            if saturated:
+                print(f"Nearby Search voor {place_type} verzadigd ({len(place_results)} resultaten)")
+                with self._lock:
+                    self.saturated.add((location_hash(lat, lng), category))
+        return self.places_in_range(lat, lng, place_type, place_results, category)
+
+    def next_page(self, token):
+        """Volgende pagina van een Nearby Search; wacht tot het token geldig is"""
+        import requests
+        for attempt in range(PAGE_TOKEN_ATTEMPTS):
+            time.sleep(PAGE_TOKEN_DELAY)
+            response = requests.get(self.search_url, params={'pagetoken': token, 'key': self.api_key},
+                                    timeout=upstream_timeout(self.timeout))
+            with self._lock:
+                self.page_calls += 1
+            data = self.response_data(response, token_pending=True)
+            if data is not None:
+                return data
+        raise UpstreamError(f"next_page_token na {PAGE_TOKEN_ATTEMPTS} pogingen nog niet geldig")
+
+    def search_params(self, lat, lng, place_type, radius=None):
+        """Query parameters voor één Nearby Search call"""
+        params = {
+            'location': f"{lat},{lng}",
+            'type': place_type,
+            'key': self.api_key
+        }
+        if radius:
+            params['radius'] = radius
+        else:
+            params['rankby'] = 'distance'
+        return params
+
+    def handle_response(self, lat, lng, place_type, response, category=None):
+        """Verwerk een Nearby Search response (requests of httpx) tot place records"""
+        data = self.response_data(response)
+        return self.places_in_range(lat, lng, place_type, data.get('results', []), category)
+
+    def response_data(self, response, token_pending=False):
+        """
+        JSON van een Nearby Search response; UpstreamError bij een fout. Met
+        token_pending geeft INVALID_REQUEST None: de volgende pagina is nog niet klaar.
+        """
+        print(f"Response status code: {response.status_code}")
+        print(f"Response header Content-Type: {response.headers.get('Content-Type')}")
+
+        if response.status_code != 200:
+            print(f"HTTP fout: {response.status_code}")
+            print(f"Response tekst: {response.text}")
+            raise UpstreamError(f"HTTP {response.status_code}")
+
+        try:
+            data = response.json()
+        except Exception as e:
+            print(f"JSON parse fout: {e}")
+            print(f"Response tekst: {response.text[:500]}")
+            raise UpstreamError(f"Ongeldig antwoord: {e}")
+
+        print(f"API status: {data.get('status')}")
+        print(f"Resultaten gevonden: {len(data.get('results', []))}")
+
+        if data.get('status') == 'ZERO_RESULTS':
+            return {'results': []}
+        if token_pending and data.get('status') == 'INVALID_REQUEST':
+            return None
+        if data.get('status') != 'OK':
+            print(f"API fout status: {data.get('status')}")
+            print(f"API fout bericht: {data.get('error_message', 'Geen foutbericht')}")
+            raise UpstreamError(f"API status {data.get('status')}")
+        return data
+
+    def places_in_range(self, lat, lng, place_type, place_results, category=None):
+        """Place records binnen max_distance uit ruwe resultaten"""
+        print(f"Verwerken van {len(place_results)} resultaten voor {place_type}")
+        places = self.parse_results(lat, lng, place_results, category)
+        return [place for place in places if place.distance_meters <= self.max_distance]
+
+    def parse_results(self, lat, lng, place_results, category=None):
+        """Zet ruwe Nearby Search resultaten om naar place records; irrelevante eerst eruit"""
+        if self.relevance:
+            place_results = self.relevance.filter(category, place_results)
+        else:
+            place_results = [place for place in place_results if place.get('business_status') != 'CLOSED_PERMANENTLY']
+
+        places = []
+        for place in place_results:
+            place_lat = place['geometry']['location']['lat']
+            place_lng = place['geometry']['location']['lng']
+            distance = calculate_distance(lat, lng, place_lat, place_lng)
+
+            places.append(Place(
+                place['name'],
+                place.get('vicinity', ''),
+                round(distance),
+                place_lat,
+                place_lng,
+                place.get('rating', 0)
+            ))
+            print(f"Toegevoegd: {place['name']} ({round(distance)}m)")
+        return places
+
+
+class ProviderChain:
+    """Vraagt providers op volgorde af en houdt per tier hit/miss en latency bij"""
+
+    def __init__(self, providers):
+        self.providers = list(providers)
+        self.stats = {
+            provider.name: {'hits': 0, 'misses': 0, 'errors': 0, 'total_ms': 0.0}
+            for provider in self.providers
+        }
+        self._lock = threading.Lock()
+
+    def lookup(self, lat, lng, category, place_types, postprocess=None):
+        """
+        Geef (places, provider_name) van de eerste tier die antwoord heeft.
+        Het (eventueel nabewerkte) antwoord wordt teruggeschreven naar de
+        goedkopere tiers die eerder een miss gaven. Faalt de lookup, dan komt
+        ([], 'error') terug en onthouden de cache tiers dat kort. Faalde een deel van
+        de Google types, dan komt (places, 'partial') terug, zonder terug te schrijven.
+        """
+        missed = []
+        failed = False
+        for provider in self.providers:
+            start = time.perf_counter()
+            try:
+                places = provider.find_places(lat, lng, category, place_types)
+                outcome = 'hits' if places is not None else 'misses'
+            except CachedUpstreamError as e:
+                self._record(provider.name, 'hits', time.perf_counter() - start)
+                print(f"Negatieve cache hit ({provider.name}): {str(e)}")
+                self._store_error(missed, lat, lng, category, place_types)
+                return [], 'error'
+            except PartialUpstreamError as e:
+                self._record(provider.name, 'errors', time.perf_counter() - start)
+                self._raise_if_deadline(category, e)
+                # Niet terugschrijven: het gefaalde type wordt bij de volgende lookup opnieuw
+                # gevraagd (de geslaagde types staan in de type cache)
+                print(f"Gedeeltelijk antwoord van {provider.name}: {str(e)}")
+                return (postprocess(e.places) if postprocess else e.places), 'partial'
+            except Exception as e:
+                self._record(provider.name, 'errors', time.perf_counter() - start)
+                self._raise_if_deadline(category, e)
+                print(f"Provider {provider.name} fout voor {category}: {str(e)}")
+                missed.append(provider)
+                failed = True
+                continue
+            self._record(provider.name, outcome, time.perf_counter() - start)
+
+            if places is None:
+                missed.append(provider)
+                continue
+
+            if postprocess:
+                places = postprocess(places)
+            for cache_tier in missed:
+                try:
+                    cache_tier.store_places(lat, lng, category, place_types, places)
+                except Exception as e:
+                    print(f"Opslaan in {cache_tier.name} gefaald: {str(e)}")
+            return places, provider.name
+
+        if failed:
+            self._store_error(missed, lat, lng, category, place_types)
+            return [], 'error'
+        return [], None
+
+    async def alookup(self, lat, lng, category, place_types, postprocess=None):
+        """Async variant van lookup, voor de ASGI modus"""
+        missed = []
+        failed = False
+        for provider in self.providers:
+            start = time.perf_counter()
+            try:
+                places = await provider.afind_places(lat, lng, category, place_types)
+                outcome = 'hits' if places is not None else 'misses'
+            except CachedUpstreamError as e:
+                self._record(provider.name, 'hits', time.perf_counter() - start)
+                print(f"Negatieve cache hit ({provider.name}): {str(e)}")
+                await self._astore_error(missed, lat, lng, category, place_types)
+                return [], 'error'
+            except PartialUpstreamError as e:
+                self._record(provider.name, 'errors', time.perf_counter() - start)
+                self._raise_if_deadline(category, e)
+                # Niet terugschrijven: het gefaalde type wordt bij de volgende lookup opnieuw
+                # gevraagd (de geslaagde types staan in de type cache)
+                print(f"Gedeeltelijk antwoord van {provider.name}: {str(e)}")
+                return (postprocess(e.places) if postprocess else e.places), 'partial'
+            except Exception as e:
+                self._record(provider.name, 'errors', time.perf_counter() - start)
+                self._raise_if_deadline(category, e)
+                print(f"Provider {provider.name} fout voor {category}: {str(e)}")
+                missed.append(provider)
+                failed = True
+                continue
+            self._record(provider.name, outcome, time.perf_counter() - start)
+
+            if places is None:
+                missed.append(provider)
+                continue
+
+            if postprocess:
+                places = postprocess(places)
+            for cache_tier in missed:
+                try:
+                    await cache_tier.astore_places(lat, lng, category, place_types, places)
+                except Exception as e:
+                    print(f"Opslaan in {cache_tier.name} gefaald: {str(e)}")
+            return places, provider.name
+
+        if failed:
+            await self._astore_error(missed, lat, lng, category, place_types)
+            return [], 'error'
+        return [], None
+
+    @staticmethod
+    def _store_error(tiers, lat, lng, category, place_types):
+        for cache_tier in tiers:
+            try:
+                cache_tier.store_error(lat, lng, category, place_types)
+            except Exception as e:
+                print(f"Fout onthouden in {cache_tier.name} gefaald: {str(e)}")
+
+    @staticmethod
+    async def _astore_error(tiers, lat, lng, category, place_types):
+        for cache_tier in tiers:
+            try:
+                await cache_tier.astore_error(lat, lng, category, place_types)
+            except Exception as e:
+                print(f"Fout onthouden in {cache_tier.name} gefaald: {str(e)}")
+
+    @staticmethod
+    def _raise_if_deadline(category, error):
+        """
+        Een timeout door een verstreken deadline is geen gewone fout: de categorie
+        is niet afgerond en mag niet als 'niets gevonden' (score 0) doorgaan.
+        """
+        if isinstance(error, DeadlineExceeded):
+            raise error
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded(f"Tijdsbudget verstreken tijdens {category}") from error
+
+    def _record(self, name, outcome, elapsed):
+        with self._lock:
+            self.stats[name][outcome] += 1
+            self.stats[name]['total_ms'] += elapsed * 1000
+
+    def get_stats(self):
+        """Statistieken per tier, inclusief gemiddelde latency"""
+        with self._lock:
+            result = {}
+            for name, tier in self.stats.items():
+                calls = tier['hits'] + tier['misses'] + tier['errors']
+                result[name] = dict(tier, avg_ms=round(tier['total_ms'] / calls, 2) if calls else 0)
+                result[name]['total_ms'] = round(tier['total_ms'], 2)
+            return result
@@ -0,0 +1,169 @@
+"""
+Query planner voor Google Nearby Search
+Bepaalt per categorie in welke volgorde de google_types worden bevraagd en
+wanneer er gestopt kan worden. calculate_category_score gebruikt alleen de
+dichtstbijzijnde place en geeft 0 punten vanaf 2000 m, dus:
+- types met de hoogste historische opbrengst gaan eerst;
+- alleen als early_stop_distance is ingesteld (standaard 0 = uit) stoppen we zodra
+  een place dichterbij ligt; latere types kunnen de score dan nog tot
+  early_stop_distance / 20 punten verbeteren, dus dat is een bewuste afweging;
+- zoeken gebeurt op afstand gerangschikt (rankby=distance), of in radius
+  stappen van klein naar groot, waarbij alleen verbreed wordt als er niets is gevonden;
+- types met een antwoord in de type cache tellen mee zonder call (use_cached).
+Per beslissing wordt bijgehouden hoeveel calls het scheelde.
+"""
+
+import threading
+from collections import defaultdict
+
+# Vanaf deze afstand is de categorie score 0 (100 - afstand / 20)
+MAX_SCORE_DISTANCE = 2000
+
+
+class QueryPlan:
+    """Plan voor één categorie op één locatie; vraag queries op met next_query()"""
+
+    def __init__(self, planner, category, place_types):
+        self.planner = planner
+        self.category = category
+        self.place_types = planner.order_types(category, place_types)
+        self.radius_steps = planner.radius_steps
+        self.step = 0
+        self.pending = list(self.place_types)
+        self.calls = 0
+        self.cached = 0
+        self.best_distance = None
+        self.best_type = None
+        self.nonempty_types = set()
+        self.stop_reason = None
+
+    def next_query(self):
+        """Volgende (place_type, radius) om uit te voeren, of None als het plan klaar is"""
+        if self.pending_step() is None:
+            return None
+        self.calls += 1
+        return self.pending.pop(0), self.radius_steps[self.step]
+
+    def pending_step(self):
+        """
+        Index van de radius stap waarvoor nog types open staan, of None als het plan
+        klaar is. Neemt de stop- en verbreedbeslissingen; zo kan de type cache per
+        stap geraadpleegd worden voordat er een call uitgaat.
+        """
+        if self.stop_reason:
+            return None
+
+        early_stop_distance = self.planner.early_stop_distance
+        if early_stop_distance and self.best_distance is not None and self.best_distance <= early_stop_distance:
+            self.stop_reason = 'early_stop'
+            return None
+
+        if not self.pending:
+            if self.best_distance is not None:
+                self.stop_reason = 'found'
+                return None
+            self.step += 1
+            if self.step >= len(self.radius_steps):
+                self.stop_reason = 'exhausted'
+                return None
+            # Niets gevonden binnen de kleinere radius: alle types opnieuw, breder
+            self.pending = list(self.place_types)
+        return self.step
+
+    def record(self, place_type, places):
+        """Verwerk het resultaat van een uitgevoerde query"""
+        if not places:
+            self.planner.record_query(self.category, place_type, nonempty=False)
+            return
+        self.nonempty_types.add(place_type)
+        self.planner.record_query(self.category, place_type, nonempty=True)
+        closest = min(place.distance_meters for place in places)
+        if self.best_distance is None or closest < self.best_distance:
+            self.best_distance = closest
+            self.best_type = place_type
+
+    def use_cached(self, place_type, places):
+        """Antwoord voor place_type (huidige radius stap) uit de type cache: geen call nodig"""
+        if place_type in self.pending:
+            self.pending.remove(place_type)
+        self.cached += 1
+        self.record(place_type, places)
+
+    def finish(self):
+        """Leg de beslissingen van dit plan vast bij de planner"""
+        self.planner.record_plan(self)
+
+
+class QueryPlanner:
+    """Houdt opbrengst per (categorie, type) bij en maakt QueryPlans"""
+
+    def __init__(self, radius_steps=(None,), early_stop_distance=0):
+        # None = rankby=distance (geen radius, resultaten op afstand gesorteerd)
+        self.radius_steps = tuple(radius_steps)
+        self.early_stop_distance = early_stop_distance
+        self.type_stats = defaultdict(lambda: {'queries': 0, 'nonempty': 0, 'closest': 0})
+        self.category_stats = defaultdict(lambda: {
+            'plans': 0,
+            'calls_made': 0,
+            'baseline_calls': 0,
+            'saved_early_stop': 0,
+            'saved_type_cache': 0,
+            'extra_widening': 0,
+        })
+        self._lock = threading.Lock()
+
+    def plan(self, category, place_types):
+        return QueryPlan(self, category, place_types)
+
+    def order_types(self, category, place_types):
+        """Types met de meeste 'dichtstbijzijnde' treffers eerst (Laplace gladgestreken)"""
+        with self._lock:
+            def opbrengst(place_type):
+                stats = self.type_stats[(category, place_type)]
+                return (stats['closest'] + stats['nonempty'] + 1) / (2 * stats['queries'] + 2)
+            return sorted(place_types, key=opbrengst, reverse=True)
+
+    def record_query(self, category, place_type, nonempty):
+        with self._lock:
+            stats = self.type_stats[(category, place_type)]
+            stats['queries'] += 1
+            if nonempty:
+                stats['nonempty'] += 1
+
+    def record_plan(self, plan):
+        baseline = len(plan.place_types)
+        with self._lock:
+            if plan.best_type:
+                self.type_stats[(plan.category, plan.best_type)]['closest'] += 1
+
+            stats = self.category_stats[plan.category]
+            stats['plans'] += 1
+            stats['calls_made'] += plan.calls
+            stats['baseline_calls'] += baseline
+            stats['saved_type_cache'] += plan.cached
+            answered = plan.calls + plan.cached
+            # Calls in de eerste ronde die niet meer nodig waren
+            if plan.stop_reason == 'early_stop':
+                stats['saved_early_stop'] += max(0, baseline * (plan.step + 1) - answered)
+            # Verbreden kost extra calls ten opzichte van één ronde op volle radius
+            stats['extra_widening'] += max(0, answered - baseline)
+
+        print(f"Query plan {plan.category}: {plan.calls}/{baseline} calls ({plan.cached} uit type cache), "
+              f"stop: {plan.stop_reason}, dichtstbij: {plan.best_distance}m ({plan.best_type})")
+
+    def get_stats(self):
+        """Besparing per categorie en opbrengst per type"""
+        with self._lock:
+            categories = {}
+            for category, stats in self.category_stats.items():
+                categories[category] = dict(stats, saved_calls=stats['baseline_calls'] - stats['calls_made'])
+            types = {
+                f"{category}/{place_type}": dict(stats)
+                for (category, place_type), stats in self.type_stats.items()
+            }
+            return {
+                'radius_steps': [step or 'rankby=distance' for step in self.radius_steps],
+                'early_stop_distance': self.early_stop_distance,
+                'categories': categories,
+                'types': types,
+            }
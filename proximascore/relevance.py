@@ -0,0 +1,127 @@
+"""
+Relevantie en kwaliteit van Google Nearby Search resultaten
+De regels staan in de configuratie (PLACE_RELEVANCE_RULES, PLACE_MIN_RATING,
+PLACE_MIN_RATINGS_TOTAL) en worden bij het opstarten per categorie gecompileerd tot
+één regex voor de vereiste woorden en één voor de uitgesloten woorden. Het filter
+draait op de ruwe resultaten, voor afstandsberekening, ontdubbelen en sorteren, en
+telt per regel hoeveel kandidaten er afvallen.
+
+Woorden matchen als deelstring van de naam in kleine letters ('arts' matcht ook
+'huisartsenpraktijk'); een rating of aantal beoordelingen van 0 betekent nog niet
+beoordeeld en laat een place staan.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import Counter
+
+RULE_CLOSED = 'permanent_gesloten'
+RULE_RATING = 'min_rating'
+RULE_RATINGS_TOTAL = 'min_beoordelingen'
+
+
+def compile_words(words):
+    """Eén regex voor een lijst woorden; langste eerst zodat de alternatie vroeg slaagt"""
+    if not words:
+        return None
+    words = sorted({word.lower() for word in words}, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(word) for word in words))
+
+
+class CategoryRules:
+    """Gecompileerde regels voor één categorie"""
+
+    __slots__ = ('required', 'excluded', 'digest')
+
+    def __init__(self, required=None, excluded=None, digest=''):
+        self.required = compile_words(required)
+        self.excluded = compile_words(excluded)
+        self.digest = digest
+
+
+class RelevanceFilter:
+    """Filtert ruwe Nearby Search resultaten per categorie en houdt drops per regel bij"""
+
+    def __init__(self, relevance_rules=None, min_rating=0, min_ratings_total=0):
+        self.relevance_rules = relevance_rules or {}
+        self.min_rating = min_rating
+        self.min_ratings_total = min_ratings_total
+        self._default = CategoryRules(digest=self._digest({}))
+        self._rules = {
+            category: CategoryRules(rules.get('vereist'), rules.get('uitgesloten'), self._digest(rules))
+            for category, rules in self.relevance_rules.items()
+        }
+        self._lock = threading.Lock()
+        self._checked = Counter()
+        self._kept = Counter()
+        self._dropped = Counter()
+
+    def _digest(self, rules):
+        """Korte hash van de effectieve regels; categorieen met dezelfde regels delen de type cache"""
+        effective = {
+            'vereist': sorted(word.lower() for word in rules.get('vereist', [])),
+            'uitgesloten': sorted(word.lower() for word in rules.get('uitgesloten', [])),
+            'min_rating': self.min_rating,
+            'min_beoordelingen': self.min_ratings_total,
+        }
+        return hashlib.md5(json.dumps(effective, sort_keys=True).encode()).hexdigest()[:8]
+
+    def rules_for(self, category):
+        return self._rules.get(category, self._default)
+
+    def digest(self, category):
+        return self.rules_for(category).digest
+
+    def filter(self, category, place_results):
+        """Geef de ruwe resultaten terug die door alle regels komen"""
+        rules = self.rules_for(category)
+        required, excluded = rules.required, rules.excluded
+        min_rating, min_ratings_total = self.min_rating, self.min_ratings_total
+
+        kept = []
+        dropped = Counter()
+        for place in place_results:
+            # Goedkoopste checks eerst; een place telt bij de eerste regel die hem laat vallen
+            if place.get('business_status') == 'CLOSED_PERMANENTLY':
+                dropped[RULE_CLOSED] += 1
+                continue
+            rating = place.get('rating') or 0
+            if 0 < rating < min_rating:
+                dropped[RULE_RATING] += 1
+                continue
+            ratings_total = place.get('user_ratings_total') or 0
+            if 0 < ratings_total < min_ratings_total:
+                dropped[RULE_RATINGS_TOTAL] += 1
+                continue
+            if required or excluded:
+                name = place.get('name', '').lower()
+                if required and not required.search(name):
+                    dropped[f"{category}:vereist"] += 1
+                    continue
+                if excluded and excluded.search(name):
+                    dropped[f"{category}:uitgesloten"] += 1
+                    continue
+            kept.append(place)
+
+        with self._lock:
+            self._checked[category] += len(place_results)
+            self._kept[category] += len(kept)
+            self._dropped.update(dropped)
+        if dropped:
+            print(f"Relevantie filter {category}: {len(place_results) - len(kept)}/{len(place_results)} "
+                  f"afgevallen ({', '.join(f'{rule} {count}' for rule, count in dropped.items())})")
+        return kept
+
+    def get_stats(self):
+        """Gecontroleerde en behouden kandidaten per categorie, drops per regel"""
+        with self._lock:
+            return {
+                'min_rating': self.min_rating,
+                'min_ratings_total': self.min_ratings_total,
+                'rules': self.relevance_rules,
+                'checked': dict(self._checked),
+                'kept': dict(self._kept),
+                'dropped': dict(self._dropped),
+            }
@@ -0,0 +1,343 @@
+"""
+Score verdelingen per profiel en regio
+Klanten willen weten hoe de score van een adres zich verhoudt tot de rest van de
+gemeente. Alle bewaarde resultaten opnieuw doorlopen is te duur; in plaats daarvan
+houdt elke berekening per (profiel, regio) een KLL quantile sketch bij: een vaste
+handvol getallen per sketch, ongeacht hoeveel scores er zijn, en samen te voegen.
+
+Elk proces verzamelt nieuwe scores in een eigen delta sketch. Een achtergrond
+thread voegt die periodiek samen met de bewaarde sketch in de cache backend
+(lezen, mergen, schrijven), laadt de bewaarde sketches die nodig zijn en ververst
+de geladen sketches, zodat ook de scores van andere workers meetellen. Een
+percentiel opvragen doet zo nooit I/O: de rang is de som van de rang in de
+bewaarde en in de delta sketch. Schrijven twee workers op hetzelfde moment, dan
+kan één delta verloren gaan; voor een verdeling is dat acceptabel.
+
+De regio is de gemeente volgens de geocoder, niet vrije tekst uit het adres. In
+geheugen blijven hooguit max_loaded bewaarde sketches (LRU); een opgevraagde regio
+zonder bewaarde verdeling komt er niet bij.
+"""
+
+import atexit
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+# Regio voor adressen zonder (herkenbare) plaats, en de verdeling over alle adressen
+NATIONAL_REGION = 'nederland'
+
+
+class KllSketch:
+    """
+    KLL sketch (Karnin, Lang, Liberty): compactors per niveau, een item op niveau h
+    staat voor 2**h scores. k bepaalt de nauwkeurigheid (rangfout ~1.7/k bij k=200)
+    en het geheugen (~3k getallen).
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=None):
+        self.k = k
+        self.c = c
+        self.compactors = [[]]
+        self.n = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._random = random.Random(seed)
+
+    def capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._compress()
+
+    def merge(self, other):
+        """Voeg een andere sketch (zelfde k) toe aan deze"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        self._compress()
+
+    def _compress(self):
+        while sum(len(items) for items in self.compactors) > \
+                sum(self.capacity(level) for level in range(len(self.compactors))):
+            for level, items in enumerate(self.compactors):
+                if len(items) < self.capacity(level):
+                    continue
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items.sort()
+                # Bij een oneven aantal blijft het grootste item op dit niveau staan
+                keep = [items.pop()] if len(items) % 2 else []
+                offset = self._random.randint(0, 1)
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = keep
+                break
+
+    def weight_below(self, value):
+        """(gewicht kleiner dan value, gewicht gelijk aan value), geschat"""
+        below = equal = 0
+        for level, items in enumerate(self.compactors):
+            weight = 1 << level
+            for item in items:
+                if item < value:
+                    below += weight
+                elif item == value:
+                    equal += weight
+        return below, equal
+
+    def quantile(self, fraction):
+        """Geschatte waarde op rang fraction (0-1), of None als de sketch leeg is"""
+        weighted = sorted(
+            (item, 1 << level)
+            for level, items in enumerate(self.compactors)
+            for item in items
+        )
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = fraction * total
+        cumulative = 0
+        for item, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return item
+        return weighted[-1][0]
+
+    def to_dict(self):
+        """Compacte, JSON vriendelijke vorm om te bewaren"""
+        return {
+            'k': self.k, 'n': self.n, 'total': round(self.total, 3),
+            'min': self.min, 'max': self.max, 'levels': self.compactors,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(k=data['k'])
+        sketch.n = data['n']
+        sketch.total = data['total']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch.compactors = [list(items) for items in data['levels']] or [[]]
+        return sketch
+
+    def __len__(self):
+        return sum(len(items) for items in self.compactors)
+
+
+def percentile_rank(sketches, value):
+    """Percentage scores lager dan value (gelijke scores half) over een of meer sketches"""
+    below = equal = count = 0
+    for sketch in sketches:
+        if sketch is None or not sketch.n:
+            continue
+        sketch_below, sketch_equal = sketch.weight_below(value)
+        below += sketch_below
+        equal += sketch_equal
+        count += sketch.n
+    if not count:
+        return None, 0
+    return round(100 * (below + equal / 2) / count, 1), count
+
+
+class ScoreDistributions:
+    """
+    Score sketches per (profiel, regio), bewaard in een CacheBackend onder
+    'sketch:<profiel>:<regio>'. Elke score telt ook mee voor NATIONAL_REGION.
+    min_count: onder dit aantal scores wordt voor een regio de landelijke verdeling gebruikt.
+    max_loaded: zoveel bewaarde sketches blijven in geheugen; de langst niet gebruikte vervalt.
+    """
+
+    def __init__(self, backend, k=200, flush_interval=30, min_count=20, max_loaded=2000):
+        self.backend = backend
+        self.k = k
+        self.flush_interval = flush_interval
+        self.min_count = min_count
+        self.max_loaded = max_loaded
+        self._lock = threading.Lock()
+        self._stored = OrderedDict()
+        self._delta = {}
+        self._wanted = set()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.stats = {'recorded': 0, 'flushes': 0, 'flush_errors': 0, 'loads': 0}
+        atexit.register(self.flush)
+
+    @staticmethod
+    def cache_key(profile, region):
+        return f"sketch:{profile}:{region}"
+
+    def record(self, profile, region, score):
+        """Tel een nieuwe score mee voor de regio en landelijk"""
+        self._ensure_thread()
+        with self._lock:
+            for key in {(profile, region or NATIONAL_REGION), (profile, NATIONAL_REGION)}:
+                delta = self._delta.get(key)
+                if delta is None:
+                    delta = self._delta[key] = KllSketch(self.k)
+                delta.update(score)
+                if key not in self._stored:
+                    self._wanted.add(key)
+            self.stats['recorded'] += 1
+
+    def percentile(self, profile, region, score):
+        """
+        {'region', 'rank', 'sample_size'} voor een score, of None als er nog geen
+        verdeling is. Valt terug op de landelijke verdeling als de regio te klein is.
+        """
+        self._ensure_thread()
+        for key in ((profile, region), (profile, NATIONAL_REGION)):
+            if key[1] is None:
+                continue
+            with self._lock:
+                sketches = (self._stored.get(key), self._delta.get(key))
+                if key in self._stored:
+                    self._stored.move_to_end(key)
+                else:
+                    self._wanted.add(key)
+                    self._wake.set()
+                rank, count = percentile_rank(sketches, score)
+            if count >= self.min_count:
+                return {'region': key[1], 'rank': rank, 'sample_size': count}
+        return None
+
+    def summary(self, profile, region=NATIONAL_REGION):
+        """Verdeling van een (profiel, regio): aantal, gemiddelde, uitersten en percentielen"""
+        key = (profile, region)
+        with self._lock:
+            stored = self._stored.get(key)
+        if stored is None:
+            # Vrije invoer: alleen bewaren als er voor deze regio echt een verdeling is
+            data = self.backend.get(self.cache_key(*key))
+            stored = KllSketch.from_dict(data) if data else None
+            if stored is not None:
+                with self._lock:
+                    self._remember(key, stored)
+        with self._lock:
+            merged = KllSketch(self.k)
+            for sketch in (stored, self._delta.get(key)):
+                if sketch is not None:
+                    merged.merge(sketch)
+        if not merged.n:
+            return {'profile': profile, 'region': region, 'count': 0}
+        return {
+            'profile': profile,
+            'region': region,
+            'count': merged.n,
+            'mean': round(merged.total / merged.n, 1),
+            'min': merged.min,
+            'max': merged.max,
+            'percentiles': {f"p{p}": merged.quantile(p / 100) for p in (10, 25, 50, 75, 90)},
+        }
+
+    # --- persistentie ---
+
+    def load(self, key):
+        """Laad de bewaarde sketch van een (profiel, regio) uit de backend"""
+        data = self.backend.get(self.cache_key(*key))
+        sketch = KllSketch.from_dict(data) if data else KllSketch(self.k)
+        with self._lock:
+            self._remember(key, sketch)
+            self._wanted.discard(key)
+            self.stats['loads'] += 1
+        return sketch
+
+    def _remember(self, key, sketch):
+        """Zet een bewaarde sketch in geheugen (onder self._lock); de oudste vervalt boven max_loaded"""
+        self._stored[key] = sketch
+        self._stored.move_to_end(key)
+        while len(self._stored) > self.max_loaded:
+            self._stored.popitem(last=False)
+
+    def refresh(self, keys):
+        """Lees geladen sketches opnieuw in één round trip; andere workers schrijven er ook in"""
+        keys = list(keys)
+        if not keys:
+            return
+        found = self.backend.get_many([self.cache_key(*key) for key in keys])
+        with self._lock:
+            for key in keys:
+                data = found.get(self.cache_key(*key))
+                if data and key in self._stored:
+                    self._stored[key] = KllSketch.from_dict(data)
+
+    def flush(self):
+        """Voeg de delta sketches samen met de bewaarde versies en schrijf ze weg"""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            deltas, self._delta = self._delta, {}
+        for key, delta in deltas.items():
+            try:
+                data = self.backend.get(self.cache_key(*key))
+                merged = KllSketch.from_dict(data) if data else KllSketch(self.k)
+                merged.merge(delta)
+                self.backend.set(self.cache_key(*key), merged.to_dict())
+            except Exception as e:
+                print(f"Score sketch {key} wegschrijven gefaald: {str(e)}")
+                with self._lock:
+                    # Bij de volgende flush opnieuw proberen
+                    self._delta.setdefault(key, KllSketch(self.k)).merge(delta)
+                    self.stats['flush_errors'] += 1
+                continue
+            with self._lock:
+                self._remember(key, merged)
+                self._wanted.discard(key)
+        with self._lock:
+            others = [key for key in self._stored if key not in deltas]
+        try:
+            self.refresh(others)
+        except Exception as e:
+            print(f"Score sketches verversen gefaald: {str(e)}")
+        with self._lock:
+            self.stats['flushes'] += 1
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid:
+                # Na een fork: eigen delta's en een eigen thread
+                self._pid = pid
+                self._delta = {}
+                self._thread = threading.Thread(target=self._run, name='score-sketches', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            self._wake.wait(max(0.0, next_flush - time.monotonic()))
+            self._wake.clear()
+            with self._lock:
+                wanted = list(self._wanted)
+            for key in wanted:
+                try:
+                    self.load(key)
+                except Exception as e:
+                    print(f"Score sketch {key} laden gefaald: {str(e)}")
+                    with self._lock:
+                        self._wanted.discard(key)
+            if time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, loaded=len(self._stored), pending=sum(d.n for d in self._delta.values()))
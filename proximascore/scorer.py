@@ -0,0 +1,642 @@
+"""
+ProximaScore berekening: geocoding, voorzieningen per categorie en de score per
+profiel. Onafhankelijk van de web laag; de Flask app, de ASGI app, de job workers
+en de command line (python -m proximascore) gebruiken dezelfde calculator.
+"""
+
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from proximascore.address_normalizer import NORMALIZER_VERSION, canonical_address_key, normalize_place
+from proximascore.address_suggest import AddressSuggestIndex, address_extract_entries, geocode_cache_entries
+from proximascore.cache_backends import SQLiteCacheBackend, create_cache_backend
+from proximascore.cache_snapshot import load_snapshot_on_startup
+from proximascore.config import (
+    ADDRESS_ALIAS_TTL, ADDRESS_EXTRACT, ALLE_PROFIELEN, ALLE_VOORZIENINGEN, CACHE_BACKEND, CACHE_SERIALIZER, CACHE_SNAPSHOT_PATH,
+    CACHE_WRITE_BEHIND, CACHE_WRITE_QUEUE_SIZE, CATEGORY_WORKERS, GEOCODE_CACHE_TTL, GEOCODE_DEADLINE_SHARE,
+    GEOCODE_NOT_FOUND_TTL, GEOCODE_URL, GOOGLE_PLACES_API_KEY, GTFS_FEED, GTFS_MIN_DEPARTURES,
+    HEDGE_MAX_EXTRA_RATIO, HEDGE_PERCENTILE, NEARBY_SEARCH_URL, NEGATIVE_ERROR_TTL, OSM_POI_STORE,
+    PLACE_MIN_RATING, PLACE_MIN_RATINGS_TOTAL, PLACE_RELEVANCE_RULES, PLACES_HEDGING, POI_CACHE_TTL_HOURS,
+    POI_EMPTY_TTL_HOURS, POI_PROVIDER_KETENS, QUERY_PLANNER_EARLY_STOP_METERS, QUERY_PLANNER_RADIUS_STEPS,
+    SCORE_CACHE_TTL, SCORE_PERCENTILE_MIN_COUNT, SCORE_SKETCH_FLUSH_SECONDS, SUGGEST_REFRESH_SECONDS
+)
+from proximascore.deadline import DeadlineExceeded, activate, current as current_deadline, upstream_timeout
+from proximascore.gtfs_transit import GtfsFeed, GtfsTransitProvider
+from proximascore.hedging import Hedger
+from proximascore.osm_ingest import OsmPlaceProvider, PoiStore
+from proximascore.place_records import places_from_rows, places_to_dicts, places_to_rows
+from proximascore.poi_providers import (
+    FAILED_SOURCES, CachedPlaceProvider, GooglePlacesProvider, MemoryPlaceProvider, ProviderChain,
+    calculate_distance, location_hash, select_closest_places, types_digest
+)
+from proximascore.query_planner import QueryPlanner
+from proximascore.relevance import RelevanceFilter
+from proximascore.score_sketches import ScoreDistributions
+
+
+class ProximaScoreCalculator:
+    """Hoofdklasse voor ProximaScore berekeningen met uitgebreide debug logging"""
+    
+    def __init__(self, google_api_key, provider_ketens=None):
+        self.api_key = google_api_key
+        self.places_api_key = GOOGLE_PLACES_API_KEY
+        print(f"Calculator geinitialiseerd met API key lengte: {len(self.api_key)}")
+        # Optionele wrapper voor taken naar de worker threads (de app zet hier de profiler)
+        self.task_wrapper = None
+        self.init_database()
+        
+        # POI bronnen, van goedkoop naar duur
+        poi_cache = CachedPlaceProvider(self.cache, ttl_hours=POI_CACHE_TTL_HOURS,
+                                        empty_ttl_hours=POI_EMPTY_TTL_HOURS, error_ttl=NEGATIVE_ERROR_TTL)
+        self.providers = {
+            'memory': MemoryPlaceProvider(empty_ttl_hours=POI_EMPTY_TTL_HOURS, error_ttl=NEGATIVE_ERROR_TTL),
+            'cache': poi_cache,
+            # Google antwoorden ook per type in de gedeelde cache: een gewijzigde
+            # categorie haalt alleen de nieuwe types op
+            'google': GooglePlacesProvider(self.places_api_key, planner=QueryPlanner(
+                radius_steps=QUERY_PLANNER_RADIUS_STEPS,
+                early_stop_distance=QUERY_PLANNER_EARLY_STOP_METERS
+            ), search_url=NEARBY_SEARCH_URL, hedger=Hedger(
+                'nearbysearch', percentile=HEDGE_PERCENTILE, max_extra_ratio=HEDGE_MAX_EXTRA_RATIO
+            ) if PLACES_HEDGING else None, type_cache=poi_cache, relevance=RelevanceFilter(
+                PLACE_RELEVANCE_RULES, min_rating=PLACE_MIN_RATING, min_ratings_total=PLACE_MIN_RATINGS_TOTAL
+            )),
+        }
+        if Path(OSM_POI_STORE).exists():
+            self.providers['osm'] = OsmPlaceProvider(PoiStore(OSM_POI_STORE))
+            print(f"Lokale OSM POI store geladen: {OSM_POI_STORE}")
+        if GtfsFeed(GTFS_FEED).exists():
+            self.providers['gtfs'] = GtfsTransitProvider(GTFS_FEED, min_departures=GTFS_MIN_DEPARTURES)
+        
+        # Scores horen bij de google_types en relevantie regels waarmee ze berekend zijn;
+        # na een wijziging daarvan worden ze opnieuw berekend, net als de POI antwoorden
+        google = self.providers['google']
+        self.score_digest = types_digest([
+            f"{category}={types_digest(entry['google_types'])}/{google.rules_digest(category) or ''}"
+            for category, entry in ALLE_VOORZIENINGEN.items()
+        ])
+        
+        # Bijvoorbeeld {'default': ['memory', 'osm']} voor berekeningen zonder Google calls
+        self.provider_ketens = provider_ketens or POI_PROVIDER_KETENS
+        self.provider_chains = {}
+        
+        # Hoe een score zich verhoudt tot de gemeente en de rest van het land
+        self.distributions = ScoreDistributions(self.cache, flush_interval=SCORE_SKETCH_FLUSH_SECONDS,
+                                                min_count=SCORE_PERCENTILE_MIN_COUNT)
+        
+        # Autocomplete over bekende adressen; wordt op de achtergrond gevuld
+        self.suggest_index = AddressSuggestIndex()
+        self.suggest_index.rebuild_in_background(self.suggest_entries)
+        
+        # Categorieen worden parallel opgezocht
+        self.executor = ThreadPoolExecutor(max_workers=CATEGORY_WORKERS, thread_name_prefix='categorie')
+    
+    def init_database(self):
+        """Initialiseer de cache backend voor geocoding, POI en scores"""
+        Path('data').mkdir(exist_ok=True)
+        self.cache = create_cache_backend(CACHE_BACKEND, serializer=CACHE_SERIALIZER,
+                                          write_behind=CACHE_WRITE_BEHIND, write_queue_size=CACHE_WRITE_QUEUE_SIZE)
+        # De tabellen van de oude SQLite cache één keer overzetten, zodat een upgrade warm blijft
+        backend = getattr(self.cache, 'backend', self.cache)
+        if isinstance(backend, SQLiteCacheBackend):
+            backend.migrate_legacy_tables(self.legacy_cache_entry)
+        if CACHE_SNAPSHOT_PATH:
+            load_snapshot_on_startup(self.cache, CACHE_SNAPSHOT_PATH)
+        print("Database geinitialiseerd")
+    
+    @staticmethod
+    def legacy_cache_entry(table, row):
+        """
+        Rij uit een oude cache tabel als (key, value, expires_at), of None als hij verlopen
+        of onbruikbaar is. De sleutels zijn dezelfde hashes als nu; score_cache werd nooit
+        gevuld en address_aliases komt van een oudere normalizer, die gaan niet mee.
+        """
+        if table == 'address_aliases':
+            # Aliassen van een oudere normalizer: opnieuw afleiden
+            return None
+        try:
+            created_at = datetime.fromisoformat(row['created_at']).timestamp()
+        except (TypeError, ValueError):
+            return None
+        
+        if table == 'geocoding_cache':
+            entry = (f"geocode:{row['address_hash']}",
+                     {'address': row['address'], 'lat': row['lat'], 'lng': row['lng']},
+                     created_at + GEOCODE_CACHE_TTL)
+        elif table == 'poi_cache' and row['category'] in ALLE_VOORZIENINGEN:
+            places = places_from_rows(json.loads(row['poi_data']))
+            ttl_hours = POI_CACHE_TTL_HOURS if places else POI_EMPTY_TTL_HOURS
+            entry = (CachedPlaceProvider.hashed_cache_key(row['location_hash'], row['category'],
+                                                          ALLE_VOORZIENINGEN[row['category']]['google_types']),
+                     places_to_rows(places),
+                     created_at + ttl_hours * 3600)
+        else:
+            return None
+        return entry if entry[2] > time.time() else None
+    
+    def geocode_address(self, address):
+        """Converteer Nederlands adres naar coordinaten met debug logging"""
+        print(f"Geocoding adres: {address}")
+        
+        address_hash = None
+        try:
+            canonical_key, address_hash, cached = self.lookup_cached_geocode(address)
+            if cached is not None:
+                return cached or None
+            
+            # Google Geocoding API call
+            params = self.geocode_params(address)
+            print(f"Geocoding API call: {GEOCODE_URL}")
+            print(f"Geocoding parameters: {params}")
+            
+            import requests
+            response = requests.get(GEOCODE_URL, params=params, timeout=upstream_timeout(10))
+            print(f"Geocoding response status: {response.status_code}")
+            
+            return self.store_geocode_response(address, canonical_key, address_hash, response.json())
+                
+        except Exception as e:
+            print(f"Geocoding fout: {str(e)}")
+            if address_hash:
+                self.store_geocode_error(address_hash)
+            return None
+    
+    def geocode_params(self, address):
+        """Parameters voor de Google Geocoding API"""
+        return {
+            'address': address,
+            'region': 'nl',
+            'key': self.api_key
+        }
+    
+    def lookup_cached_geocode(self, address):
+        """
+        Geef (canonical_key, address_hash, cached) uit de geocoding cache. cached is de
+        locatie, False bij een negatieve entry (onbekend adres of recente fout) of None.
+        """
+        # Cache check op de canonieke sleutel, zodat adresvarianten dezelfde entry delen
+        canonical_key = self.resolve_address_key(address)
+        address_hash = hashlib.md5(canonical_key.encode()).hexdigest()
+        print(f"Canonieke adres sleutel: {canonical_key}")
+        
+        cached = self.cache.get(f"geocode:{address_hash}")
+        if cached and 'negative' in cached:
+            print(f"Negatieve geocoding cache hit ({cached['negative']}) voor: {address}")
+            return canonical_key, address_hash, False
+        if cached:
+            print(f"Geocoding cache hit voor: {address}")
+            self.suggest_index.hit(canonical_key)
+            location = {'lat': cached['lat'], 'lng': cached['lng']}
+            if cached.get('gemeente'):
+                location['gemeente'] = cached['gemeente']
+            return canonical_key, address_hash, location
+        
+        # Adressen uit het lokale extract hebben al coordinaten
+        known = self.suggest_index.get(canonical_key) if cached is None else None
+        if known:
+            label, lat, lng = known
+            print(f"Adres gevonden in suggestie index: {label}")
+            self.cache.set(f"geocode:{address_hash}", {
+                'address': address,
+                'formatted_address': label,
+                'canonical_key': canonical_key,
+                'lat': lat,
+                'lng': lng
+            }, ttl=GEOCODE_CACHE_TTL)
+            self.suggest_index.hit(canonical_key)
+            return canonical_key, address_hash, {'lat': lat, 'lng': lng}
+        return canonical_key, address_hash, None
+    
+    def store_geocode_response(self, address, canonical_key, address_hash, data):
+        """Verwerk een Geocoding API antwoord: locatie teruggeven en cachen"""
+        print(f"Geocoding API status: {data.get('status')}")
+        
+        if data['status'] == 'OK' and data['results']:
+            best = data['results'][0]
+            location = {'lat': best['geometry']['location']['lat'], 'lng': best['geometry']['location']['lng']}
+            formatted_address = best.get('formatted_address')
+            gemeente = self.geocoded_gemeente(best)
+            if gemeente:
+                location['gemeente'] = gemeente
+            
+            # Cache opslaan
+            self.cache.set(f"geocode:{address_hash}", {
+                'address': address,
+                'formatted_address': formatted_address,
+                'canonical_key': canonical_key,
+                'lat': location['lat'],
+                'lng': location['lng'],
+                'gemeente': gemeente
+            }, ttl=GEOCODE_CACHE_TTL)
+            
+            # Ook het door Google geformatteerde adres naar dezelfde sleutel laten wijzen
+            if formatted_address:
+                self.register_address_alias(formatted_address, canonical_key)
+            self.suggest_index.add(canonical_key, formatted_address or address, location['lat'], location['lng'])
+            self.suggest_index.hit(canonical_key)
+            
+            print(f"Geocoding succesvol: {address} -> {location}")
+            return location
+        elif data.get('status') == 'ZERO_RESULTS':
+            # Een typfout in een adres kost anders bij elke nieuwe poging een betaalde call
+            print(f"Adres niet gevonden: {address}")
+            self.cache.set(f"geocode:{address_hash}", {'negative': 'not_found'}, ttl=GEOCODE_NOT_FOUND_TTL)
+            return None
+        else:
+            print(f"Geocoding gefaald: {data.get('status')} - {data}")
+            self.store_geocode_error(address_hash)
+            return None
+    
+    @staticmethod
+    def geocoded_gemeente(geocode_result):
+        """Gemeente (administrative_area_level_2) uit een Geocoding resultaat, genormaliseerd, of None"""
+        for component in geocode_result.get('address_components', []):
+            if 'administrative_area_level_2' in component.get('types', []):
+                return normalize_place(component.get('long_name')) or None
+        return None
+    
+    def store_geocode_error(self, address_hash):
+        """Onthoud een geocoding fout kort, zodat herhaalde pogingen Google niet belasten"""
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired():
+            # Ons eigen tijdsbudget was op; dat zegt niets over Google
+            return
+        self.cache.set(f"geocode:{address_hash}", {'negative': 'error'}, ttl=NEGATIVE_ERROR_TTL)
+    
+    def suggest_entries(self):
+        """Alle bekende adressen voor de suggestie index: eerst het extract, dan de cache"""
+        if Path(ADDRESS_EXTRACT).exists():
+            yield from address_extract_entries(ADDRESS_EXTRACT)
+        yield from geocode_cache_entries(self.cache)
+    
+    def suggest_addresses(self, query, limit=5):
+        """Bekende adressen die met query beginnen, populairste eerst"""
+        self.suggest_index.rebuild_in_background(self.suggest_entries, max_age=SUGGEST_REFRESH_SECONDS)
+        return self.suggest_index.suggest(query, limit)
+    
+    @staticmethod
+    def alias_key(address):
+        """Cache sleutel van de alias van een ruwe schrijfwijze, per normalizer versie"""
+        raw_hash = hashlib.md5(address.strip().lower().encode()).hexdigest()
+        return f"alias:v{NORMALIZER_VERSION}:{raw_hash}"
+    
+    def resolve_address_key(self, address):
+        """Zoek de canonieke sleutel voor een ruw adres, via de alias cache of de normalizer"""
+        known = self.cache.get(self.alias_key(address))
+        if known:
+            return known
+        
+        canonical_key = canonical_address_key(address)
+        self.register_address_alias(address, canonical_key)
+        return canonical_key
+    
+    def register_address_alias(self, address, canonical_key):
+        """Leg vast dat een ruwe adres schrijfwijze naar een canonieke sleutel verwijst"""
+        # Een nieuwe normalizer versie geeft nieuwe alias sleutels; de TTL ruimt de oude op
+        self.cache.set(self.alias_key(address), canonical_key, ttl=ADDRESS_ALIAS_TTL)
+    
+    def find_nearby_places(self, lat, lng, category):
+        """Zoek voorzieningen via Google Places API met uitgebreide debug logging"""
+        places, source = self.lookup_places(lat, lng, category)
+        return places
+    
+    def lookup_places(self, lat, lng, category):
+        """Zoals find_nearby_places, als (places, bron); bron 'error' als de lookup faalde"""
+        print(f"\n=== ZOEK VOORZIENINGEN ===")
+        print(f"Coordinaten: {lat:.6f}, {lng:.6f}")
+        print(f"Categorie: {category}")
+        print(f"Categorie actief: {ALLE_VOORZIENINGEN[category]['active']}")
+        
+        if not ALLE_VOORZIENINGEN[category]['active']:
+            print(f"Categorie {category} niet actief in huidige stap")
+            return [], None
+        
+        try:
+            place_types = ALLE_VOORZIENINGEN[category]['google_types']
+            chain = self.get_provider_chain(category)
+            places, source = chain.lookup(lat, lng, category, place_types,
+                                          postprocess=select_closest_places)
+            
+            print(f"Totaal {len(places)} voorzieningen gevonden voor {category} (bron: {source})")
+            for place in places:
+                print(f"  - {place.name}: {place.distance_meters}m")
+            
+            print(f"=== EINDE ZOEK VOORZIENINGEN ===\n")
+            return places, source
+        
+        except DeadlineExceeded:
+            # Niet als 'niets gevonden' behandelen: de categorie is niet afgerond
+            raise
+        except Exception as e:
+            print(f"Places API fout voor {category}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return [], 'error'
+    
+    def get_provider_chain(self, category):
+        """Provider keten voor een categorie, volgens POI_PROVIDER_KETENS"""
+        tier_names = self.provider_ketens.get(category, self.provider_ketens['default'])
+        # Tiers zonder geconfigureerde bron (bijv. 'osm' zonder store) worden overgeslagen
+        key = tuple(name for name in tier_names if name in self.providers)
+        if key not in self.provider_chains:
+            self.provider_chains[key] = ProviderChain(self.providers[name] for name in key)
+        return self.provider_chains[key]
+    
+    def get_provider_stats(self):
+        """Hit/miss en latency per tier, per geconfigureerde keten"""
+        return {
+            ' -> '.join(key): chain.get_stats()
+            for key, chain in self.provider_chains.items()
+        }
+    
+    def calculate_distance(self, lat1, lon1, lat2, lon2):
+        """Bereken afstand tussen twee punten (Haversine formule)"""
+        return calculate_distance(lat1, lon1, lat2, lon2)
+    
+    def calculate_category_score(self, places):
+        """Score voor categorie: max(0, 100 - (distance / 20))"""
+        if not places:
+            return 0
+        
+        closest_distance = min(place.distance_meters for place in places)
+        score = max(0, 100 - (closest_distance / 20))
+        return min(100, score)
+    
+    def iter_category_scores(self, lat, lng, profile='algemeen', category_fields=None, deadline=None,
+                             failed=None):
+        """
+        Bereken de categorie scores parallel en geef ze terug zodra ze klaar zijn,
+        als (categorie, score_entry, ongeronde_score) in volgorde van afronding.
+        category_fields beperkt welke velden in score_entry worden opgebouwd.
+        Met een deadline stopt het zodra het budget op is; niet afgeronde
+        categorieen worden dan niet teruggegeven, net als categorieen waarvan de
+        taak een onverwachte fout gaf (die komen ook in failed).
+        failed (een set) krijgt de categorieen waarvan de lookup faalde (score 0).
+        """
+        gewichten = ALLE_PROFIELEN[profile]['gewichten']
+        print(f"Gebruikte gewichten: {gewichten}")
+        
+        def score_category(category, weight):
+            print(f"\nBerekenen score voor: {category} (gewicht: {weight})")
+            with activate(deadline):
+                places, source = self.lookup_places(lat, lng, category)
+            if source in FAILED_SOURCES and failed is not None:
+                failed.add(category)
+            entry, category_score = self.build_category_entry(category, weight, places, category_fields)
+            return category, entry, category_score
+        
+        categories = self.scored_categories(profile)
+        self.prefetch_places(lat, lng, [category for category, weight in categories])
+        
+        # Alleen actieve categorieen met gewicht
+        futures = {
+            self.executor.submit(self.task_wrapper(score_category) if self.task_wrapper else score_category,
+                                 category, weight): category
+            for category, weight in categories
+        }
+        try:
+            for future in as_completed(futures, timeout=deadline.remaining() if deadline else None):
+                try:
+                    yield future.result()
+                except DeadlineExceeded as e:
+                    print(f"Categorie niet afgerond: {str(e)}")
+                except Exception as e:
+                    # Eén falende taak kost alleen zijn categorie, niet de hele score
+                    print(f"Categorie {futures[future]} gefaald: {str(e)}")
+                    if failed is not None:
+                        failed.add(futures[future])
+        except FuturesTimeout:
+            print(f"Tijdsbudget op: {sum(1 for future in futures if not future.done())} categorieen afgebroken")
+        finally:
+            # Nog niet gestarte lookups vervallen; lopende starten geen nieuwe upstream calls meer
+            for future in futures:
+                future.cancel()
+    
+    def prefetch_places(self, lat, lng, categories):
+        """
+        Haal de gedeelde POI cache voor alle categorieen in één batch op en zet
+        de treffers in de geheugen tier, in plaats van een round trip per categorie.
+        """
+        if 'memory' not in self.providers or 'cache' not in self.providers:
+            return
+        types_by_category = {category: ALLE_VOORZIENINGEN[category]['google_types'] for category in categories}
+        in_memory = self.providers['memory'].find_many(lat, lng, types_by_category)
+        missing = {
+            category: place_types for category, place_types in types_by_category.items()
+            if category not in in_memory
+        }
+        if not missing:
+            return
+        try:
+            found = self.providers['cache'].find_many(lat, lng, missing)
+        except Exception as e:
+            print(f"POI cache prefetch gefaald: {str(e)}")
+            return
+        if found:
+            print(f"POI cache prefetch: {len(found)}/{len(missing)} categorieen")
+            self.providers['memory'].store_many(lat, lng, found, missing)
+    
+    def score_cache_key(self, lat, lng, profile):
+        return f"score:{location_hash(lat, lng)}:{profile}:{self.score_digest}"
+    
+    def lookup_cached_scores(self, lat, lng, profile, category_fields=None):
+        """Afgeronde categorieen ({categorie: (entry, score)}) uit de score cache, of None"""
+        cached = self.cache.get(self.score_cache_key(lat, lng, profile))
+        if cached is None:
+            return None
+        print(f"Score cache hit voor profiel: {profile}")
+        completed = {}
+        for category, (entry, category_score) in cached.items():
+            if category_fields is not None:
+                entry = {key: value for key, value in entry.items() if key in category_fields}
+            completed[category] = (entry, category_score)
+        return completed
+    
+    def store_cached_scores(self, lat, lng, profile, completed):
+        """Bewaar volledige categorie entries; gefilterde (fields) resultaten niet"""
+        self.cache.set(self.score_cache_key(lat, lng, profile), {
+            category: [entry, category_score]
+            for category, (entry, category_score) in completed.items()
+        }, ttl=SCORE_CACHE_TTL)
+    
+    def scored_categories(self, profile):
+        """(categorie, gewicht) paren die meetellen: actief en met gewicht"""
+        return [
+            (category, weight)
+            for category, weight in ALLE_PROFIELEN[profile]['gewichten'].items()
+            if weight > 0 and ALLE_VOORZIENINGEN[category]['active']
+        ]
+    
+    def build_category_entry(self, category, weight, places, category_fields=None):
+        """
+        Score entry voor één categorie, beperkt tot category_fields.
+        Geeft (entry, ongeronde_score) terug.
+        """
+        category_score = self.calculate_category_score(places)
+        print(f"Score voor {category}: {category_score:.1f}")
+        
+        entry = {}
+        if category_fields is None or 'score' in category_fields:
+            entry['score'] = round(category_score, 1)
+        if category_fields is None or 'weight' in category_fields:
+            entry['weight'] = weight
+        if category_fields is None or 'places' in category_fields:
+            # API grens: hier worden de records weer dicts
+            entry['places'] = places_to_dicts(places)
+        if category_fields is None or 'display_name' in category_fields:
+            entry['display_name'] = ALLE_VOORZIENINGEN[category]['display_name']
+        return entry, category_score
+    
+    def combine_category_scores(self, profile, completed):
+        """
+        Zet afgeronde categorieen ({categorie: (entry, score)}) terug in de volgorde
+        van het profiel en bereken de gewogen totaalscore, genormaliseerd naar 0-100.
+        """
+        categorie_scores = {}
+        total_weighted_score = 0
+        total_weight = 0
+        
+        for category, weight in ALLE_PROFIELEN[profile]['gewichten'].items():
+            if category in completed:
+                entry, category_score = completed[category]
+                categorie_scores[category] = entry
+                total_weighted_score += (category_score * weight)
+                total_weight += weight
+        
+        final_score = (total_weighted_score / total_weight) if total_weight > 0 else 0
+        
+        print(f"Totaal gewogen score: {total_weighted_score}")
+        print(f"Totaal gewicht: {total_weight}")
+        print(f"Finale score: {final_score:.1f}")
+        return categorie_scores, final_score
+    
+    def score_location(self, lat, lng, profile='algemeen'):
+        """
+        Bereken categorie scores en de gewogen totaalscore voor een coordinaat.
+        Geeft (categorie_scores, final_score) terug; gebruikt geen geocoding,
+        zodat batch- en heatmap berekeningen met alleen lokale providers kunnen.
+        """
+        completed = {
+            category: (entry, category_score)
+            for category, entry, category_score in self.iter_category_scores(lat, lng, profile)
+        }
+        return self.combine_category_scores(profile, completed)
+    
+    def iter_proxima_score_events(self, address, profile='algemeen', result_fields=None, category_fields=None,
+                                  deadline=None):
+        """
+        Bereken de ProximaScore stap voor stap als (event, data) paren:
+        'geocode' met de locatie, 'category' per afgeronde categorie en tot slot
+        'result' met het volledige resultaat, of 'error' als het misgaat.
+        result_fields/category_fields beperken het resultaat (zie api_serialization).
+        deadline (zie deadline.py) begrenst de totale duur; wat dan niet af is
+        ontbreekt in het resultaat, dat `incomplete` gemarkeerd wordt.
+        """
+        print(f"\n=== PROXIMASCORE BEREKENING ===")
+        print(f"Adres: {address}")
+        print(f"Profiel: {profile}")
+        
+        try:
+            # Controleer of profiel actief is
+            if not ALLE_PROFIELEN[profile]['active']:
+                yield 'error', {'error': f'Profiel {profile} nog niet beschikbaar in deze versie'}
+                return
+            
+            # Geocode address, binnen een deel van het budget
+            geocode_deadline = deadline.child(GEOCODE_DEADLINE_SHARE) if deadline else None
+            with activate(geocode_deadline):
+                location = self.geocode_address(address)
+            if not location:
+                if geocode_deadline and geocode_deadline.expired():
+                    yield 'error', {'error': 'Tijdslimiet verstreken tijdens geocoding', 'incomplete': True}
+                else:
+                    yield 'error', {'error': 'Adres niet gevonden'}
+                return
+            
+            lat, lng = location['lat'], location['lng']
+            print(f"Geocoordinaten: {lat}, {lng}")
+            yield 'geocode', {'address': address, 'location': location}
+            
+            completed = self.lookup_cached_scores(lat, lng, profile, category_fields)
+            # Alleen nieuw berekende, volledige scores tellen mee in de verdeling
+            record_score = False
+            if completed is not None:
+                for category, (entry, category_score) in completed.items():
+                    yield 'category', dict(entry, category=category)
+            else:
+                completed = {}
+                failed = set()
+                for category, entry, category_score in self.iter_category_scores(
+                        lat, lng, profile, category_fields, deadline, failed):
+                    completed[category] = (entry, category_score)
+                    yield 'category', dict(entry, category=category)
+                missing = self.missing_categories(profile, completed)
+                record_score = not missing and not failed
+                # Een gefaalde categorie staat kort in de negatieve POI cache; de score niet langer
+                if category_fields is None and record_score:
+                    self.store_cached_scores(lat, lng, profile, completed)
+            
+            yield 'result', self.build_result(address, profile, location, completed, result_fields, record_score)
+        
+        except Exception as e:
+            print(f"Score berekening fout: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            yield 'error', {'error': f'Berekening gefaald: {str(e)}'}
+    
+    def build_result(self, address, profile, location, completed, result_fields=None, record_score=False):
+        """
+        Volledig /api/calculate resultaat uit de afgeronde categorieen.
+        record_score: de score telt mee in de verdeling van profiel en gemeente.
+        """
+        categorie_scores, final_score = self.combine_category_scores(profile, completed)
+        
+        result = {
+            'address': address,
+            'profile': profile,
+            'profile_display': ALLE_PROFIELEN[profile]['display_name'],
+            'total_score': round(final_score, 1),
+            'location': {'lat': location['lat'], 'lng': location['lng']},
+            'categories': categorie_scores,
+            'calculated_at': datetime.now().isoformat(),
+            'version': 'Verbeterde versie met debug logging'
+        }
+        if result_fields is not None:
+            result = {key: value for key, value in result.items() if key in result_fields}
+        
+        # Altijd meesturen, ook bij veldselectie: de score is dan over minder categorieen berekend
+        missing = self.missing_categories(profile, completed)
+        if missing:
+            result['incomplete'] = True
+            result['missing_categories'] = missing
+            print(f"Onvolledig resultaat, ontbrekend: {missing}")
+        
+        # Percentiel ten opzichte van eerdere scores, zonder deze score zelf
+        score = round(final_score, 1)
+        region = location.get('gemeente')
+        if not missing and (result_fields is None or 'percentile' in result_fields):
+            percentile = self.distributions.percentile(profile, region, score)
+            if percentile:
+                result['percentile'] = percentile
+        if record_score:
+            self.distributions.record(profile, region, score)
+        
+        print(f"=== PROXIMASCORE RESULTAAT: {final_score:.1f}/100 ===\n")
+        return result
+    
+    def missing_categories(self, profile, completed):
+        """Categorieen die meetellen in het profiel maar niet zijn afgerond"""
+        return [category for category, weight in self.scored_categories(profile) if category not in completed]
+    
+    def calculate_proxima_score(self, address, profile='algemeen', result_fields=None, category_fields=None,
+                                deadline=None):
+        """Bereken ProximaScore voor adres en profiel"""
+        result = {'error': 'Berekening gefaald'}
+        for event, data in self.iter_proxima_score_events(address, profile, result_fields, category_fields, deadline):
+            if event in ('result', 'error'):
+                result = data
+        return result
@@ -0,0 +1,270 @@
+"""
+Write-behind voor de SQLite cache
+Cache writes gebeurden op het request pad, elk in een eigen verbinding en
+transactie; onder gthread workers vechten die om de database lock ("database is
+locked"). WriteBehindCache zet writes in een begrensde wachtrij die één writer
+thread per proces in gegroepeerde transacties wegschrijft. Request threads
+wachten nooit op SQLite: is de wachtrij vol, dan vervalt de write (het is een
+cache) en wordt dat geteld.
+
+Nog niet weggeschreven waarden staan in een overlay, zodat een lookup direct na
+een write hem toch ziet. Bij het afsluiten van het proces wordt de wachtrij leeg
+geschreven.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from proximascore.cache_backends import CacheBackend
+
+
+class WriteBehindCache(CacheBackend):
+    """
+    Wrapper om een backend (in de praktijk SQLite). Reads gaan via de overlay naar
+    de backend; writes en deletes gaan in volgorde via de writer thread.
+    max_queue: maximaal aantal wachtende writes; batch_size: rijen per transactie.
+    """
+
+    def __init__(self, backend, max_queue=10000, batch_size=500, max_delay=0.05, retries=3):
+        self.backend = backend
+        self.serializer = backend.serializer
+        self.name = backend.name
+        self.blocking = backend.blocking
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.retries = retries
+        self._lock = threading.Lock()
+        # key -> (volgnummer, data, expires_at); data None = verwijderd
+        self._pending = {}
+        self._sequence = 0
+        self._queue = None
+        self._writer = None
+        self._pid = None
+        self._closed = False
+        self.stats = {
+            'enqueued': 0, 'written': 0, 'deleted': 0, 'batches': 0,
+            'dropped': 0, 'errors': 0, 'retries': 0, 'max_queue_depth': 0,
+            'overlay_hits': 0, 'write_ms': 0.0,
+        }
+        atexit.register(self.close)
+
+    # --- lezen ---
+
+    def get_many(self, keys):
+        keys = list(keys)
+        now = time.time()
+        found = {}
+        remaining = []
+        with self._lock:
+            for key in keys:
+                pending = self._pending.get(key)
+                if pending is None:
+                    remaining.append(key)
+                    continue
+                sequence, data, expires_at = pending
+                if data is not None and (expires_at is None or expires_at > now):
+                    found[key] = data
+        if found:
+            self._count('overlay_hits', len(found))
+        result = {key: self.serializer.loads(data) for key, data in found.items()}
+        if remaining:
+            result.update(self.backend.get_many(remaining))
+        return result
+
+    # --- schrijven ---
+
+    def set_many(self, mapping, ttl=None):
+        if not mapping:
+            return
+        expires_at = time.time() + ttl if ttl else None
+        # Serialiseren op de request thread: de writer doet alleen nog I/O
+        self._enqueue([(key, self.serializer.dumps(value), expires_at) for key, value in mapping.items()])
+
+    def store_raw(self, rows):
+        self._enqueue(list(rows))
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        if keys:
+            self._enqueue([(key, None, None) for key in keys])
+
+    def _enqueue(self, rows):
+        if self._closed:
+            # Na het afsluiten is er geen writer meer; dan maar direct
+            self._apply([(0, key, data, expires_at) for key, data, expires_at in rows])
+            return
+        work_queue = self._ensure_writer()
+        with self._lock:
+            entries = []
+            for key, data, expires_at in rows:
+                self._sequence += 1
+                self._pending[key] = (self._sequence, data, expires_at)
+                entries.append((self._sequence, key, data, expires_at))
+        for entry in entries:
+            try:
+                work_queue.put_nowait(entry)
+            except queue.Full:
+                self._drop(entry)
+                continue
+            self._count('enqueued')
+        depth = work_queue.qsize()
+        with self._lock:
+            if depth > self.stats['max_queue_depth']:
+                self.stats['max_queue_depth'] = depth
+
+    def _drop(self, entry):
+        sequence, key = entry[0], entry[1]
+        with self._lock:
+            # Alleen de eigen overlay entry weghalen; een nieuwere write blijft staan
+            if self._pending.get(key, (None,))[0] == sequence:
+                del self._pending[key]
+            self.stats['dropped'] += 1
+
+    # --- writer thread ---
+
+    def _ensure_writer(self):
+        pid = os.getpid()
+        if self._writer is not None and self._pid == pid:
+            return self._queue
+        with self._lock:
+            if self._writer is None or self._pid != pid:
+                # Na een fork bestaat de writer thread van de ouder hier niet
+                self._pid = pid
+                self._pending = {}
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._writer = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='cache-writer', daemon=True)
+                self._writer.start()
+        return self._queue
+
+    def _run(self, work_queue):
+        while True:
+            entry = work_queue.get()
+            if entry is None:
+                work_queue.task_done()
+                return
+            batch = [entry]
+            # Kort verzamelen: meerdere writes in één transactie
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    entry = work_queue.get(timeout=timeout) if timeout > 0 else work_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is None:
+                    # Stopsignaal: eerst de huidige batch afmaken
+                    self._write_batch(batch)
+                    for _ in batch:
+                        work_queue.task_done()
+                    work_queue.task_done()
+                    return
+                batch.append(entry)
+            self._write_batch(batch)
+            for _ in batch:
+                work_queue.task_done()
+
+    def _write_batch(self, batch):
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                self._apply(batch)
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    print(f"Cache write-behind: {len(batch)} writes vervallen na fout: {str(e)}")
+                    self._count('errors')
+                    self._count('dropped', len(batch))
+                    break
+                self._count('retries')
+                time.sleep(0.05 * (attempt + 1))
+
+        with self._lock:
+            self.stats['batches'] += 1
+            self.stats['write_ms'] += (time.perf_counter() - start) * 1000
+            for sequence, key, data, expires_at in batch:
+                if self._pending.get(key, (None,))[0] == sequence:
+                    del self._pending[key]
+
+    def _apply(self, batch):
+        # Volgorde bewaren: opeenvolgende writes samen, deletes ertussen apart
+        rows, deletes = [], []
+        for sequence, key, data, expires_at in batch:
+            if data is None:
+                if rows:
+                    self.backend.store_raw(rows)
+                    self._count('written', len(rows))
+                    rows = []
+                deletes.append(key)
+            else:
+                if deletes:
+                    self.backend.delete_many(deletes)
+                    self._count('deleted', len(deletes))
+                    deletes = []
+                rows.append((key, data, expires_at))
+        if rows:
+            self.backend.store_raw(rows)
+            self._count('written', len(rows))
+        if deletes:
+            self.backend.delete_many(deletes)
+            self._count('deleted', len(deletes))
+
+    # --- beheer ---
+
+    def flush(self, timeout=10):
+        """Wacht tot alle wachtende writes zijn weggeschreven; True als dat lukte"""
+        work_queue = self._queue
+        if work_queue is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while work_queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout=10):
+        """Schrijf de wachtrij leeg en stop de writer (ook via atexit)"""
+        if self._closed or self._writer is None or self._pid != os.getpid():
+            return
+        self._closed = True
+        pending = self._queue.qsize()
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            print("Cache write-behind: wachtrij vol bij afsluiten")
+            return
+        self._writer.join(timeout)
+        if pending:
+            print(f"Cache write-behind: {pending} writes weggeschreven bij afsluiten")
+
+    def iter_raw(self):
+        self.flush()
+        return self.backend.iter_raw()
+
+    def load_raw(self, rows):
+        # Bulk laden (snapshots) gaat direct; eerst de wachtrij leeg zodat de volgorde klopt
+        self.flush()
+        return self.backend.load_raw(rows)
+
+    def __getattr__(self, name):
+        # Backend specifieke methoden, zoals purge_expired
+        if name == 'backend':
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats, overlay=len(self._pending))
+        stats['queue_depth'] = self._queue.qsize() if self._queue is not None else 0
+        stats['write_ms'] = round(stats['write_ms'], 2)
+        stats['avg_batch'] = round(stats['written'] / stats['batches'], 1) if stats['batches'] else 0
+        return stats
@@ -0,0 +1,282 @@
+"""
+Profiling op aanvraag voor losse /api/calculate requests
+Alleen actief als PROFILING_TOKEN gezet is; anders wordt er niets geregistreerd
+en kost het niets. Een beheerder zet het aan per request met de header
+`X-Profile-Token: <token>` (of `?profile_token=<token>`), optioneel met
+`X-Profile-Mode: sampling|cprofile` (of `?profile_mode=`).
+
+- sampling: elke paar ms de stacks van de request thread en zijn categorie
+  threads; resultaat in folded stack formaat (flamegraph.pl, speedscope);
+- cprofile: deterministisch via cProfile; resultaat als pstats dump. Tot Python
+  3.12 een profiler per thread; daarna draait cProfile op het proces brede
+  sys.monitoring, dus één profiler voor het hele request (die ook andere
+  gelijktijdige requests ziet). Is er al een profiler actief, dan valt het
+  request terug op sampling.
+
+De dump wordt in data/profiles bewaard; de response krijgt X-Profile-Id en
+X-Profile-Url, te downloaden met dezelfde token. Per minuut mag maar een beperkt
+aantal requests geprofiled worden en nooit meer dan één tegelijk.
+"""
+
+import cProfile
+import hmac
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+PROFILE_MODES = ('sampling', 'cprofile')
+PROFILE_EXTENSIONS = {'sampling': 'folded', 'cprofile': 'pstats'}
+# Vanaf 3.12 mag er maar één cProfile tegelijk actief zijn (ValueError), voor alle threads
+PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+
+_local = threading.local()
+
+
+class ProfileSession:
+    """Profiel van één request, verdeeld over de request thread en zijn worker threads"""
+
+    def __init__(self, mode, sample_interval=0.005):
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.id = uuid.uuid4().hex[:16]
+        self.started_at = time.perf_counter()
+        self.duration = None
+        self._lock = threading.Lock()
+        # thread id -> label voor de wortel van de stack
+        self._threads = {}
+        self._stacks = Counter()
+        self._profiles = []
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._profile = None
+
+    def start(self):
+        _local.session = self
+        if self.mode == 'cprofile' and not PER_THREAD_CPROFILE:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                print("cProfile is al actief in dit proces, profiel via sampling")
+                self._profile = None
+                self.mode = 'sampling'
+        self.enter_thread('request')
+        if self.mode == 'sampling':
+            self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        self.exit_thread()
+        if self._profile is not None:
+            self._profile.disable()
+            self._profiles.append(self._profile)
+            self._profile = None
+        _local.session = None
+        self._stopped.set()
+        if self._sampler:
+            self._sampler.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def enter_thread(self, label):
+        """Neem de huidige thread op in het profiel (tot exit_thread)"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] = label
+        if self.mode == 'cprofile' and PER_THREAD_CPROFILE:
+            profile = cProfile.Profile()
+            _local.profile = profile
+            profile.enable()
+
+    def exit_thread(self):
+        if self.mode == 'cprofile' and PER_THREAD_CPROFILE:
+            profile = getattr(_local, 'profile', None)
+            if profile is not None:
+                profile.disable()
+                _local.profile = None
+                with self._lock:
+                    self._profiles.append(profile)
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+
+    def _sample_loop(self):
+        while not self._stopped.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = dict(self._threads)
+            for thread_id, label in threads.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self._stacks[_fold(label, frame)] += 1
+
+    def write(self, output_dir):
+        """Schrijf de dump naar output_dir; geeft het pad terug"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / f"{self.id}.{PROFILE_EXTENSIONS[self.mode]}"
+
+        if self.mode == 'sampling':
+            with open(path, 'w', encoding='utf-8') as dump:
+                for stack, count in self._stacks.most_common():
+                    dump.write(f"{stack} {count}\n")
+        else:
+            stats = pstats.Stats(*self._profiles) if self._profiles else None
+            if stats is None:
+                path.write_bytes(b'')
+            else:
+                stats.dump_stats(str(path))
+        return path
+
+
+def _fold(label, frame):
+    """Stack als 'label;buitenste;...;binnenste' voor flamegraph tools"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(label)
+    return ';'.join(reversed(names))
+
+
+def wrap_task(function, label='categorie'):
+    """
+    Laat een taak die naar een worker thread gaat meetellen in het profiel van het
+    request dat hem aanmaakt. Zonder actief profiel komt de functie ongewijzigd terug.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        return function
+
+    def profiled(*args, **kwargs):
+        session.enter_thread(label)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            session.exit_thread()
+
+    return profiled
+
+
+class RateLimiter:
+    """Maximaal `per_minute` profielen per minuut (sliding window) en één tegelijk"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.started = []
+        self.active = threading.Lock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        now = time.monotonic()
+        with self._lock:
+            self.started = [moment for moment in self.started if now - moment < 60]
+            if len(self.started) >= self.per_minute:
+                return False
+            if not self.active.acquire(blocking=False):
+                return False
+            self.started.append(now)
+            return True
+
+    def release(self):
+        self.active.release()
+
+
+def token_matches(token, candidate):
+    return bool(token and candidate) and hmac.compare_digest(token.encode(), candidate.encode())
+
+
+def init_request_profiler(app, token, endpoints, output_dir='data/profiles',
+                          per_minute=6, keep=50, sample_interval=0.005):
+    """
+    Registreer de profiling hooks op een Flask app. Zonder token gebeurt er niets.
+    endpoints: namen van de routes die geprofiled mogen worden.
+    """
+    if not token:
+        return None
+
+    from flask import abort, g, request, send_file
+
+    limiter = RateLimiter(per_minute)
+    output_dir = Path(output_dir)
+    print(f"Request profiling beschikbaar voor: {', '.join(sorted(endpoints))}")
+
+    def requested_token():
+        return request.headers.get('X-Profile-Token') or request.args.get('profile_token')
+
+    @app.before_request
+    def start_profile():
+        if request.endpoint not in endpoints:
+            return
+        candidate = requested_token()
+        if not candidate:
+            return
+        if not token_matches(token, candidate):
+            g.profile_status = 'denied'
+            return
+        mode = request.headers.get('X-Profile-Mode') or request.args.get('profile_mode') or 'sampling'
+        if mode not in PROFILE_MODES:
+            g.profile_status = 'invalid-mode'
+            return
+        if not limiter.acquire():
+            g.profile_status = 'rate-limited'
+            return
+
+        session = ProfileSession(mode, sample_interval)
+        session.start()
+        g.profile_session = session
+        g.profile_status = 'ok'
+
+    @app.after_request
+    def finish_profile(response):
+        status = g.pop('profile_status', None)
+        session = g.pop('profile_session', None)
+        if status:
+            response.headers['X-Profile'] = status
+            # Antwoorden met profiel headers horen niet in een gedeelde cache
+            response.headers['Cache-Control'] = 'no-store'
+        if session is None:
+            return response
+
+        try:
+            session.stop()
+            path = session.write(output_dir)
+            _prune(output_dir, keep)
+            response.headers['X-Profile-Id'] = session.id
+            response.headers['X-Profile-Url'] = f"/api/debug/profiles/{path.name}"
+            print(f"Request geprofiled ({session.mode}, {session.duration:.2f}s): {path}")
+        finally:
+            limiter.release()
+        return response
+
+    @app.teardown_request
+    def abort_profile(error):
+        # Na een exception wordt after_request overgeslagen; ruim het profiel dan toch op
+        session = g.pop('profile_session', None)
+        if session is not None:
+            session.stop()
+            limiter.release()
+
+    @app.route('/api/debug/profiles/<name>')
+    def download_profile(name):
+        """Download een profiel dump (zelfde token als voor het profileren)"""
+        if not token_matches(token, requested_token()):
+            abort(404)
+        path = output_dir / Path(name).name
+        if not path.exists() or path.suffix.lstrip('.') not in PROFILE_EXTENSIONS.values():
+            abort(404)
+        return send_file(path.resolve(), mimetype='text/plain' if path.suffix == '.folded'
+                         else 'application/octet-stream', as_attachment=True)
+
+    return limiter
+
+
+def _prune(output_dir, keep):
+    """Alleen de `keep` nieuwste dumps bewaren"""
+    dumps = sorted(output_dir.iterdir(), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in dumps[keep:]:
+        path.unlink(missing_ok=True)
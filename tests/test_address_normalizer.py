@@ -0,0 +1,69 @@
+import pytest
+
+from proximascore.address_normalizer import canonical_address_key, parse_address
+
+
+@pytest.mark.parametrize('variant', [
+    'Markt 1, Dongen',
+    'markt 1  5101 CM Dongen',
+    'Markt 1, 5101CM Dongen, Nederland',
+    'MARKT 1 DONGEN',
+    'Markt 1, Dongen 5101 CM',
+])
+def test_varianten_delen_een_sleutel(variant):
+    assert canonical_address_key(variant) == 'markt 1, dongen'
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('Kerkstr. 12a, Tilburg', 'kerkstraat 12-A, tilburg'),
+    ('Kerkstraat 12 A Tilburg', 'kerkstraat 12-A, tilburg'),
+    ('Hoofdstraat 3 bis, Ede', 'hoofdstraat 3-BIS, ede'),
+    ('Burg. de Withstraat 3, Den Bosch', 'burgemeester de withstraat 3, s hertogenbosch'),
+    ("Markt 2, 's-Hertogenbosch", 'markt 2, s hertogenbosch'),
+    ('5101 ca 17', '5101CA 17'),
+    ('Parkweg 1a1, Ede', 'parkweg 1-A1, ede'),
+    ('Parkweg 1-A1 Ede', 'parkweg 1-A1, ede'),
+])
+def test_canonieke_sleutel(address, expected):
+    assert canonical_address_key(address) == expected
+
+
+def test_jaartal_in_straatnaam_is_geen_postcode():
+    delen = parse_address('Plein 1944 nr 5, Nijmegen')
+    assert delen['postcode'] is None
+    assert delen['straat'] == 'plein 1944'
+    assert delen['huisnummer'] == '5'
+    assert delen['plaats'] == 'nijmegen'
+
+
+def test_postcode_voor_het_huisnummer_telt_niet():
+    assert parse_address('Dorpsweg 1234 ab, Tilburg')['postcode'] is None
+
+
+@pytest.mark.parametrize('letters', ['SA', 'SD', 'SS'])
+def test_niet_uitgegeven_postcode_letters(letters):
+    assert parse_address(f'Laan 5, 1234 {letters} Ede')['postcode'] is None
+
+
+def test_postcode_na_huisnummer():
+    delen = parse_address('Laan 5, 1234 AB Ede')
+    assert delen['postcode'] == '1234AB'
+    assert delen['plaats'] == 'ede'
+
+
+def test_kort_woord_na_huisnummer_is_geen_toevoeging():
+    delen = parse_address('Markt 1 De Bilt')
+    assert delen['toevoeging'] is None
+    assert delen['plaats'] == 'de bilt'
+    assert parse_address('Kerkweg 3 te Ede')['toevoeging'] is None
+
+
+def test_zonder_plaats_is_de_sleutel_postcode_en_huisnummer():
+    # Zonder plaatsnaam valt de sleutel terug op postcode + huisnummer; de plaats is
+    # niet uit de postcode af te leiden, dus dit deelt geen entry met het volledige adres
+    assert canonical_address_key('Markt 1 5101CM') == '5101CM 1'
+    assert canonical_address_key('Markt 1, 5101CM Dongen') == 'markt 1, dongen'
+
+
+def test_onleesbaar_adres_valt_terug_op_tekst():
+    assert canonical_address_key('  Ergens, Nergens!! ') == 'ergens nergens'
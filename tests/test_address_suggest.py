@@ -0,0 +1,60 @@
+from proximascore.address_suggest import AddressSuggestIndex, search_keys
+
+
+def addresses(suggestions):
+    return [suggestion['address'] for suggestion in suggestions]
+
+
+def test_prefix_op_label_en_postcode():
+    index = AddressSuggestIndex()
+    index.add('markt 1, dongen', 'Markt 1, 5101 CM Dongen', 51.62, 4.94)
+    index.add('markt 12, dongen', 'Markt 12, 5101 CN Dongen', 51.63, 4.94)
+    index.add('kerkstraat 3, tilburg', 'Kerkstraat 3, 5038 AA Tilburg', 51.56, 5.09)
+
+    assert addresses(index.suggest('markt 1')) == ['Markt 1, 5101 CM Dongen', 'Markt 12, 5101 CN Dongen']
+    assert addresses(index.suggest('5101CM 1')) == ['Markt 1, 5101 CM Dongen']
+    assert addresses(index.suggest('5101 cn')) == ['Markt 12, 5101 CN Dongen']
+    assert index.suggest('ma') == []
+    assert index.suggest('Dorpsstraat') == []
+
+
+def test_populaire_adressen_eerst():
+    index = AddressSuggestIndex()
+    for number in (1, 2, 3):
+        index.add(f"markt {number}, dongen", f"Markt {number}, Dongen", 51.62, 4.94)
+    index.hit('markt 3, dongen', 5)
+    index.hit('markt 2, dongen')
+
+    assert addresses(index.suggest('markt', limit=3)) == ['Markt 3, Dongen', 'Markt 2, Dongen', 'Markt 1, Dongen']
+    assert addresses(index.suggest('markt', limit=1)) == ['Markt 3, Dongen']
+
+
+def test_nieuw_label_verwijdert_de_oude_zoekteksten():
+    index = AddressSuggestIndex()
+    index.add('markt 1, dongen', 'Marktplein 1, 5101 CM Dongen', 51.62, 4.94)
+    index.hit('markt 1, dongen')
+    index.add('markt 1, dongen', 'Markt 1, 5101 CA Dongen', 51.62, 4.94)
+
+    assert index.suggest('marktplein') == []
+    assert index.suggest('5101CM') == []
+    assert addresses(index.suggest('5101CA 1')) == ['Markt 1, 5101 CA Dongen']
+    assert addresses(index.suggest('markt 1')) == ['Markt 1, 5101 CA Dongen']
+    expected = sorted(search_keys('markt 1, dongen', 'Markt 1, 5101 CA Dongen'))
+    assert index._all.keys == index._popular.keys == expected
+
+
+def test_adres_tijdens_herbouw_blijft_bewaard():
+    index = AddressSuggestIndex()
+    index.add('markt 1, dongen', 'Markt 1, Dongen', 51.62, 4.94)
+
+    def entries():
+        yield 'kerkstraat 3, tilburg', 'Kerkstraat 3, Tilburg', 51.56, 5.09, 2
+        # Een request geocodeert een nieuw adres terwijl de herbouw loopt
+        index.add('markt 2, dongen', 'Markt 2, Dongen', 51.62, 4.94)
+        yield 'markt 1, dongen', 'Markt 1, Dongen', 51.62, 4.94, 0
+
+    index.rebuild(entries())
+
+    assert addresses(index.suggest('markt')) == ['Markt 1, Dongen', 'Markt 2, Dongen']
+    assert addresses(index.suggest('kerk')) == ['Kerkstraat 3, Tilburg']
+    assert len(index) == 3
@@ -0,0 +1,35 @@
+import pytest
+
+from api_serialization import CATEGORY_FIELDS, parse_fields
+
+
+def test_zonder_fields_het_volledige_resultaat():
+    assert parse_fields({}) == (None, None)
+    assert parse_fields({'fields': ''}) == (None, None)
+
+
+def test_komma_gescheiden_en_lijst_geven_hetzelfde():
+    expected = ({'total_score', 'categories'}, {'score'})
+    assert parse_fields({'fields': 'total_score, categories.score'}) == expected
+    assert parse_fields({'fields': ['total_score', 'categories.score']}) == expected
+
+
+@pytest.mark.parametrize('compact', [True, 'true', '1', 'ja'])
+def test_compact(compact):
+    assert parse_fields({'compact': compact}) == ({'total_score', 'categories'}, {'score'})
+
+
+def test_categories_zonder_subveld_geeft_alle_subvelden():
+    assert parse_fields({'fields': 'categories'}) == ({'categories'}, set(CATEGORY_FIELDS))
+
+
+@pytest.mark.parametrize('fields', ['bestaat_niet', 'categories.bestaat_niet', ['address', 'geheim']])
+def test_onbekend_veld_geeft_value_error(fields):
+    with pytest.raises(ValueError):
+        parse_fields({'fields': fields})
+
+
+@pytest.mark.parametrize('fields', [5, {'a': 1}, 1.5, True, ['address', 3], [None]])
+def test_verkeerd_type_geeft_value_error(fields):
+    with pytest.raises(ValueError):
+        parse_fields({'fields': fields})
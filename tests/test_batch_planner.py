@@ -0,0 +1,185 @@
+import random
+
+import pytest
+import requests
+
+from proximascore import batch_planner
+from proximascore.batch_planner import BatchPlanner, cluster_points, places_from_candidates
+from proximascore.place_records import Place
+from proximascore.poi_providers import GooglePlacesProvider, PlaceProvider, calculate_distance
+from proximascore.query_planner import MAX_SCORE_DISTANCE
+from proximascore.scorer import ProximaScoreCalculator
+
+METERS_PER_DEGREE = 111320
+
+
+def offset(lat, lng, east=0, north=0):
+    """Punt east/north meter verschoven (genoeg voor korte afstanden)"""
+    return lat + north / METERS_PER_DEGREE, lng + east / (METERS_PER_DEGREE * 0.62)
+
+
+class ListProvider(PlaceProvider):
+    """Bron met vaste places; geeft alles binnen radius van de gevraagde locatie"""
+
+    name = 'osm'
+
+    def __init__(self, places, radius=MAX_SCORE_DISTANCE):
+        self.places = places
+        self.radius = radius
+
+    def widened(self, extra_distance):
+        return ListProvider(self.places, self.radius + extra_distance)
+
+    def find_places(self, lat, lng, category, place_types):
+        found = []
+        for name, place_lat, place_lng in self.places:
+            distance = round(calculate_distance(lat, lng, place_lat, place_lng))
+            if distance <= self.radius:
+                found.append(Place(name, 'Straat 1', distance, place_lat, place_lng, 4.0))
+        return sorted(found, key=lambda place: place.distance_meters)
+
+
+def make_calculator(providers, tiers):
+    calculator = ProximaScoreCalculator.__new__(ProximaScoreCalculator)
+    calculator.providers = providers
+    calculator.provider_ketens = {'default': tiers}
+    calculator.provider_chains = {}
+    calculator.scored_categories = lambda profile: [('supermarkt', 35)]
+    return calculator
+
+
+def test_cluster_leden_liggen_binnen_radius_van_hun_anker():
+    rng = random.Random(7)
+    points = [offset(51.56, 5.09, rng.uniform(-3000, 3000), rng.uniform(-3000, 3000)) for _ in range(300)]
+    clusters = cluster_points(points, 400)
+
+    assert sorted(index for cluster in clusters for index in cluster) == list(range(len(points)))
+    anchors = [points[cluster[0]] for cluster in clusters]
+    for cluster in clusters:
+        for index in cluster:
+            assert calculate_distance(*points[index], *points[cluster[0]]) <= 400
+    # Greedy: een punt wordt alleen anker als er geen anker binnen radius ligt
+    for position, anchor in enumerate(anchors):
+        assert all(calculate_distance(*anchor, *other) > 400 for other in anchors[:position])
+
+
+def test_cluster_over_een_celgrens():
+    cell_lat = 400 / METERS_PER_DEGREE
+    # Net aan weerszijden van een celgrens, 100 m uit elkaar
+    first = (52 * cell_lat + 0.0000001, 5.0)
+    second = (first[0] - 100 / METERS_PER_DEGREE, 5.0)
+    assert cluster_points([first, second], 400) == [[0, 1]]
+
+
+def test_kandidaten_krijgen_afstand_vanaf_het_adres():
+    lat, lng = 51.56, 5.09
+    candidates = [
+        Place('Dichtbij', '', 2300, *offset(lat, lng, east=150)),
+        Place('Te ver', '', 100, *offset(lat, lng, east=-(MAX_SCORE_DISTANCE + 200))),
+    ]
+    places = places_from_candidates(lat, lng, candidates)
+    assert [place.name for place in places] == ['Dichtbij']
+    assert abs(places[0].distance_meters - 150) <= 2
+
+
+def test_gedeelde_lookup_dekt_de_zoekcirkel_van_elk_lid():
+    anchor = (51.56, 5.09)
+    member = offset(*anchor, east=380)
+    # Alleen voor het lid binnen 2000 m, voor het anker 2350 m weg
+    places = [('Oost', *offset(*anchor, east=2350)), ('West', *offset(*anchor, east=-1500))]
+    calculator = make_calculator({'osm': ListProvider(places)}, ['osm'])
+    planner = BatchPlanner(calculator, cluster_radius=400)
+    locations = {0: {'lat': anchor[0], 'lng': anchor[1]}, 1: {'lat': member[0], 'lng': member[1]}}
+
+    scored, calls, saturated_lookups = planner.score_cluster([0, 1], locations, 'algemeen', None)
+
+    assert saturated_lookups == 0
+    for index, (lat, lng) in ((0, anchor), (1, member)):
+        completed, failed = scored[index]
+        alone, source = calculator.lookup_places(lat, lng, 'supermarkt')
+        assert not failed
+        assert completed['supermarkt'] == calculator.build_category_entry('supermarkt', 35, alone)
+    assert scored[1][0]['supermarkt'] != scored[0][0]['supermarkt']
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def result(name, lat, lng):
+    return {'name': name, 'vicinity': 'Straat 1', 'geometry': {'location': {'lat': lat, 'lng': lng}}}
+
+
+def test_verzadigde_categorie_valt_terug_op_losse_lookups(monkeypatch):
+    anchor = (51.56, 5.09)
+    member = offset(*anchor, east=300)
+    far = offset(*anchor, east=-2300)
+    requested = []
+
+    def fake_get(url, params=None, timeout=None):
+        requested.append(params)
+        filler = [result(f"Ver {len(requested)}-{number}", *far) for number in range(20)]
+        if 'pagetoken' in params:
+            return FakeResponse({'status': 'OK', 'results': filler, 'next_page_token': 'volgende'})
+        if params.get('radius') == MAX_SCORE_DISTANCE + 400:
+            return FakeResponse({'status': 'OK', 'results': filler, 'next_page_token': 'volgende'})
+        lat, lng = map(float, params['location'].split(','))
+        return FakeResponse({'status': 'OK', 'results': [result('Om de hoek', *offset(lat, lng, east=80))]})
+
+    monkeypatch.setattr(requests, 'get', fake_get)
+    monkeypatch.setattr('proximascore.poi_providers.PAGE_TOKEN_DELAY', 0)
+    calculator = make_calculator({'google': GooglePlacesProvider('sleutel')}, ['google'])
+    planner = BatchPlanner(calculator, cluster_radius=400)
+    locations = {0: {'lat': anchor[0], 'lng': anchor[1]}, 1: {'lat': member[0], 'lng': member[1]}}
+
+    scored, calls, saturated_lookups = planner.score_cluster([0, 1], locations, 'algemeen', None)
+
+    assert saturated_lookups == 2
+    # Per type drie pagina's; de volgende pagina's tellen mee als Google calls
+    assert sum(1 for params in requested if 'pagetoken' in params) == 4
+    assert calls['supermarkt'] == len(requested)
+    for index in (0, 1):
+        completed, failed = scored[index]
+        assert not failed
+        assert completed['supermarkt'][0]['score'] > 0
+    assert not planner.providers['google'].saturated
+
+
+def test_heartbeat_tijdens_het_geocoderen(monkeypatch):
+    monkeypatch.setattr(batch_planner, 'HEARTBEAT_INTERVAL', 0)
+    calculator = make_calculator({}, [])
+    geocoded = []
+    progress = []
+
+    def geocode_address(address):
+        geocoded.append(address)
+        progress.append(('geocode', address))
+        return {'lat': 51.56, 'lng': 5.09 + len(geocoded) * 0.1}
+
+    calculator.geocode_address = geocode_address
+    calculator.lookup_cached_scores = lambda lat, lng, profile, category_fields=None: {}
+    calculator.build_result = lambda *args, **kwargs: {'total_score': 0}
+
+    addresses = ['Markt 1, Dongen', 'Markt 2, Dongen', 'Markt 3, Dongen']
+    results, report = BatchPlanner(calculator).score_addresses(
+        addresses, report_progress=lambda done, total: progress.append((done, total)))
+
+    assert results == [{'total_score': 0}] * 3
+    # Na elk gegeocodeerd adres een melding, voor er iets afgerond is
+    assert progress[:6] == [('geocode', addresses[0]), (0, 3), ('geocode', addresses[1]), (0, 3),
+                            ('geocode', addresses[2]), (0, 3)]
+    assert progress[-1] == (3, 3)
+
+
+@pytest.mark.parametrize('radius', [0, 400])
+def test_lege_lijst(radius):
+    results, report = BatchPlanner(make_calculator({}, []), cluster_radius=radius).score_addresses([])
+    assert results == []
+    assert report['clusters'] == 0
@@ -0,0 +1,78 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from proximascore.cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+from proximascore.config import ALLE_VOORZIENINGEN
+from proximascore.poi_providers import CachedPlaceProvider
+from proximascore.scorer import ProximaScoreCalculator
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteCacheBackend(tmp_path / 'cache.db')
+    return MemoryCacheBackend()
+
+
+def test_get_set_en_ttl(backend):
+    backend.set('a', {'x': 1})
+    backend.set('verlopen', 1, ttl=-1)
+    assert backend.get('a') == {'x': 1}
+    assert backend.get('verlopen') is None
+    assert backend.get_many(['a', 'b']) == {'a': {'x': 1}}
+    backend.delete('a')
+    assert backend.get('a') is None
+
+
+def test_load_raw_overschrijft_geen_nieuwere_entry(backend):
+    backend.set('a', 'nieuw', ttl=3600)
+    rows = [(key, data, expires_at - 60) for key, data, expires_at in backend.iter_raw()]
+    backend.set('a', 'nieuwer', ttl=7200)
+    backend.load_raw(rows)
+    assert backend.get('a') == 'nieuwer'
+
+
+def create_legacy_tables(db_path):
+    now = datetime.now()
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('CREATE TABLE geocoding_cache (id INTEGER PRIMARY KEY, address_hash TEXT UNIQUE, '
+                     'address TEXT, lat REAL, lng REAL, created_at TIMESTAMP)')
+        conn.execute('CREATE TABLE address_aliases (raw_hash TEXT PRIMARY KEY, raw_address TEXT, '
+                     'canonical_key TEXT, created_at TIMESTAMP)')
+        conn.execute('CREATE TABLE poi_cache (id INTEGER PRIMARY KEY, location_hash TEXT, category TEXT, '
+                     'poi_data TEXT, created_at TIMESTAMP)')
+        conn.execute('CREATE TABLE score_cache (id INTEGER PRIMARY KEY, address_hash TEXT, profile TEXT, '
+                     'score_data TEXT, created_at TIMESTAMP)')
+        conn.executemany('INSERT INTO geocoding_cache (address_hash, address, lat, lng, created_at) '
+                         'VALUES (?, ?, ?, ?, ?)', [
+                             ('vers', 'Markt 1, Dongen', 51.62, 4.94, now - timedelta(hours=1)),
+                             ('oud', 'Markt 2, Dongen', 51.62, 4.94, now - timedelta(days=30)),
+                         ])
+        conn.execute('INSERT INTO address_aliases VALUES (?, ?, ?, ?)',
+                     ('rauw', 'markt 1 dongen', 'markt 1, dongen', now))
+        conn.execute('INSERT INTO poi_cache (location_hash, category, poi_data, created_at) VALUES (?, ?, ?, ?)',
+                     ('plek', 'supermarkt', json.dumps([{'name': 'Jumbo', 'address': 'Markt 3', 'distance_meters': 120,
+                                                         'lat': 51.62, 'lng': 4.94, 'rating': 4.1}]), now))
+
+
+def test_oude_tabellen_worden_eenmalig_omgezet(tmp_path):
+    db_path = tmp_path / 'proximascore.db'
+    create_legacy_tables(db_path)
+    backend = SQLiteCacheBackend(db_path)
+
+    assert backend.migrate_legacy_tables(ProximaScoreCalculator.legacy_cache_entry) == 2
+    assert backend.get('geocode:vers') == {'address': 'Markt 1, Dongen', 'lat': 51.62, 'lng': 4.94}
+    assert backend.get('geocode:oud') is None
+    # Aliassen van een oudere normalizer gaan niet mee
+    assert backend.get('alias:rauw') is None
+    poi_key = CachedPlaceProvider.hashed_cache_key('plek', 'supermarkt',
+                                                   ALLE_VOORZIENINGEN['supermarkt']['google_types'])
+    assert backend.get(poi_key) == [['Jumbo', 'Markt 3', 120, 51.62, 4.94, 4.1]]
+
+    with sqlite3.connect(db_path) as conn:
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {'cache_entries'}
+    assert backend.migrate_legacy_tables(ProximaScoreCalculator.legacy_cache_entry) == 0
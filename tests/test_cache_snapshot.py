@@ -0,0 +1,59 @@
+from proximascore.cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+from proximascore.cache_snapshot import (
+    SNAPSHOT_MIN_TTL, export_snapshot, import_snapshot, load_snapshot_on_startup
+)
+from proximascore.write_behind import WriteBehindCache
+
+
+def filled_backend():
+    backend = MemoryCacheBackend()
+    backend.set('geocode:abc', {'lat': 51.56, 'lng': 5.09}, ttl=86400)
+    backend.set('poi:abc:supermarkt', [['Jumbo', 'Markt 3', 120, 51.56, 5.09, 4.1]], ttl=3600)
+    backend.set('zonder_ttl', 'blijft')
+    backend.set('bijna_verlopen', 1, ttl=SNAPSHOT_MIN_TTL // 2)
+    return backend
+
+
+def test_export_en_import_behouden_de_verlooptijd(tmp_path):
+    source = filled_backend()
+    path = tmp_path / 'snapshot.jsonl.gz'
+    assert export_snapshot(source, path) == 3
+
+    target = MemoryCacheBackend()
+    assert import_snapshot(target, path) == 3
+    expected = {key: expires_at for key, data, expires_at in source.iter_raw() if key != 'bijna_verlopen'}
+    assert {key: expires_at for key, data, expires_at in target.iter_raw()} == expected
+    assert target.get('poi:abc:supermarkt') == [['Jumbo', 'Markt 3', 120, 51.56, 5.09, 4.1]]
+
+
+def test_export_met_prefix(tmp_path):
+    path = tmp_path / 'snapshot.jsonl.gz'
+    assert export_snapshot(filled_backend(), path, prefixes=['geocode:']) == 1
+
+
+def test_snapshot_wordt_maar_een_keer_geladen(tmp_path):
+    path = tmp_path / 'snapshot.jsonl.gz'
+    export_snapshot(filled_backend(), path)
+    backend = MemoryCacheBackend()
+    assert load_snapshot_on_startup(backend, path) == 3
+    assert load_snapshot_on_startup(backend, path) == 0
+
+
+def test_marker_staat_in_sqlite_voor_de_volgende_worker(tmp_path):
+    path = tmp_path / 'snapshot.jsonl.gz'
+    export_snapshot(filled_backend(), path)
+    # Twee workers op dezelfde SQLite cache, elk met een eigen write-behind wachtrij
+    first = WriteBehindCache(SQLiteCacheBackend(tmp_path / 'cache.db'), max_delay=0.5)
+    second = WriteBehindCache(SQLiteCacheBackend(tmp_path / 'cache.db'), max_delay=0.5)
+
+    assert load_snapshot_on_startup(first, path) == 3
+    assert load_snapshot_on_startup(second, path) == 0
+    assert second.get('geocode:abc') == {'lat': 51.56, 'lng': 5.09}
+    first.close()
+    second.close()
+
+
+def test_kapotte_snapshot_blokkeert_niet(tmp_path):
+    path = tmp_path / 'snapshot.jsonl.gz'
+    path.write_bytes(b'geen gzip')
+    assert load_snapshot_on_startup(MemoryCacheBackend(), path) == 0
@@ -0,0 +1,19 @@
+from proximascore.deadline import request_deadline
+
+BUDGETS = {'calculate_score': 25, 'calculate_score_stream': 28, 'zonder_limiet': None}
+
+
+def test_budget_per_route():
+    assert 24 < request_deadline(BUDGETS, 'calculate_score').remaining() <= 25
+    assert request_deadline(BUDGETS, 'zonder_limiet') is None
+
+
+def test_client_mag_alleen_korter_vragen():
+    assert request_deadline(BUDGETS, 'calculate_score', '3000').remaining() <= 3
+    assert request_deadline(BUDGETS, 'calculate_score', '60000').remaining() <= 25
+    assert request_deadline(BUDGETS, 'calculate_score', 'onzin').remaining() > 24
+
+
+def test_standaard_budgetten_blijven_onder_de_gateway_limiet():
+    from app import ROUTE_DEADLINES
+    assert all(budget < 30 for budget in ROUTE_DEADLINES.values())
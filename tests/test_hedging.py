@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from proximascore.hedging import HedgeBudget, Hedger
+
+
+def test_snelle_call_gebruikt_geen_pool():
+    hedger = Hedger('test', initial_delay=0.5)
+    assert hedger.call(lambda: 'antwoord') == 'antwoord'
+    assert hedger._executor is None
+    assert hedger.get_stats()['hedged'] == 0
+
+
+def test_hedge_vangt_een_hangende_eerste_call_op():
+    hedger = Hedger('test', initial_delay=0.02)
+    attempts = []
+
+    def search():
+        attempts.append(threading.get_ident())
+        if len(attempts) == 1:
+            time.sleep(0.2)
+            raise TimeoutError('upstream hangt')
+        return 'antwoord'
+
+    assert hedger.call(search) == 'antwoord'
+    stats = hedger.get_stats()
+    assert stats['hedged'] == 1
+    assert stats['hedge_wins'] == 1
+    assert attempts[0] != attempts[1]
+
+
+def test_hedge_wint_van_een_trage_eerste_call_die_later_slaagt():
+    hedger = Hedger('test', initial_delay=0.05)
+    calls = []
+
+    def search():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(1.0)
+            return 'eerste'
+        return 'hedge'
+
+    start = time.perf_counter()
+    assert hedger.call(search) == 'hedge'
+    # Na ongeveer de vertraging plus de latency van de hedge, niet na de hangende call
+    assert time.perf_counter() - start < 0.5
+    assert hedger.get_stats()['hedge_wins'] == 1
+
+
+def test_trage_eerste_call_die_slaagt_wint():
+    hedger = Hedger('test', initial_delay=0.02)
+    calls = []
+
+    def search():
+        calls.append(None)
+        time.sleep(0.1 if len(calls) == 1 else 0.3)
+        return len(calls)
+
+    assert hedger.call(search) >= 1
+    assert hedger.get_stats()['primary_wins'] == 1
+
+
+def test_fout_zonder_hedge_komt_door():
+    hedger = Hedger('test', initial_delay=0.5)
+
+    def search():
+        raise ValueError('kapot')
+
+    with pytest.raises(ValueError):
+        hedger.call(search)
+    assert hedger.get_stats()['errors'] == 1
+
+
+def test_budget_begrenst_het_aantal_hedges():
+    budget = HedgeBudget(ratio=0.5, burst=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
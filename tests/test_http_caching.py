@@ -0,0 +1,82 @@
+import gzip
+
+import pytest
+
+from http_caching import conditional_body, content_etag
+
+BODY = b'{"total_score": 71.5}' * 100
+
+
+def test_etag_is_stabiel_voor_dezelfde_inhoud():
+    assert content_etag('abc') == content_etag(b'abc')
+    assert content_etag('abc') != content_etag('abd')
+
+
+def test_304_bij_overeenkomende_etag():
+    etag = content_etag(BODY)
+    status, headers, body = conditional_body('GET', f'"{etag}"', None, BODY, 'application/json')
+    assert status == 304
+    assert body == b''
+    assert headers['ETag'] == f'"{etag}"'
+
+
+@pytest.mark.parametrize('if_none_match', ['*', 'W/"{etag}"', '"andere", "{etag}-gzip"'])
+def test_304_ook_voor_zwakke_en_gecomprimeerde_varianten(if_none_match):
+    etag = content_etag(BODY)
+    status, headers, body = conditional_body('GET', if_none_match.format(etag=etag), None, BODY, 'application/json')
+    assert status == 304
+
+
+def test_geen_304_voor_post():
+    etag = content_etag(BODY)
+    status, headers, body = conditional_body('POST', f'"{etag}"', None, BODY, 'application/json')
+    assert status == 200
+    assert body == BODY
+
+
+def test_gecomprimeerde_response_krijgt_eigen_etag():
+    etag = content_etag(BODY)
+    status, headers, body = conditional_body('GET', '"iets anders"', 'gzip;q=1, br;q=0', BODY, 'application/json')
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['ETag'] == f'"{etag}-gzip"'
+    assert gzip.decompress(body) == BODY
+
+
+def test_kleine_body_blijft_ongecomprimeerd():
+    status, headers, body = conditional_body('GET', None, 'gzip', b'{}', 'application/json')
+    assert 'Content-Encoding' not in headers
+    assert body == b'{}'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import app as app_module
+
+    def calculate_proxima_score(address, profile, result_fields=None, category_fields=None, deadline=None):
+        return {'address': address, 'profile': profile, 'total_score': 71.5, 'calculated_at': 'nu'}
+
+    monkeypatch.setattr(app_module.calculator, 'calculate_proxima_score', calculate_proxima_score)
+    return app_module.app.test_client()
+
+
+def test_calculate_get_is_publiek_cachebaar_met_etag(client):
+    response = client.get('/api/calculate?address=Markt+1+Dongen')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'].startswith('public, max-age=300')
+    assert 'stale-while-revalidate' in response.headers['Cache-Control']
+
+    again = client.get('/api/calculate?address=Markt+1+Dongen',
+                       headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+
+def test_calculate_post_en_fouten_niet_in_gedeelde_cache(client):
+    response = client.post('/api/calculate', json={'address': 'Markt 1 Dongen'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'].startswith('private')
+
+    response = client.get('/api/calculate')
+    assert response.status_code == 400
+    assert response.headers['Cache-Control'] == 'no-store'
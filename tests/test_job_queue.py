@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import job_queue
+from job_queue import JOB_STALE_SECONDS, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / 'jobs.db', max_running=2)
+
+
+def submit(queue, priority=0, max_attempts=3):
+    return queue.submit('batch_score', {'addresses': ['Markt 1, Dongen']}, priority=priority,
+                        max_attempts=max_attempts, total=1)
+
+
+def age_heartbeat(queue, job_id, seconds):
+    with queue.connect() as conn:
+        conn.execute('UPDATE jobs SET heartbeat_at = ? WHERE id = ?',
+                     (datetime.now() - timedelta(seconds=seconds), job_id))
+
+
+def test_hoogste_prioriteit_en_oudste_eerst(queue):
+    first = submit(queue)
+    urgent = submit(queue, priority=5)
+    second = submit(queue)
+    queue.max_running = 3
+    assert [queue.claim('w')['id'] for _ in range(3)] == [urgent, first, second]
+    assert queue.claim('w') is None
+
+
+def test_claim_respecteert_max_running(queue):
+    for _ in range(3):
+        submit(queue)
+    assert queue.claim('w1') is not None
+    assert queue.claim('w2') is not None
+    assert queue.claim('w3') is None
+    assert queue.get_stats()['running'] == 2
+
+
+def test_claim_telt_de_poging(queue):
+    job_id = submit(queue)
+    job = queue.claim('w')
+    assert job['id'] == job_id
+    assert job['attempts'] == 1
+    assert job['payload'] == {'addresses': ['Markt 1, Dongen']}
+    assert queue.get(job_id)['status'] == 'running'
+
+
+def test_job_zonder_heartbeat_gaat_terug_in_de_queue(queue):
+    job_id = submit(queue)
+    queue.claim('w1')
+    age_heartbeat(queue, job_id, JOB_STALE_SECONDS + 10)
+
+    job = queue.claim('w2')
+    assert job['id'] == job_id
+    assert job['attempts'] == 2
+
+
+def test_oude_worker_kan_een_overgenomen_job_niet_meer_wijzigen(queue):
+    job_id = submit(queue)
+    queue.claim('w1')
+    age_heartbeat(queue, job_id, JOB_STALE_SECONDS + 10)
+    assert queue.claim('w2')['id'] == job_id
+
+    # w1 loopt nog door en meldt zich pas na de overname
+    assert not queue.update_progress(job_id, 'w1', 1)
+    assert not queue.fail(job_id, 'w1', 'kapot')
+    assert not queue.complete(job_id, 'w1', {'count': 0})
+    job = queue.get(job_id, include_result=True)
+    assert (job['status'], job['attempts'], job['result']) == ('running', 2, None)
+
+    assert queue.complete(job_id, 'w2', {'count': 1})
+    assert queue.get(job_id, include_result=True)['result'] == {'count': 1}
+
+
+def test_heartbeat_houdt_een_job_bij_zijn_worker(queue):
+    job_id = submit(queue)
+    queue.claim('w1')
+    age_heartbeat(queue, job_id, JOB_STALE_SECONDS + 10)
+    assert queue.update_progress(job_id, 'w1', 1)
+
+    assert queue.claim('w2') is None
+    assert queue.get(job_id)['status'] == 'running'
+
+
+def test_vastgelopen_job_na_laatste_poging_faalt(queue):
+    job_id = submit(queue, max_attempts=1)
+    queue.claim('w1')
+    age_heartbeat(queue, job_id, JOB_STALE_SECONDS + 10)
+
+    assert queue.claim('w2') is None
+    job = queue.get(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Worker gestopt zonder resultaat'
+
+
+def test_fout_wordt_later_opnieuw_geprobeerd(queue, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_RETRY_DELAY', 0)
+    job_id = submit(queue, max_attempts=2)
+    queue.claim('w')
+    queue.fail(job_id, 'w', 'kapot')
+    assert queue.get(job_id)['status'] == 'queued'
+
+    assert queue.claim('w')['attempts'] == 2
+    queue.fail(job_id, 'w', 'weer kapot')
+    job = queue.get(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == 'weer kapot'
+
+
+def test_resultaat_en_verlopen(queue):
+    job_id = submit(queue)
+    queue.claim('w')
+    queue.complete(job_id, 'w', {'count': 1})
+    assert queue.get(job_id, include_result=True)['result'] == {'count': 1}
+
+    with queue.connect() as conn:
+        conn.execute('UPDATE jobs SET expires_at = ? WHERE id = ?', (datetime.now() - timedelta(seconds=1), job_id))
+    assert queue.expire_results() == 1
+    assert queue.get(job_id, include_result=True) == dict(queue.get(job_id), result=None)
+    assert queue.get(job_id)['status'] == 'expired'
+
+
+def test_onbekend_type_of_prioriteit(queue):
+    with pytest.raises(ValueError):
+        queue.submit('bestaat_niet', {})
+    with pytest.raises(ValueError):
+        submit(queue, priority=10)
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from proximascore.osm_ingest import OsmPlaceProvider, PoiStore, ingest
+
+# Supermarkten op een raster van 0.01 graad over ~22 x 28 km rond Tilburg
+LATS = [round(51.45 + step * 0.01, 2) for step in range(21)]
+LNGS = [round(4.90 + step * 0.01, 2) for step in range(41)]
+
+
+def feature(osm_id, lat, lng, tags):
+    return {'type': 'Feature', 'id': osm_id, 'properties': tags,
+            'geometry': {'type': 'Point', 'coordinates': [lng, lat]}}
+
+
+def write_extract(path, points):
+    features = [feature(f"n{lat}_{lng}", lat, lng, {'shop': 'supermarket', 'name': f"Super {lat} {lng}"})
+                for lat, lng in points]
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}))
+    return path
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    # L-vorm: het kwadrant noordoost ontbreekt, net als een buurprovincie in de bbox
+    points = [(lat, lng) for lat in LATS for lng in LNGS if not (lat > 51.55 and lng > 5.10)]
+    ingest(write_extract(tmp_path / 'regio.geojson', points), 'regio', tmp_path / 'poi.db')
+    return tmp_path / 'poi.db'
+
+
+def test_import_en_query(store_path):
+    store = PoiStore(store_path)
+    places = store.query(51.50, 5.00, 'supermarkt', 1000)
+    assert places
+    assert all(place.distance_meters <= 1000 for place in places)
+    assert min(places, key=lambda place: place.distance_meters).name == 'Super 51.5 5.0'
+    assert store.query(51.50, 5.00, 'apotheek', 1000) == []
+
+
+def test_zoekcirkel_moet_binnen_de_regio_vallen(store_path):
+    store = PoiStore(store_path)
+    assert store.covers(51.50, 5.00, 2000)
+    # Binnen de bbox, maar de cirkel van 2 km steekt aan de zuidrand uit de extract
+    assert store.covers(51.455, 5.00)
+    assert not store.covers(51.455, 5.00, 2000)
+    # Hoek van de bbox zonder POIs
+    assert not store.covers(51.63, 5.25, 0)
+
+    provider = OsmPlaceProvider(store)
+    assert provider.find_places(51.455, 5.00, 'supermarkt', []) is None
+    assert provider.find_places(51.50, 5.00, 'supermarkt', [])
+    assert provider.widened(3000).find_places(51.47, 5.00, 'supermarkt', []) is None
+
+
+def test_overlappende_regios_houden_hun_eigen_pois(tmp_path):
+    store_path = tmp_path / 'poi.db'
+    shared = [(lat, lng) for lat in LATS[:5] for lng in LNGS[:5]]
+    ingest(write_extract(tmp_path / 'a.geojson', shared), 'a', store_path)
+    ingest(write_extract(tmp_path / 'b.geojson', shared), 'b', store_path)
+    # Herimport van a zonder de gedeelde POIs laat die van b staan
+    ingest(write_extract(tmp_path / 'a2.geojson', [(52.0, 5.0)]), 'a', store_path)
+
+    store = PoiStore(store_path)
+    places = store.query(LATS[2], LNGS[2], 'supermarkt', 5000)
+    assert len(places) == len(shared)
+    assert len({place.name for place in places}) == len(places)
@@ -0,0 +1,66 @@
+from proximascore.cache_backends import MemoryCacheBackend
+from proximascore.place_records import Place
+from proximascore.poi_providers import (
+    CachedPlaceProvider, GooglePlacesProvider, ProviderChain, UpstreamError, calculate_distance,
+    select_closest_places
+)
+from proximascore.query_planner import QueryPlanner
+
+
+def place(name, distance, lat=51.5, lng=5.0):
+    return Place(name, 'Straat 1', distance, lat, lng, 4.0)
+
+
+def test_afstand_in_meters():
+    # 0.01 graad breedte is ~1112 m
+    assert abs(calculate_distance(51.5, 5.0, 51.51, 5.0) - 1112) < 2
+
+
+def test_dichtstbijzijnde_zonder_duplicaten():
+    places = [place('Jumbo', 300), place('Jumbo', 300), place('AH', 100), place('Lidl', 900), place('Aldi', 50)]
+    assert [p.name for p in select_closest_places(places)] == ['Aldi', 'AH', 'Jumbo']
+
+
+def google_with_radius_steps(calls):
+    provider = GooglePlacesProvider('sleutel', planner=QueryPlanner(radius_steps=(750, 2000)),
+                                    type_cache=CachedPlaceProvider(MemoryCacheBackend()))
+
+    def search_type(lat, lng, place_type, radius=None, category=None):
+        calls.append((place_type, radius))
+        return [place(place_type, 1500)] if radius == 2000 and place_type == 'supermarket' else []
+
+    provider.search_type = search_type
+    return provider
+
+
+def test_type_cache_geldt_ook_voor_verbrede_radius():
+    calls = []
+    provider = google_with_radius_steps(calls)
+    types = ['supermarket', 'grocery_or_supermarket']
+
+    first = provider.find_places(51.5, 5.0, 'supermarkt', types)
+    assert sorted(calls) == sorted((place_type, radius) for radius in (750, 2000) for place_type in types)
+
+    calls.clear()
+    assert provider.find_places(51.5, 5.0, 'supermarkt', types) == first
+    assert calls == []
+
+
+def test_gedeeltelijk_antwoord_wordt_niet_gecachet():
+    provider = GooglePlacesProvider('sleutel', planner=QueryPlanner(radius_steps=(2000,)))
+
+    def search_type(lat, lng, place_type, radius=None, category=None):
+        if place_type == 'grocery_or_supermarket':
+            raise UpstreamError('HTTP 503')
+        return [place('Jumbo', 900)]
+
+    provider.search_type = search_type
+    cache = CachedPlaceProvider(MemoryCacheBackend())
+    chain = ProviderChain([cache, provider])
+    types = ['supermarket', 'grocery_or_supermarket']
+
+    places, source = chain.lookup(51.5, 5.0, 'supermarkt', types, postprocess=select_closest_places)
+    assert source == 'partial'
+    assert [p.name for p in places] == ['Jumbo']
+    # Het gefaalde type kan een dichterbij gelegen place hebben: volgende keer opnieuw vragen
+    assert cache.find_places(51.5, 5.0, 'supermarkt', types) is None
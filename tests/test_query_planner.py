@@ -0,0 +1,44 @@
+from proximascore.place_records import Place
+from proximascore.query_planner import QueryPlanner
+
+
+def place(distance):
+    return Place('Winkel', 'Straat 1', distance, 51.5, 5.0, 4.0)
+
+
+def run_plan(planner, results):
+    """Voer een plan uit met vaste resultaten per type; geeft de bevraagde types terug"""
+    plan = planner.plan('supermarkt', list(results))
+    queried = []
+    while True:
+        query = plan.next_query()
+        if query is None:
+            break
+        place_type, radius = query
+        queried.append(place_type)
+        plan.record(place_type, results[place_type])
+    plan.finish()
+    return queried, plan
+
+
+def test_standaard_worden_alle_types_bevraagd():
+    queried, plan = run_plan(QueryPlanner(), {'supermarket': [place(0)], 'grocery_or_supermarket': [place(50)]})
+    assert queried == ['supermarket', 'grocery_or_supermarket']
+    assert plan.stop_reason == 'found'
+
+
+def test_early_stop_alleen_als_ingesteld():
+    queried, plan = run_plan(QueryPlanner(early_stop_distance=100),
+                             {'supermarket': [place(80)], 'grocery_or_supermarket': [place(50)]})
+    assert queried == ['supermarket']
+    assert plan.stop_reason == 'early_stop'
+
+
+def test_radius_stappen_verbreden_alleen_zonder_resultaat():
+    planner = QueryPlanner(radius_steps=(750, 2000))
+    plan = planner.plan('supermarkt', ['supermarket'])
+    assert plan.next_query() == ('supermarket', 750)
+    plan.record('supermarket', [])
+    assert plan.next_query() == ('supermarket', 2000)
+    plan.record('supermarket', [place(1200)])
+    assert plan.next_query() is None
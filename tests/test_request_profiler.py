@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+import request_profiler
+from request_profiler import ProfileSession, wrap_task
+
+
+def busy():
+    return sum(i * i for i in range(2000))
+
+
+def profile_request(mode):
+    """Profiel van een 'request' dat werk naar een worker thread stuurt"""
+    session = ProfileSession(mode, sample_interval=0.001)
+    session.start()
+    try:
+        task = wrap_task(busy)
+        worker = threading.Thread(target=task)
+        worker.start()
+        worker.join()
+        busy()
+    finally:
+        session.stop()
+    return session
+
+
+@pytest.mark.parametrize('per_thread', [True, False])
+def test_cprofile_met_worker_threads(per_thread, monkeypatch, tmp_path):
+    monkeypatch.setattr(request_profiler, 'PER_THREAD_CPROFILE', per_thread)
+    session = profile_request('cprofile')
+    assert session.mode == 'cprofile'
+    assert len(session._profiles) == (2 if per_thread else 1)
+    path = session.write(tmp_path)
+    assert path.suffix == '.pstats'
+    assert path.stat().st_size > 0
+
+
+def test_zonder_sessie_blijft_de_taak_ongewijzigd():
+    assert wrap_task(busy) is busy
+
+
+def test_sampling_schrijft_folded_stacks(tmp_path):
+    session = profile_request('sampling')
+    path = session.write(tmp_path)
+    assert path.suffix == '.folded'
+    for line in path.read_text().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert stack.split(';')[0] in ('request', 'categorie')
+        assert int(count) > 0
@@ -0,0 +1,106 @@
+import os
+import random
+
+import pytest
+
+from proximascore.cache_backends import MemoryCacheBackend
+from proximascore.score_sketches import NATIONAL_REGION, KllSketch, ScoreDistributions, percentile_rank
+
+
+def exact_rank(values, value):
+    below = sum(1 for v in values if v < value)
+    equal = sum(1 for v in values if v == value)
+    return 100 * (below + equal / 2) / len(values)
+
+
+def scores(count, seed):
+    generator = random.Random(seed)
+    return [round(min(100, max(0, generator.gauss(60, 15))), 1) for _ in range(count)]
+
+
+def test_rang_binnen_de_foutmarge():
+    values = scores(20000, seed=1)
+    sketch = KllSketch(k=200, seed=1)
+    for value in values:
+        sketch.update(value)
+    assert sketch.n == len(values)
+    # Geheugen blijft begrensd, ongeacht het aantal scores
+    assert len(sketch) < 3 * 200
+    for value in (30, 50, 60, 70, 90):
+        rank, count = percentile_rank([sketch], value)
+        assert abs(rank - exact_rank(values, value)) < 2
+
+
+def test_quantielen_en_uitersten():
+    values = scores(5000, seed=2)
+    sketch = KllSketch(seed=2)
+    for value in values:
+        sketch.update(value)
+    ordered = sorted(values)
+    assert sketch.min == ordered[0] and sketch.max == ordered[-1]
+    for fraction in (0.1, 0.5, 0.9):
+        estimate = sketch.quantile(fraction)
+        assert abs(exact_rank(values, estimate) - 100 * fraction) < 2
+
+
+def test_samenvoegen_gelijk_aan_een_sketch_over_alles():
+    first, second = scores(8000, seed=3), scores(8000, seed=4)
+    left, right = KllSketch(seed=3), KllSketch(seed=4)
+    for value in first:
+        left.update(value)
+    for value in second:
+        right.update(value)
+    left.merge(right)
+    assert left.n == 16000
+    assert left.total == pytest.approx(sum(first) + sum(second))
+    for value in (40, 60, 80):
+        rank, count = percentile_rank([left], value)
+        assert abs(rank - exact_rank(first + second, value)) < 2
+
+
+def test_rondreis_via_dict():
+    sketch = KllSketch()
+    for value in scores(1000, seed=5):
+        sketch.update(value)
+    copy = KllSketch.from_dict(sketch.to_dict())
+    assert copy.n == sketch.n
+    assert copy.quantile(0.5) == sketch.quantile(0.5)
+
+
+@pytest.fixture
+def distributions():
+    distributions = ScoreDistributions(MemoryCacheBackend(), flush_interval=3600, min_count=1, max_loaded=3)
+    # Zonder achtergrond thread: flush en load gaan in de test zelf
+    distributions._ensure_thread = lambda: None
+    distributions._pid = os.getpid()
+    return distributions
+
+
+def test_onbekende_regio_komt_niet_in_geheugen(distributions):
+    for name in ('dongen', 'typfout', '2 hoog amsterdam'):
+        assert distributions.summary('algemeen', name)['count'] == 0
+    assert len(distributions._stored) == 0
+
+
+def test_geladen_sketches_blijven_begrensd(distributions):
+    for index in range(10):
+        distributions.record('algemeen', f"gemeente-{index}", 50 + index)
+    distributions.flush()
+    assert len(distributions._stored) == 3
+    assert distributions.summary('algemeen', 'gemeente-0')['count'] == 1
+
+
+def test_flush_ververst_wat_andere_workers_schreven(distributions):
+    distributions.record('algemeen', 'dongen', 70)
+    distributions.flush()
+    assert distributions.summary('algemeen', NATIONAL_REGION)['count'] == 1
+
+    other = ScoreDistributions(distributions.backend, min_count=1)
+    other._ensure_thread = lambda: None
+    other._pid = distributions._pid
+    other.record('algemeen', 'dongen', 40)
+    other.flush()
+
+    distributions.flush()
+    assert distributions.summary('algemeen', 'dongen')['count'] == 2
+    assert distributions.percentile('algemeen', 'dongen', 55)['sample_size'] == 2
@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from proximascore.cache_backends import MemoryCacheBackend
+from proximascore.place_records import Place
+from proximascore.scorer import ProximaScoreCalculator
+
+
+@pytest.fixture
+def calculator():
+    """Calculator zonder caches of providers; lookup_places wordt per test vervangen"""
+    calculator = ProximaScoreCalculator.__new__(ProximaScoreCalculator)
+    calculator.providers = {}
+    calculator.task_wrapper = None
+    calculator.executor = ThreadPoolExecutor(max_workers=4)
+    yield calculator
+    calculator.executor.shutdown()
+
+
+def test_falende_categorie_breekt_de_score_niet_af(calculator):
+    def lookup_places(lat, lng, category):
+        if category == 'supermarkt':
+            raise ValueError('Another profiling tool is already active')
+        return [Place('Plek', 'Straat 1', 400, lat, lng, 4.0)], 'test'
+
+    calculator.lookup_places = lookup_places
+    failed = set()
+    scored = {category: score for category, entry, score
+              in calculator.iter_category_scores(51.5, 5.0, 'algemeen', failed=failed)}
+
+    expected = {category for category, weight in calculator.scored_categories('algemeen')} - {'supermarkt'}
+    assert set(scored) == expected
+    assert all(score == 80 for score in scored.values())
+    assert failed == {'supermarkt'}
+
+
+def test_gedeeltelijke_lookup_telt_als_gefaald(calculator):
+    calculator.lookup_places = lambda lat, lng, category: (
+        [Place('Plek', 'Straat 1', 400, lat, lng, 4.0)], 'partial' if category == 'huisarts' else 'google')
+    failed = set()
+    scored = {category: score for category, entry, score
+              in calculator.iter_category_scores(51.5, 5.0, 'algemeen', failed=failed)}
+
+    # De score van de categorie blijft zichtbaar, maar telt niet als volledig resultaat
+    assert scored['huisarts'] == 80
+    assert failed == {'huisarts'}
+
+
+def test_alias_van_een_oudere_normalizer_wordt_genegeerd(calculator):
+    calculator.cache = MemoryCacheBackend()
+    raw_hash = calculator.alias_key('Plein 1944 nr 5, Nijmegen').rsplit(':', 1)[1]
+    # Zonder versie in de sleutel: van voor de postcode fix, met de foute sleutel
+    calculator.cache.set(f"alias:{raw_hash}", '1944NR 5')
+
+    assert calculator.resolve_address_key('Plein 1944 nr 5, Nijmegen') == 'plein 1944 5, nijmegen'
+    key, data, expires_at = next(row for row in calculator.cache.iter_raw()
+                                 if row[0] == calculator.alias_key('Plein 1944 nr 5, Nijmegen'))
+    assert expires_at is not None
+
+
+def test_gemeente_komt_uit_de_geocoder():
+    result = {'address_components': [
+        {'long_name': '1', 'types': ['street_number']},
+        {'long_name': 'Dongen', 'types': ['locality', 'political']},
+        {'long_name': "'s-Hertogenbosch", 'types': ['administrative_area_level_2', 'political']},
+    ]}
+    # Zelfde normalisatie als ?region= van /api/distribution ('Den Bosch' -> 's hertogenbosch')
+    assert ProximaScoreCalculator.geocoded_gemeente(result) == 's hertogenbosch'
+    assert ProximaScoreCalculator.geocoded_gemeente({'address_components': []}) is None
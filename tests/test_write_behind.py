@@ -0,0 +1,108 @@
+import os
+import threading
+
+import pytest
+
+from proximascore.cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+from proximascore.write_behind import WriteBehindCache
+
+
+class BlockingBackend(MemoryCacheBackend):
+    """Geheugen backend waarvan de writes wachten tot release gezet is"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writing = threading.Event()
+
+    def store_raw(self, rows):
+        self.writing.set()
+        self.release.wait(5)
+        super().store_raw(rows)
+
+
+@pytest.fixture
+def blocked():
+    backend = BlockingBackend()
+    cache = WriteBehindCache(backend, max_queue=2, batch_size=1, max_delay=0)
+    yield cache, backend
+    backend.release.set()
+    cache.close()
+
+
+def test_write_is_direct_leesbaar_via_de_overlay(blocked):
+    cache, backend = blocked
+    cache.set('a', {'x': 1}, ttl=60)
+    assert cache.get('a') == {'x': 1}
+    assert backend.writing.wait(5)
+    assert MemoryCacheBackend.get_many(backend, ['a']) == {}
+
+    backend.release.set()
+    assert cache.flush()
+    assert backend.get('a') == {'x': 1}
+    assert cache.get_stats()['overlay'] == 0
+
+
+def test_delete_in_de_overlay_verbergt_de_oude_waarde(blocked):
+    cache, backend = blocked
+    MemoryCacheBackend.store_raw(backend, [('a', backend.serializer.dumps('oud'), None)])
+    cache.delete('a')
+    assert cache.get('a') is None
+
+
+def test_volle_wachtrij_laat_writes_vallen(blocked):
+    cache, backend = blocked
+    cache.set('bezig', 1)
+    # De writer hangt in de eerste write; daarna passen er nog max_queue in de wachtrij
+    assert backend.writing.wait(5)
+    for number in range(5):
+        cache.set(f"k{number}", number)
+
+    stats = cache.get_stats()
+    assert stats['dropped'] == 3
+    assert stats['max_queue_depth'] == 2
+    # Een vervallen write staat ook niet meer in de overlay
+    assert cache.get_many([f"k{number}" for number in range(5)]) == {'k0': 0, 'k1': 1}
+
+    backend.release.set()
+    assert cache.flush()
+    assert backend.get_many([f"k{number}" for number in range(5)]) == {'k0': 0, 'k1': 1}
+
+
+def test_afsluiten_schrijft_de_wachtrij_leeg(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / 'cache.db')
+    cache = WriteBehindCache(backend, max_delay=1.0)
+    cache.set_many({f"k{number}": number for number in range(50)}, ttl=60)
+    cache.close()
+
+    assert SQLiteCacheBackend(tmp_path / 'cache.db').get('k49') == 49
+    # Na het afsluiten gaan writes direct naar de backend
+    cache.set('later', 1)
+    assert backend.get('later') == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork niet beschikbaar')
+def test_write_na_fork_krijgt_een_eigen_writer(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / 'cache.db')
+    cache = WriteBehindCache(backend)
+    cache.set('ouder', 1)
+    assert cache.flush()
+
+    pid = os.fork()
+    if pid == 0:
+        # Kind: de writer thread van de ouder bestaat hier niet
+        ok = False
+        try:
+            cache.set('kind', 2)
+            ok = cache.get('kind') == 2 and cache.flush(5)
+            cache.close()
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+
+    assert backend.get('kind') == 2
+    cache.set('ouder', 3)
+    assert cache.flush()
+    assert backend.get('ouder') == 3
+    cache.close()